@@ -2,15 +2,26 @@
 """Code for handing statuses in the app and unit."""
 # Copyright 2024 Canonical Ltd.
 # See LICENSE file for licensing details.
+import hashlib
 import json
 import logging
-from typing import Tuple
+import math
+import time
+from dataclasses import replace
+from typing import Callable, Dict, Optional, Tuple
 
 from charms.mongodb.v1.mongodb import MongoDBConfiguration, MongoDBConnection
+from charms.mongodb.v1.mongodb_backups import S3_RELATION
+from charms.operator_libs_linux.v2 import snap
 from ops.charm import CharmBase
-from ops.framework import Object
+from ops.framework import Object, StoredState
 from ops.model import ActiveStatus, BlockedStatus, StatusBase, WaitingStatus
-from pymongo.errors import AutoReconnect, OperationFailure, ServerSelectionTimeoutError
+from pymongo.errors import (
+    AutoReconnect,
+    OperationFailure,
+    PyMongoError,
+    ServerSelectionTimeoutError,
+)
 
 from config import Config
 
@@ -22,7 +33,7 @@ LIBAPI = 0
 
 # Increment this PATCH version before using `charmcraft publish-lib` or reset
 # to 0 if you are raising the major API version
-LIBPATCH = 1
+LIBPATCH = 6
 
 AUTH_FAILED_CODE = 18
 UNAUTHORISED_CODE = 13
@@ -35,6 +46,8 @@ logger = logging.getLogger(__name__)
 class MongoDBStatusHandler(Object):
     """Verifies versions across multiple integrated applications."""
 
+    _stored = StoredState()
+
     def __init__(
         self,
         charm: CharmBase,
@@ -46,6 +59,7 @@ class MongoDBStatusHandler(Object):
         """
         super().__init__(charm, None)
         self.charm = charm
+        self._stored.set_default(status_cache={})
 
         # TODO Future PR: handle update_status
 
@@ -161,7 +175,7 @@ class MongoDBStatusHandler(Object):
 
         return False
 
-    def process_statuses(self) -> StatusBase:
+    def process_statuses(self, use_cache: bool = True) -> StatusBase:
         """Retrieves statuses from processes inside charm and returns the highest priority status.
 
         When a non-fatal error occurs while processing statuses, the error is processed and
@@ -169,6 +183,10 @@ class MongoDBStatusHandler(Object):
 
         TODO: add more status handling here for other cases: i.e. TLS, or resetting a status that
         should not be reset
+
+        Args:
+            use_cache: whether statuses of subsystems whose inputs did not change since the last
+                computation can be reused from the unit peer data.
         """
         # retrieve statuses of different services running on Charmed MongoDB
         deployment_mode = (
@@ -176,7 +194,7 @@ class MongoDBStatusHandler(Object):
         )
         waiting_status = None
         try:
-            statuses = self.get_statuses()
+            statuses = self.get_statuses(use_cache=use_cache)
         except OperationFailure as e:
             if e.code in [UNAUTHORISED_CODE, AUTH_FAILED_CODE]:
                 waiting_status = f"Waiting to sync passwords across the {deployment_mode}"
@@ -194,15 +212,133 @@ class MongoDBStatusHandler(Object):
 
         return self.prioritize_statuses(statuses)
 
-    def get_statuses(self) -> Tuple:
-        """Retrieves statuses for the different processes running inside the unit."""
+    def get_statuses(self, use_cache: bool = False) -> Tuple:
+        """Retrieves statuses for the different processes running inside the unit.
+
+        The status of mongod is always computed, since it is what the replica set config version
+        in the fingerprints of the other subsystems is read from. Statuses of the shard, the
+        config-server and PBM are reused from the unit local state when `use_cache` is set and
+        the fingerprint of their inputs matches the one they were computed with.
+        """
         mongodb_status = build_unit_status(
             self.charm.mongodb_config, self.charm.unit_host(self.charm.unit)
         )
-        shard_status = self.charm.shard.get_shard_status()
-        config_server_status = self.charm.config_server.get_config_server_status()
-        pbm_status = self.charm.backups.get_pbm_status()
-        return (mongodb_status, shard_status, config_server_status, pbm_status)
+        status_getters = {
+            "shard": self.charm.shard.get_shard_status,
+            "config-server": self.charm.config_server.get_config_server_status,
+            "pbm": self.charm.backups.get_pbm_status,
+        }
+        # a unit that is not healthy has inputs that cannot be fingerprinted reliably
+        if not use_cache or not isinstance(mongodb_status, ActiveStatus):
+            return (mongodb_status, *(getter() for getter in status_getters.values()))
+
+        try:
+            fingerprints = self.get_fingerprints()
+        except snap.SnapError as e:
+            logger.debug("Cannot fingerprint the status inputs, error: %s", str(e))
+            return (mongodb_status, *(getter() for getter in status_getters.values()))
+
+        cache = self.get_status_cache()
+        statuses = [
+            self._get_cached_status(cache, subsystem, fingerprints[subsystem], getter)
+            for subsystem, getter in status_getters.items()
+        ]
+        self.save_status_cache(cache)
+        return (mongodb_status, *statuses)
+
+    def get_fingerprints(self) -> Dict[str, str]:
+        """Returns a fingerprint of the inputs of each subsystem whose status can be cached.
+
+        The PBM operation in progress is not part of the fingerprint of PBM, since it can only be
+        known by running `pbm status`. Instead, only active statuses are ever reused, so a running
+        backup or restore is always reported by a fresh computation.
+
+        Raises:
+            snap.SnapError
+        """
+        with MongoDBConnection(self.charm.mongodb_config) as mongo:
+            config_version = mongo.get_topology().config_version
+
+        common = {
+            "role": self.charm.role,
+            "snap-revision": self.charm.snap_cache[Config.SNAP_NAME].revision,
+            "config-version": config_version,
+            "tls-ca": [
+                self.charm.tls.get_tls_secret(internal, Config.TLS.SECRET_CA_LABEL)
+                for internal in (True, False)
+            ],
+        }
+        subsystem_relations = {
+            "shard": Config.Relations.CONFIG_SERVER_RELATIONS_NAME,
+            "config-server": Config.Relations.SHARDING_RELATIONS_NAME,
+            "pbm": S3_RELATION,
+        }
+        return {
+            subsystem: _fingerprint({**common, "relations": self._get_relations_data(name)})
+            for subsystem, name in subsystem_relations.items()
+        }
+
+    def get_status_cache(self) -> Dict[str, Dict]:
+        """Returns the statuses previously computed by this unit, keyed by subsystem."""
+        return {subsystem: dict(entry) for subsystem, entry in self._stored.status_cache.items()}
+
+    def save_status_cache(self, cache: Dict[str, Dict]) -> None:
+        """Saves the statuses computed by this unit.
+
+        The cache is unit local state rather than peer data: writing it to a databag would fire
+        relation-changed on every other unit each time a status is refreshed.
+        """
+        self._stored.status_cache = cache
+
+    def _get_cached_status(
+        self,
+        cache: Dict[str, Dict],
+        subsystem: str,
+        fingerprint: str,
+        get_status: Callable[[], Optional[StatusBase]],
+    ) -> Optional[StatusBase]:
+        """Returns the cached status of a subsystem, or computes and caches it if it is stale."""
+        entry = cache.get(subsystem)
+        if (
+            entry
+            and entry["fingerprint"] == fingerprint
+            and time.time() - entry["at"] < Config.Status.CACHE_MAX_AGE
+        ):
+            logger.debug("Reusing cached status of %s", subsystem)
+            if entry["status"] is None:
+                return None
+            return StatusBase.from_name(entry["status"], entry["message"])
+
+        status = get_status()
+        if status is not None and not isinstance(status, ActiveStatus):
+            # only steady states are cached, everything else can change without its inputs
+            # changing, i.e. a backup finishing or a mongos becoming reachable again.
+            cache.pop(subsystem, None)
+            return status
+
+        cache[subsystem] = {
+            "fingerprint": fingerprint,
+            "status": status.name if status else None,
+            "message": status.message if status else "",
+            "at": time.time(),
+        }
+        return status
+
+    def _get_relations_data(self, relation_name: str) -> Dict[str, Dict[str, str]]:
+        """Returns the contents of the databags this unit can read on relations of a name."""
+        relations_data = {}
+        for relation in self.charm.model.relations[relation_name]:
+            entities = [relation.app, self.charm.unit, *relation.units]
+            if self.charm.unit.is_leader():
+                entities.append(self.charm.app)
+
+            for entity in entities:
+                if entity is None:
+                    continue
+                key = f"{relation.id}/{entity.name}"
+                relations_data[key] = dict(relation.data[entity])
+
+        return relations_data
 
     def prioritize_statuses(self, statuses: Tuple) -> StatusBase:
         """Returns the status with the highest priority from backups, sharding, and mongod."""
@@ -240,7 +376,9 @@ def build_unit_status(mongodb_config: MongoDBConfiguration, unit_host: str) -> S
                     return ActiveStatus("Primary")
                 case "SECONDARY":
                     return ActiveStatus("")
-                case "STARTUP" | "STARTUP2" | "ROLLBACK" | "RECOVERING":
+                case "STARTUP2":
+                    return build_initial_sync_status(mongodb_config)
+                case "STARTUP" | "ROLLBACK" | "RECOVERING":
                     return WaitingStatus("Member is syncing...")
                 case "REMOVED":
                     return WaitingStatus("Member is removing...")
@@ -256,4 +394,37 @@ def build_unit_status(mongodb_config: MongoDBConfiguration, unit_host: str) -> S
         logger.debug("Got error: %s, while checking replica set status", str(e))
         return WaitingStatus("Waiting to reconnect to unit..")
 
-    # END: Helpers
+
+def build_initial_sync_status(mongodb_config: MongoDBConfiguration) -> StatusBase:
+    """Generates the status of a unit in initial sync, with its source and progress if known."""
+    # only the member in initial sync reports its progress
+    try:
+        with MongoDBConnection(
+            replace(mongodb_config, standalone=True), direct=True
+        ) as direct_mongo:
+            initial_sync = direct_mongo.get_initial_sync_status()
+    except PyMongoError as e:
+        # the progress is a detail, a member which cannot report it yet is still syncing.
+        logger.debug("Got error: %s, while checking the initial sync progress", str(e))
+        return WaitingStatus("Member is syncing...")
+
+    if not initial_sync or initial_sync.progress is None:
+        return WaitingStatus("Member is syncing...")
+
+    message = "Member is syncing"
+    if initial_sync.source:
+        message += f" from {initial_sync.source}"
+
+    message += f" ({initial_sync.progress:.0f}%"
+    if initial_sync.remaining is not None:
+        message += f", ~{math.ceil(initial_sync.remaining / 60)}m left"
+
+    return WaitingStatus(f"{message})...")
+
+
+def _fingerprint(inputs: Dict) -> str:
+    """Returns a digest of the inputs of a status computation."""
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+# END: Helpers
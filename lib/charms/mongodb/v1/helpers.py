@@ -8,9 +8,11 @@ import os
 import secrets
 import string
 import subprocess
-from typing import List
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
 
-from charms.mongodb.v1.mongodb import MongoDBConfiguration
+from charms.mongodb.v1.mongodb import MongoDBConfiguration, ProfilingSettings
 from ops.model import ActiveStatus, MaintenanceStatus, StatusBase, WaitingStatus
 
 from config import Config
@@ -23,7 +25,7 @@ LIBAPI = 1
 
 # Increment this PATCH version before using `charmcraft publish-lib` or reset
 # to 0 if you are raising the major API version
-LIBPATCH = 6
+LIBPATCH = 13
 
 # path to store mongodb ketFile
 KEY_FILE = "keyFile"
@@ -43,6 +45,20 @@ CONF_DIR = "/etc/mongod"
 MONGODB_LOG_FILENAME = "mongodb.log"
 logger = logging.getLogger(__name__)
 
+# path in the configuration file of the storage options, keyed by command line option name.
+STORAGE_OPTION_PATHS = {
+    "directoryperdb": ("storage", "directoryPerDB"),
+    "oplogSize": ("replication", "oplogSizeMB"),
+    "wiredTigerCacheSizeGB": ("storage", "wiredTiger", "engineConfig", "cacheSizeGB"),
+    "wiredTigerCollectionBlockCompressor": (
+        "storage",
+        "wiredTiger",
+        "collectionConfig",
+        "blockCompressor",
+    ),
+    "wiredTigerJournalCompressor": ("storage", "wiredTiger", "engineConfig", "journalCompressor"),
+}
+
 
 def _get_logging_options(snap_install: bool) -> str:
     """Returns config option for log path.
@@ -176,9 +192,25 @@ def get_mongod_args(
     auth: bool = True,
     snap_install: bool = False,
     role: str = "replication",
+    parameters: Optional[Dict[str, str]] = None,
+    compressors: Optional[List[str]] = None,
+    storage_options: Optional[Dict[str, Optional[str]]] = None,
 ) -> str:
     """Construct the MongoDB startup command line.
 
+    The charm itself starts mongod with the configuration file of get_mongod_config, this is
+    only kept for the other charms sharing this library. Options are added to both.
+
+    Args:
+        config: MongoDB Configuration object.
+        auth: whether authentication is enabled.
+        snap_install: indicate that charmed-mongodb was installed from snap (VM charms).
+        role: role of the mongod in the deployment.
+        parameters: additional server parameters to set on startup.
+        compressors: network compressors to negotiate with clients, in order of preference.
+        storage_options: storage engine options, keyed by command line option name, options
+            without a value are flags.
+
     Returns:
         A string representing the command used to start MongoDB.
     """
@@ -242,10 +274,291 @@ def get_mongod_args(
     if role == Config.Role.SHARD:
         cmd.append("--shardsvr")
 
+    if compressors:
+        cmd.append(f"--networkMessageCompressors={','.join(compressors)}")
+
+    for name, value in sorted((storage_options or {}).items()):
+        cmd.append(f"--{name}" if value is None else f"--{name}={value}")
+
+    for name, value in sorted((parameters or {}).items()):
+        cmd.append(f"--setParameter {name}={value}")
+
     cmd.append("\n")
     return " ".join(cmd)
 
 
+def get_mongod_config(
+    config: MongoDBConfiguration,
+    auth: bool = True,
+    snap_install: bool = False,
+    role: str = "replication",
+    parameters: Optional[Dict[str, Any]] = None,
+    compressors: Optional[List[str]] = None,
+    storage_options: Optional[Dict[str, Optional[str]]] = None,
+    profiling: Optional[ProfilingSettings] = None,
+) -> Dict[str, Any]:
+    """Construct the content of the mongod configuration file.
+
+    This holds the same options as get_mongod_args, laid out as the sections of the YAML
+    configuration file of mongod.
+
+    Args:
+        config: MongoDB Configuration object.
+        auth: whether authentication is enabled.
+        snap_install: indicate that charmed-mongodb was installed from snap (VM charms).
+        role: role of the mongod in the deployment.
+        parameters: additional server parameters to set on startup.
+        compressors: network compressors to negotiate with clients, in order of preference.
+        storage_options: storage engine options, keyed by command line option name, options
+            without a value are flags.
+        profiling: settings of the database profiler, mongod defaults apply if not provided.
+
+    Returns:
+        A dictionary of the sections of the configuration file, ready to be dumped as YAML.
+    """
+    full_data_dir = f"{MONGODB_COMMON_DIR}{DATA_DIR}" if snap_install else DATA_DIR
+    full_conf_dir = f"{MONGODB_SNAP_DATA_DIR}{CONF_DIR}" if snap_install else CONF_DIR
+    full_log_dir = f"{MONGODB_COMMON_DIR}{LOG_DIR}" if snap_install else LOG_DIR
+    mongod_config = {
+        # bind to localhost and external interfaces
+        "net": {"bindIpAll": True, "port": Config.MONGODB_PORT},
+        "replication": {"replSetName": config.replset},
+        # db must be located within the snap common directory since the snap is strictly confined
+        "storage": {"dbPath": full_data_dir},
+        "systemLog": {
+            "destination": "file",
+            "path": f"{full_log_dir}/{MONGODB_LOG_FILENAME}",
+            "logAppend": True,
+            "logRotate": "reopen",
+        },
+        "auditLog": {
+            "destination": Config.AuditLog.DESTINATION,
+            "format": Config.AuditLog.FORMAT,
+            "path": f"{full_log_dir}/{Config.AuditLog.FILE_NAME}",
+        },
+        # required for log files perminission (g+r)
+        "setParameter": {"processUmask": "037", **(parameters or {})},
+    }
+
+    if auth:
+        mongod_config["security"] = {"authorization": "enabled"}
+
+    if auth and not config.tls_internal:
+        # keyFile cannot be used without auth and cannot be used in tandem with internal TLS
+        mongod_config["security"].update(
+            {"clusterAuthMode": "keyFile", "keyFile": f"{full_conf_dir}/{KEY_FILE}"}
+        )
+
+    if config.tls_external:
+        mongod_config["net"]["tls"] = {
+            "CAFile": f"{full_conf_dir}/{TLS_EXT_CA_FILE}",
+            "certificateKeyFile": f"{full_conf_dir}/{TLS_EXT_PEM_FILE}",
+            # allow non-TLS connections
+            "mode": "preferTLS",
+            "disabledProtocols": "TLS1_0,TLS1_1",
+        }
+
+    # internal TLS can be enabled only in external is enabled
+    if config.tls_internal and config.tls_external:
+        mongod_config.setdefault("security", {})["clusterAuthMode"] = "x509"
+        mongod_config["net"]["tls"].update(
+            {
+                "allowInvalidCertificates": True,
+                "clusterCAFile": f"{full_conf_dir}/{TLS_INT_CA_FILE}",
+                "clusterFile": f"{full_conf_dir}/{TLS_INT_PEM_FILE}",
+            }
+        )
+
+    if role == Config.Role.CONFIG_SERVER:
+        mongod_config["sharding"] = {"clusterRole": "configsvr"}
+
+    if role == Config.Role.SHARD:
+        mongod_config["sharding"] = {"clusterRole": "shardsvr"}
+
+    if compressors:
+        mongod_config["net"]["compression"] = {"compressors": ",".join(compressors)}
+
+    _add_storage_options(mongod_config, storage_options or {})
+    if profiling:
+        mongod_config[Config.Profiling.CONFIG_SECTION] = {
+            "mode": Config.Profiling.MODES[profiling.level],
+            "slowOpThresholdMs": profiling.slow_ms,
+            "slowOpSampleRate": profiling.sample_rate,
+        }
+
+    return mongod_config
+
+
+def _add_storage_options(
+    mongod_config: Dict[str, Any], storage_options: Dict[str, Optional[str]]
+) -> None:
+    """Adds storage engine options, keyed by command line option name, to their sections."""
+    for name, value in storage_options.items():
+        *sections, option = STORAGE_OPTION_PATHS[name]
+        section = mongod_config
+        for section_name in sections:
+            section = section.setdefault(section_name, {})
+        section[option] = _to_config_value(value)
+
+
+def _to_config_value(value: Optional[str]) -> Any:
+    """Returns the typed value of a command line option, flags being true."""
+    if value is None:
+        return True
+
+    for value_type in (int, float):
+        try:
+            return value_type(value)
+        except ValueError:
+            continue
+
+    return value
+
+
+@dataclass(frozen=True)
+class ConfigChanges:
+    """Changes between the configuration mongod runs with and a new configuration.
+
+    — parameters: server parameters which can be set at runtime, keyed by name.
+    — runtime_options: dotted paths of the other options which can be applied at runtime, by
+      commands specific to their section.
+    — restart_options: dotted paths of the options which only apply once mongod restarts.
+    """
+
+    parameters: Dict[str, Any] = field(default_factory=dict)
+    runtime_options: List[str] = field(default_factory=list)
+    restart_options: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        """Whether the configuration changed."""
+        return bool(self.parameters or self.runtime_options or self.restart_options)
+
+
+def diff_mongod_config(
+    current: Dict[str, Any],
+    desired: Dict[str, Any],
+    runtime_parameters: Tuple[str, ...] = (),
+    runtime_sections: Tuple[str, ...] = (),
+) -> ConfigChanges:
+    """Classifies the changes from the current to the desired configuration of mongod.
+
+    Server parameters added or changed in the setParameter section can be set with the
+    setParameter command if they are runtime settable, any other change requires a restart,
+    including removed server parameters since they cannot be reset to their default at runtime.
+    Options of the runtime sections are applied by the caller, with the commands of the section.
+
+    Args:
+        current: configuration mongod currently runs with, as loaded from its file.
+        desired: new configuration, as built by get_mongod_config.
+        runtime_parameters: names of the server parameters which can be set at runtime.
+        runtime_sections: sections whose options can all be applied at runtime.
+    """
+    current_options = _flatten_config(current)
+    desired_options = _flatten_config(desired)
+    parameters = {}
+    runtime_options = []
+    restart_options = []
+    for path in sorted(current_options.keys() | desired_options.keys()):
+        if current_options.get(path) == desired_options.get(path):
+            continue
+
+        section, _, name = path.partition(".")
+        if section == "setParameter" and name in runtime_parameters and path in desired_options:
+            parameters[name] = desired_options[path]
+        elif section in runtime_sections:
+            runtime_options.append(path)
+        else:
+            restart_options.append(path)
+
+    return ConfigChanges(
+        parameters=parameters, runtime_options=runtime_options, restart_options=restart_options
+    )
+
+
+def _flatten_config(config: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """Returns the options of a configuration, keyed by their dotted path."""
+    options = {}
+    for name, value in config.items():
+        if isinstance(value, dict):
+            options.update(_flatten_config(value, prefix=f"{prefix}{name}."))
+        else:
+            options[f"{prefix}{name}"] = value
+
+    return options
+
+
+def parse_connection_options(options: str) -> Dict[str, str]:
+    """Parses and validates the options of a connection string.
+
+    Args:
+        options: URI query string of options, i.e. "compressors=zstd&maxPoolSize=50".
+
+    Returns:
+        the options, keyed by name.
+
+    Raises:
+        ValueError if the options are malformed, unsupported, or have an invalid value.
+    """
+    if not options:
+        return {}
+
+    parsed_options = dict(parse_qsl(options, strict_parsing=True))
+    for name, value in parsed_options.items():
+        if name == "compressors":
+            valid = set(value.split(",")).issubset(Config.Connection.COMPRESSORS)
+        elif name == "readPreference":
+            valid = value in Config.Connection.READ_PREFERENCES
+        elif name == "readConcernLevel":
+            valid = value in Config.Connection.READ_CONCERN_LEVELS
+        elif name == "w":
+            valid = value == "majority" or value.isdigit()
+        elif name in Config.Connection.INT_OPTIONS:
+            valid = value.isdigit()
+        elif name in Config.Connection.BOOL_OPTIONS:
+            valid = value in ("true", "false")
+        else:
+            raise ValueError(f"Unsupported connection option: {name}")
+
+        if not valid:
+            raise ValueError(f"Invalid value for connection option {name}: {value}")
+
+    return parsed_options
+
+
+def parse_server_parameters(parameters: str) -> Dict[str, Any]:
+    """Parses and validates server parameters to tune.
+
+    Args:
+        parameters: comma separated list of server parameters, i.e.
+            "wiredTigerConcurrentReadTransactions=256,diagnosticDataCollectionEnabled=false".
+
+    Returns:
+        the typed values of the parameters, keyed by name.
+
+    Raises:
+        ValueError if the parameters are malformed, unsupported, or have an invalid value.
+    """
+    parsed_parameters = {}
+    for parameter in filter(None, (item.strip() for item in parameters.split(","))):
+        name, separator, value = parameter.partition("=")
+        if not separator:
+            raise ValueError(f"Malformed server parameter: {parameter}")
+
+        if name in Config.ServerParameters.BOOL_PARAMETERS:
+            if value not in ("true", "false"):
+                raise ValueError(f"Invalid value for server parameter {name}: {value}")
+            parsed_parameters[name] = value == "true"
+        elif name in Config.ServerParameters.INT_PARAMETERS:
+            minimum = Config.ServerParameters.INT_PARAMETERS[name]
+            if not value.isdigit() or int(value) < minimum:
+                raise ValueError(f"Invalid value for server parameter {name}: {value}")
+            parsed_parameters[name] = int(value)
+        else:
+            raise ValueError(f"Unsupported server parameter: {name}")
+
+    return parsed_parameters
+
+
 def generate_password() -> str:
     """Generate a random password string.
 
@@ -302,21 +615,31 @@ def process_pbm_status(pbm_status: str) -> StatusBase:
     return ActiveStatus()
 
 
-def add_args_to_env(var: str, args: str):
-    """Adds the provided arguments to the environment as the provided variable."""
+def add_args_to_env(var: str, args: str) -> bool:
+    """Adds the provided arguments to the environment as the provided variable.
+
+    Returns:
+        whether the arguments of the variable changed.
+    """
     with open(Config.ENV_VAR_PATH, "r") as env_var_file:
         env_vars = env_var_file.readlines()
 
     args_added = False
+    args_changed = True
     for index, line in enumerate(env_vars):
         if var in line:
             args_added = True
+            args_changed = line != f"{var}={args}"
             env_vars[index] = f"{var}={args}"
 
     # if it is the first time adding these args to the file - will will need to append them to the
     # file
     if not args_added:
         env_vars.append(f"{var}={args}")
+    elif not args_changed:
+        return False
 
     with open(Config.ENV_VAR_PATH, "w") as service_file:
         service_file.writelines(env_vars)
+
+    return args_changed
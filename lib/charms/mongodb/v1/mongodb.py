@@ -4,21 +4,40 @@
 # See LICENSE file for licensing details.
 
 import logging
-import re
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Set
-from urllib.parse import quote_plus
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+from urllib.parse import quote_plus, urlencode
 
+import pymongo
 from bson.json_util import dumps
-from pymongo import MongoClient
-from pymongo.errors import OperationFailure, PyMongoError
+from pymongo import MongoClient, monitoring, uri_parser
+from pymongo.errors import AutoReconnect, OperationFailure, PyMongoError
 from tenacity import (
     RetryError,
     Retrying,
     before_log,
     retry,
+    retry_if_exception_type,
     stop_after_attempt,
     stop_after_delay,
+    wait_exponential_jitter,
     wait_fixed,
 )
 
@@ -32,11 +51,41 @@ LIBAPI = 1
 
 # Increment this PATCH version before using `charmcraft publish-lib` or reset
 # to 0 if you are raising the major API version
-LIBPATCH = 1
+LIBPATCH = 29
 
 # path to store mongodb ketFile
 logger = logging.getLogger(__name__)
 
+# MongoDB replica sets can have at most 7 voting members
+MAX_VOTING_MEMBERS = 7
+
+# relation users are named after the id of their relation, i.e. relation-4.
+RELATION_USER_PATTERN = r"^relation-\d+$"
+SYSTEM_DATABASES = ("admin", "local", "config")
+# number of users sent by the server at once, when streaming users.
+USERS_BATCH_SIZE = 500
+# bounds the number of endpoints commands are sent to at once by `gather`.
+MAX_CONCURRENT_COMMANDS = 8
+# seconds the commands gathered in a hook have to complete, from the start of the hook.
+GATHER_HOOK_TIMEOUT = 120
+# commands gathered late in a hook still get this many seconds to complete.
+MIN_GATHER_TIMEOUT = 5
+
+# the primary is only handed over to a member at most this many seconds behind it.
+MOVE_PRIMARY_MAX_LAG = 10
+# seconds the primary waits for the new primary to catch up before stepping down.
+STEP_DOWN_CATCH_UP_SECS = 10
+# seconds the old primary and the frozen members cannot run for election.
+STEP_DOWN_SECS = 60
+# seconds the new primary has to win the election, and how often it is checked.
+ELECTION_TIMEOUT = 30
+ELECTION_CHECK_INTERVAL = 0.5
+
+# levels of the database profiler: off, slow operations only, every operation.
+PROFILING_LEVELS = (0, 1, 2)
+# default threshold of mongod for slow operations, in milliseconds.
+DEFAULT_SLOW_MS = 100
+
 
 class FailedToMovePrimaryError(Exception):
     """Raised when attempt to move a primary fails."""
@@ -53,6 +102,7 @@ class MongoDBConfiguration:
     — hosts: full list of hosts to connect to, needed for the URI.
     - tls_external: indicator for use of internal TLS connection.
     - tls_internal: indicator for use of external TLS connection.
+    - uri_options: additional connection string options, i.e. compressors or readPreference.
     """
 
     replset: str
@@ -64,6 +114,7 @@ class MongoDBConfiguration:
     tls_external: bool
     tls_internal: bool
     standalone: bool = False
+    uri_options: Dict[str, str] = field(default_factory=dict)
 
     @property
     def uri(self):
@@ -74,6 +125,10 @@ class MongoDBConfiguration:
         if self.database != "admin":
             auth_source = "&authSource=admin"
 
+        uri_options = ""
+        if self.uri_options:
+            uri_options = f"&{urlencode(sorted(self.uri_options.items()), safe=',')}"
+
         if self.standalone:
             return (
                 f"mongodb://{quote_plus(self.username)}:"
@@ -87,13 +142,607 @@ class MongoDBConfiguration:
             f"{hosts}/{quote_plus(self.database)}?"
             f"replicaSet={quote_plus(self.replset)}"
             f"{auth_source}"
+            f"{uri_options}"
+        )
+
+
+@dataclass(frozen=True)
+class ReplicaSetMember:
+    """State of a single replica set member as reported by replSetGetStatus.
+
+    — id: member id in the replica set configuration.
+    — host: hostname of the member, without the port.
+    — state: numeric replica set state of the member.
+    — state_str: replica set state of the member, i.e. PRIMARY, SECONDARY, STARTUP2.
+    — health: 1 if the member is up, 0 otherwise.
+    — optime_date: date of the last operation applied by the member.
+    — is_self: indicator for the member the status was fetched from.
+    """
+
+    id: int
+    host: str
+    state: int
+    state_str: str
+    health: float
+    optime_date: Optional[datetime]
+    is_self: bool = False
+
+    @classmethod
+    def from_status(cls, member: Mapping) -> "ReplicaSetMember":
+        """Builds a member from an entry of the members list of replSetGetStatus."""
+        return cls(
+            id=member.get("_id"),
+            host=MongoDBConnection._hostname_from_hostport(member["name"]),
+            state=member.get("state"),
+            state_str=member["stateStr"],
+            health=member.get("health", 1),
+            optime_date=member.get("optimeDate"),
+            is_self=member.get("self", False),
         )
 
 
+@dataclass(frozen=True)
+class InitialSyncStatus:
+    """Progress of the initial sync of a member, as reported by the member itself.
+
+    — source: host the member copies its data from.
+    — progress: percentage of the data copied.
+    — elapsed: seconds since the initial sync started.
+    — remaining: estimated seconds until the initial sync completes.
+    """
+
+    source: Optional[str]
+    progress: Optional[float]
+    elapsed: Optional[float]
+    remaining: Optional[float]
+
+    @classmethod
+    def from_status(cls, rs_status: Mapping) -> Optional["InitialSyncStatus"]:
+        """Builds the initial sync status of a member, None if it is not in initial sync."""
+        initial_sync_status = rs_status.get("initialSyncStatus")
+        if not isinstance(initial_sync_status, Mapping):
+            return None
+
+        progress = None
+        total_size = initial_sync_status.get("approxTotalDataSize")
+        copied = initial_sync_status.get("approxTotalBytesCopied")
+        if total_size and copied is not None:
+            progress = min(100.0 * copied / total_size, 100.0)
+
+        elapsed = initial_sync_status.get("totalInitialSyncElapsedMillis")
+        remaining = initial_sync_status.get("remainingInitialSyncEstimatedMillis")
+        source = rs_status.get("syncSourceHost")
+        return cls(
+            source=MongoDBConnection._hostname_from_hostport(source) if source else None,
+            progress=progress,
+            elapsed=elapsed / 1000 if elapsed is not None else None,
+            remaining=remaining / 1000 if remaining is not None else None,
+        )
+
+
+@dataclass(frozen=True)
+class OplogWindow:
+    """Span and size of the oplog of a member.
+
+    — first: time of the oldest operation in the oplog.
+    — last: time of the newest operation in the oplog.
+    — size: bytes of operations held by the oplog.
+    — max_size: bytes the oplog is capped to.
+    """
+
+    first: datetime
+    last: datetime
+    size: int
+    max_size: int
+
+    @property
+    def window(self) -> float:
+        """Seconds of operations the oplog holds, the replication window of the member."""
+        return (self.last - self.first).total_seconds()
+
+    @property
+    def is_full(self) -> bool:
+        """Whether the oplog started to truncate its oldest operations."""
+        return self.size >= self.max_size * 0.9
+
+
+@dataclass(frozen=True)
+class ProfilingSettings:
+    """Settings of the database profiler of a member.
+
+    — level: 0 disables the profiler, 1 profiles the operations slower than slow_ms, 2 profiles
+      every operation.
+    — slow_ms: threshold, in milliseconds, of the slow operations, which are also logged.
+    — sample_rate: fraction of the slow operations which are profiled and logged.
+    """
+
+    level: int = 0
+    slow_ms: int = DEFAULT_SLOW_MS
+    sample_rate: float = 1.0
+
+    def __post_init__(self):
+        """Validates the settings.
+
+        Raises:
+            ValueError if a setting is out of the range mongod accepts.
+        """
+        if self.level not in PROFILING_LEVELS:
+            raise ValueError(f"Invalid profiler level: {self.level}")
+
+        if self.slow_ms < 0:
+            raise ValueError(f"Invalid slow operation threshold: {self.slow_ms}")
+
+        if not 0 <= self.sample_rate <= 1:
+            raise ValueError(f"Invalid slow operation sample rate: {self.sample_rate}")
+
+
+@dataclass(frozen=True)
+class SlowOperation:
+    """Operation recorded by the profiler of a member, or still running on it.
+
+    — op: type of the operation, i.e. query, update or command.
+    — ns: namespace the operation ran against.
+    — command: command of the operation, or the command which opened the cursor of a getMore.
+    — millis: duration of the operation, so far for operations still running.
+    — docs_examined: documents scanned by the operation, unknown for operations still running.
+    — returned: documents returned by the operation.
+    — plan_summary: summary of the query plan, i.e. "IXSCAN { a: 1 }" or "COLLSCAN".
+    — in_progress: whether the operation was still running.
+    """
+
+    op: str
+    ns: str
+    command: Mapping
+    millis: float
+    docs_examined: Optional[int]
+    returned: int
+    plan_summary: Optional[str]
+    in_progress: bool = False
+
+    @classmethod
+    def from_profile(cls, entry: Mapping) -> "SlowOperation":
+        """Builds an operation from a document of the system.profile collection."""
+        return cls(
+            op=entry.get("op", "unknown"),
+            ns=entry.get("ns", ""),
+            command=entry.get("originatingCommand") or entry.get("command") or {},
+            millis=float(entry.get("millis", 0)),
+            docs_examined=entry.get("docsExamined"),
+            returned=entry.get("nreturned", 0),
+            plan_summary=entry.get("planSummary"),
+        )
+
+    @classmethod
+    def from_current_op(cls, entry: Mapping) -> "SlowOperation":
+        """Builds an operation from a document returned by the $currentOp stage."""
+        return cls(
+            op=entry.get("op", "unknown"),
+            ns=entry.get("ns", ""),
+            command=entry.get("originatingCommand") or entry.get("command") or {},
+            millis=entry.get("microsecs_running", 0) / 1000,
+            docs_examined=None,
+            returned=0,
+            plan_summary=entry.get("planSummary"),
+            in_progress=True,
+        )
+
+
+@dataclass(frozen=True)
+class ReplicaSetTopology:
+    """Immutable snapshot of the replica set, fetched once and shared across a hook.
+
+    — members: state of every member of the replica set.
+    — config_version: version of the replica set configuration seen by the queried member.
+    — raw_status: replSetGetStatus document the snapshot was built from, to be treated as
+      read-only.
+    — initial_sync: initial sync status of the queried member, if it is in initial sync.
+    """
+
+    members: Tuple[ReplicaSetMember, ...]
+    config_version: Optional[int]
+    raw_status: Mapping = field(repr=False, compare=False)
+    initial_sync: Optional[InitialSyncStatus] = None
+
+    @classmethod
+    def from_status(cls, rs_status: Mapping) -> "ReplicaSetTopology":
+        """Builds a snapshot from a replSetGetStatus document."""
+        raw_members = rs_status["members"]
+        config_version = next(
+            (member.get("configVersion") for member in raw_members if member.get("self")),
+            None,
+        )
+        return cls(
+            members=tuple(ReplicaSetMember.from_status(member) for member in raw_members),
+            config_version=config_version,
+            raw_status=rs_status,
+            initial_sync=InitialSyncStatus.from_status(rs_status),
+        )
+
+    @property
+    def hosts(self) -> FrozenSet[str]:
+        """Hostnames of all replica set members."""
+        return frozenset(member.host for member in self.members)
+
+    @property
+    def states(self) -> Dict[str, str]:
+        """Replica set state of each member, keyed by hostname."""
+        return {member.host: member.state_str for member in self.members}
+
+    @property
+    def primary(self) -> Optional[str]:
+        """Hostname of the primary, None if the replica set has no primary."""
+        primary = None
+        for member in self.members:
+            if member.state_str == "PRIMARY":
+                primary = member.host
+
+        return primary
+
+    def member(self, host: str) -> Optional[ReplicaSetMember]:
+        """Returns the member with the provided hostname, None if it is not a member."""
+        return next((member for member in self.members if member.host == host), None)
+
+    def lag(self, host: str) -> Optional[float]:
+        """Seconds the member is behind the primary, None if it cannot be computed."""
+        member = self.member(host)
+        primary = self.member(self.primary) if self.primary else None
+        if not member or not primary or not member.optime_date or not primary.optime_date:
+            return None
+
+        return max((primary.optime_date - member.optime_date).total_seconds(), 0.0)
+
+
 class NotReadyError(PyMongoError):
     """Raised when not all replica set members healthy or finished initial sync."""
 
 
+class DeadlineExceededError(PyMongoError):
+    """Raised when gathered commands do not complete before the deadline."""
+
+
+@dataclass(frozen=True)
+class ProbeRecord:
+    """Outcome of a single readiness probe.
+
+    — target: host the probe was made against.
+    — ready: whether the server answered the probe.
+    — duration: seconds the probe took.
+    — attempts: number of pings sent.
+    """
+
+    target: str
+    ready: bool
+    duration: float
+    attempts: int
+
+
+class ReadinessProber:
+    """Probes MongoDB readiness with exponential backoff, within a deadline budget.
+
+    The budget is shared by all the probes made with the prober, so that a hook on a degraded unit
+    gives up after a bounded amount of time instead of waiting a full probe timeout per call.
+
+    When fail_fast is set, probes of the local server first run the provided precheck (i.e.
+    checking the service is active and its port is listening) and fail straight away if the server
+    is known to be down.
+    """
+
+    def __init__(
+        self,
+        budget: float = 60,
+        probe_timeout: float = 60,
+        initial_wait: float = 0.5,
+        max_wait: float = 8,
+        local_precheck: Optional[Callable[[], bool]] = None,
+        fail_fast: bool = False,
+    ):
+        self.deadline = time.monotonic() + budget
+        self.probe_timeout = probe_timeout
+        self.initial_wait = initial_wait
+        self.max_wait = max_wait
+        self.local_precheck = local_precheck
+        self.fail_fast = fail_fast
+        self.records: List[ProbeRecord] = []
+
+    @property
+    def remaining(self) -> float:
+        """Seconds left in the budget of the prober."""
+        return max(self.deadline - time.monotonic(), 0)
+
+    def probe(self, client: MongoClient, target: str = "", local: bool = False) -> bool:
+        """Returns True if the server answers a ping before the probe runs out of time.
+
+        The server is pinged at least once, even once the budget is spent, the single ping then
+        being bounded by the server selection timeout of the client.
+
+        Args:
+            client: client connected to the server to probe.
+            target: host being probed, used for reporting.
+            local: whether the probed server runs on this unit.
+        """
+        start = time.monotonic()
+        attempts = 0
+        ready = False
+        timeout = min(self.probe_timeout, self.remaining)
+        if local and self.fail_fast and self.local_precheck and not self.local_precheck():
+            logger.debug("Local MongoDB server is down, not probing it.")
+        else:
+            if timeout <= 0:
+                # a healthy server is still reported ready, a down one costs a single ping.
+                logger.debug("Readiness budget exhausted, pinging %s once.", target)
+            try:
+                for attempt in Retrying(
+                    stop=stop_after_delay(timeout),
+                    wait=wait_exponential_jitter(initial=self.initial_wait, max=self.max_wait),
+                ):
+                    with attempt:
+                        attempts += 1
+                        # The ping command is cheap and does not require auth.
+                        client.admin.command("ping")
+                ready = True
+            except RetryError:
+                ready = False
+
+        self.records.append(ProbeRecord(target, ready, time.monotonic() - start, attempts))
+        return ready
+
+
+class _HandshakeCounter(monitoring.ConnectionPoolListener):
+    """Counts pooled connections which completed the MongoDB handshake and authentication."""
+
+    def __init__(self):
+        self.handshakes = 0
+
+    def connection_ready(self, event):
+        """A connection finished its handshake (and authentication) and can be checked out."""
+        self.handshakes += 1
+
+    def pool_created(self, event):
+        """Not tracked."""
+
+    def pool_ready(self, event):
+        """Not tracked."""
+
+    def pool_cleared(self, event):
+        """Not tracked."""
+
+    def pool_closed(self, event):
+        """Not tracked."""
+
+    def connection_created(self, event):
+        """Not tracked."""
+
+    def connection_closed(self, event):
+        """Not tracked."""
+
+    def connection_check_out_started(self, event):
+        """Not tracked."""
+
+    def connection_check_out_failed(self, event):
+        """Not tracked."""
+
+    def connection_checked_out(self, event):
+        """Not tracked."""
+
+    def connection_checked_in(self, event):
+        """Not tracked."""
+
+
+class MongoClientRegistry:
+    """Registry of MongoClients shared for the lifetime of a single hook.
+
+    Building a MongoClient per MongoDBConnection/MongosConnection means rediscovering the
+    topology and authenticating (SCRAM) again for every call. While a registry is active, the
+    connection classes get their client from it instead, keyed by (URI, direct, TLS), so that
+    every caller in the hook reuses the same already discovered and authenticated pool.
+
+    The registry keeps track of the number of clients created, the number of handshakes performed
+    and the wall time of the hook, and logs them when the clients are closed:
+
+    with MongoClientRegistry.hook_scope():
+        main(MongodbOperatorCharm)
+    """
+
+    _active: Optional["MongoClientRegistry"] = None
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, bool, bool], MongoClient] = {}
+        # replica set snapshots taken in this hook, keyed by the id of the client used.
+        self.topologies: Dict[int, ReplicaSetTopology] = {}
+        # prober shared by every readiness check of the hook, a default one is used if unset.
+        self.prober: Optional[ReadinessProber] = None
+        self._handshake_counter = _HandshakeCounter()
+        # clients can be requested concurrently, i.e. by health checks fanned out to shards.
+        self._lock = threading.Lock()
+        self.clients_created = 0
+        self.clients_reused = 0
+        self.started_at = time.monotonic()
+        # monotonic time by which the commands gathered in this hook have to complete.
+        self.gather_deadline = self.started_at + GATHER_HOOK_TIMEOUT
+
+    @property
+    def handshakes(self) -> int:
+        """Number of connections which went through the handshake in this registry."""
+        return self._handshake_counter.handshakes
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds elapsed since the registry was activated."""
+        return time.monotonic() - self.started_at
+
+    @classmethod
+    def active(cls) -> Optional["MongoClientRegistry"]:
+        """Returns the registry of the current hook, None if clients are not shared."""
+        return cls._active
+
+    @classmethod
+    def activate(cls) -> "MongoClientRegistry":
+        """Starts sharing clients, closing the clients of any previously active registry."""
+        if cls._active:
+            cls._active.close_all()
+
+        cls._active = cls()
+        return cls._active
+
+    @classmethod
+    def hook_scope(cls) -> "_RegistryScope":
+        """Context manager activating a registry and closing all of its clients on exit."""
+        return _RegistryScope()
+
+    def get(self, uri: str, direct: bool = False, tls: bool = False) -> MongoClient:
+        """Returns the shared client for the provided connection parameters.
+
+        Args:
+            uri: MongoDB URI of the client.
+            direct: whether the client connects directly to a single host.
+            tls: whether the client connects using TLS.
+        """
+        key = (uri, direct, tls)
+        with self._lock:
+            if key in self._clients:
+                self.clients_reused += 1
+                return self._clients[key]
+
+            self.clients_created += 1
+            self._clients[key] = MongoClient(
+                uri,
+                directConnection=direct,
+                connect=False,
+                serverSelectionTimeoutMS=1000,
+                connectTimeoutMS=2000,
+                event_listeners=[self._handshake_counter],
+            )
+            return self._clients[key]
+
+    def close_all(self) -> None:
+        """Closes all the shared clients and stops sharing clients."""
+        for client in self._clients.values():
+            client.close()
+
+        self._clients.clear()
+        self.topologies.clear()
+        if MongoClientRegistry._active is self:
+            MongoClientRegistry._active = None
+
+        logger.debug(
+            "MongoClient registry closed: clients created=%d, reused=%d, handshakes=%d, "
+            "wall time=%.3fs",
+            self.clients_created,
+            self.clients_reused,
+            self.handshakes,
+            self.elapsed,
+        )
+        for record in self.prober.records if self.prober else []:
+            logger.debug(
+                "Readiness probe of %s: ready=%s, attempts=%d, took %.3fs",
+                record.target,
+                record.ready,
+                record.attempts,
+                record.duration,
+            )
+
+
+class _RegistryScope:
+    """Activates a MongoClientRegistry and closes all of its clients when leaving the scope."""
+
+    def __enter__(self) -> MongoClientRegistry:
+        """Activate a new registry."""
+        self.registry = MongoClientRegistry.activate()
+        return self.registry
+
+    def __exit__(self, object_type, value, traceback):
+        """Close all the clients of the registry."""
+        self.registry.close_all()
+
+
+def get_mongo_client(
+    uri: str, direct: bool = False, tls: bool = False
+) -> Tuple[MongoClient, bool]:
+    """Returns a client for the provided URI and whether it is shared through the registry."""
+    registry = MongoClientRegistry.active()
+    if registry:
+        return registry.get(uri, direct, tls), True
+
+    client = MongoClient(
+        uri,
+        directConnection=direct,
+        connect=False,
+        serverSelectionTimeoutMS=1000,
+        connectTimeoutMS=2000,
+    )
+    return client, False
+
+
+def gather(
+    calls: Sequence[Callable[[], Any]],
+    timeout: Optional[float] = None,
+    return_exceptions: bool = False,
+) -> List[Any]:
+    """Runs independent commands concurrently and returns their results in order.
+
+    This is the hook side counterpart of `asyncio.gather`: each call typically opens its own
+    connection to a different endpoint, i.e. one per shard, and the calls run on a bounded pool
+    of threads sharing the clients of the active registry.
+
+    Threads cannot be cancelled: the operations of the calls run with a client side timeout
+    (pymongo's timeoutMS) ending at the deadline, so that the calls still running when it passes
+    fail soon after. Their threads are only abandoned until then, the interpreter joins them
+    before the hook exits.
+
+    Args:
+        calls: callables without arguments, each running one or more commands.
+        timeout: seconds the calls have to complete. Defaults to what is left of the deadline
+            of the hook, see GATHER_HOOK_TIMEOUT, and at least MIN_GATHER_TIMEOUT.
+        return_exceptions: whether exceptions are returned in place of the results of failed
+            calls, rather than the first one being raised.
+
+    Raises:
+        DeadlineExceededError if the calls did not complete in time, or the exception of the
+        first failed call unless return_exceptions is set.
+    """
+    if not calls:
+        return []
+
+    if timeout is None:
+        registry = MongoClientRegistry.active()
+        deadline = registry.gather_deadline if registry else time.monotonic() + GATHER_HOOK_TIMEOUT
+        timeout = max(deadline - time.monotonic(), MIN_GATHER_TIMEOUT)
+
+    deadline = time.monotonic() + timeout
+    executor = ThreadPoolExecutor(max_workers=min(len(calls), MAX_CONCURRENT_COMMANDS))
+    futures = [executor.submit(_call_before, deadline, call) for call in calls]
+    _, not_done = wait(futures, timeout=timeout)
+    executor.shutdown(wait=False, cancel_futures=True)
+    if not_done:
+        raise DeadlineExceededError(
+            f"{len(not_done)} of {len(calls)} commands did not complete in {timeout:.1f}s"
+        )
+
+    results = []
+    for future in futures:
+        error = future.exception()
+        if error and not return_exceptions:
+            raise error
+        results.append(error or future.result())
+
+    return results
+
+
+def _call_before(deadline: float, call: Callable[[], Any]) -> Any:
+    """Runs a call whose operations time out at the given monotonic time.
+
+    Raises:
+        DeadlineExceededError if the deadline passed before the call started.
+    """
+    remaining = deadline - time.monotonic()
+    # a timeout of 0 disables the client side timeout of pymongo altogether
+    if remaining <= 0:
+        raise DeadlineExceededError("the deadline passed before the command was sent")
+
+    with pymongo.timeout(remaining):
+        return call()
+
+
 class MongoDBConnection:
     """In this class we create connection object to MongoDB.
 
@@ -102,7 +751,8 @@ class MongoDBConnection:
     and reuse the same connection for an actual query later in the code.
 
     Connection is automatically closed when object destroyed.
-    Automatic close allows to have more clean code.
+    Automatic close allows to have more clean code. When a MongoClientRegistry is active the
+    client is shared with the rest of the hook and is closed by the registry instead.
 
     Note that connection when used may lead to the following pymongo errors: ConfigurationError,
     ConfigurationError, OperationFailure. It is suggested that the following pattern be adopted
@@ -129,13 +779,14 @@ class MongoDBConnection:
         if uri is None:
             uri = config.uri
 
-        self.client = MongoClient(
-            uri,
-            directConnection=direct,
-            connect=False,
-            serverSelectionTimeoutMS=1000,
-            connectTimeoutMS=2000,
-        )
+        self._uri = uri
+        self._direct = direct
+
+        self.client, self._shared_client = get_mongo_client(uri, direct, config.tls_external)
+
+        # share replica set snapshots with the rest of the hook along with the client.
+        registry = MongoClientRegistry.active()
+        self._topologies = registry.topologies if self._shared_client else {}
         return
 
     def __enter__(self):
@@ -144,7 +795,8 @@ class MongoDBConnection:
 
     def __exit__(self, object_type, value, traceback):
         """Disconnect from MongoDB client."""
-        self.client.close()
+        if not self._shared_client:
+            self.client.close()
         self.client = None
 
     @property
@@ -152,21 +804,28 @@ class MongoDBConnection:
         """Is the MongoDB server ready for services requests.
 
         Returns:
-            True if services is ready False otherwise. Retries over a period of 60 seconds times to
-            allow server time to start up.
+            True if services is ready False otherwise. Retries with an exponential backoff, for
+            up to 60 seconds or the readiness budget left in the hook, to allow server time to
+            start up.
 
         Raises:
             ConfigurationError, ConfigurationError, OperationFailure
         """
-        try:
-            for attempt in Retrying(stop=stop_after_delay(60), wait=wait_fixed(3)):
-                with attempt:
-                    # The ping command is cheap and does not require auth.
-                    self.client.admin.command("ping")
-        except RetryError:
-            return False
+        registry = MongoClientRegistry.active()
+        prober = registry.prober if registry and registry.prober else ReadinessProber()
 
-        return True
+        host = self._get_probed_host()
+        local = self._direct and host in ("localhost", "127.0.0.1")
+        return prober.probe(self.client, target=host, local=local)
+
+    def _get_probed_host(self) -> str:
+        """Returns the host the client connects to first, i.e. the only one if direct."""
+        if "://" not in self._uri:
+            # a bare host, i.e. "localhost", as accepted by MongoClient
+            return self._hostname_from_hostport(self._uri.split(",")[0])
+
+        host, _ = uri_parser.parse_uri(self._uri)["nodelist"][0]
+        return host
 
     @retry(
         stop=stop_after_attempt(3),
@@ -186,6 +845,7 @@ class MongoDBConnection:
         }
         try:
             self.client.admin.command("replSetInitiate", config)
+            self.invalidate_topology()
         except OperationFailure as e:
             if e.code not in (13, 23):  # Unauthorized, AlreadyInitialized
                 # Unauthorized error can be raised only if initial user were
@@ -195,22 +855,174 @@ class MongoDBConnection:
                 logger.error("Cannot initialize replica set. error=%r", e)
                 raise e
 
-    def get_replset_status(self) -> Dict:
+    def get_topology(self, refresh: bool = False) -> ReplicaSetTopology:
+        """Get a snapshot of the replica set topology.
+
+        The snapshot is shared with every connection of the hook using the same client, until it
+        is invalidated by a reconfiguration of the replica set. Code waiting for the replica set
+        to change must refresh it on each attempt.
+
+        Args:
+            refresh: fetch a new snapshot even if one is already available.
+
+        Raises:
+            ConfigurationError, ConfigurationError, OperationFailure
+        """
+        key = id(self.client)
+        topology = self._topologies.get(key)
+        if refresh or not topology:
+            rs_status = self.client.admin.command("replSetGetStatus")
+            self._topologies[key] = ReplicaSetTopology.from_status(rs_status)
+
+        return self._topologies[key]
+
+    def invalidate_topology(self) -> None:
+        """Drop the replica set snapshots, needed once the replica set has changed."""
+        self._topologies.clear()
+
+    def get_initial_sync_status(self) -> Optional[InitialSyncStatus]:
+        """Get the source, progress and timing of the initial sync of the member.
+
+        Only the member doing its initial sync reports its progress, this should therefore be
+        called with a direct connection to that member.
+
+        Returns:
+            The status of the initial sync, None if the member is not in initial sync.
+
+        Raises:
+            ConfigurationError, ConfigurationError, OperationFailure
+        """
+        return self.get_topology().initial_sync
+
+    def get_oplog_window(self) -> Optional[OplogWindow]:
+        """Get the span and size of the oplog of the member.
+
+        Each member has its own oplog, this should therefore be called with a direct connection
+        to the member of interest.
+
+        Returns:
+            The window of the oplog, None if the oplog is empty.
+
+        Raises:
+            ConfigurationError, ConfigurationError, OperationFailure
+        """
+        oplog = self.client.local["oplog.rs"]
+        projection = {"_id": 0, "ts": 1}
+        first = oplog.find_one({}, projection, sort=[("$natural", 1)])
+        last = oplog.find_one({}, projection, sort=[("$natural", -1)])
+        if not first or not last:
+            return None
+
+        stats = self.client.local.command("collStats", "oplog.rs")
+        return OplogWindow(
+            first=first["ts"].as_datetime(),
+            last=last["ts"].as_datetime(),
+            size=int(stats["size"]),
+            max_size=int(stats["maxSize"]),
+        )
+
+    def resize_oplog(self, size: float) -> None:
+        """Resizes the oplog of the member, online.
+
+        Args:
+            size: the new maximum size of the oplog, in megabytes.
+        """
+        self.client.admin.command("replSetResizeOplog", 1, size=size)
+
+    def get_server_parameters(self, names: Iterable[str]) -> Dict[str, Any]:
+        """Returns the current value of server parameters, keyed by name.
+
+        Raises:
+            ConfigurationError, ConfigurationError, OperationFailure
+        """
+        names = list(names)
+        result = self.client.admin.command("getParameter", 1, **{name: 1 for name in names})
+        return {name: result.get(name) for name in names}
+
+    def set_server_parameters(self, parameters: Dict[str, Any]) -> None:
+        """Sets server parameters at runtime, on the member the client is connected to.
+
+        Only parameters which are runtime settable can be set, the others are rejected by mongod.
+
+        Raises:
+            ConfigurationError, ConfigurationError, OperationFailure
+        """
+        self.client.admin.command("setParameter", 1, **parameters)
+
+    def set_profiling(self, settings: ProfilingSettings) -> bool:
+        """Applies the settings of the profiler to the member, where they differ.
+
+        The slow operation threshold and sample rate are global to the member, the level is set
+        on each of its non-default databases. Databases created afterwards use the level of the
+        operationProfiling.mode mongod was started with.
+
+        Returns:
+            whether any setting changed.
+
+        Raises:
+            ConfigurationError, ConfigurationError, OperationFailure
+        """
+        changed = False
+        current = self.client.admin.command("profile", -1)
+        if (current.get("slowms"), current.get("sampleRate")) != (
+            settings.slow_ms,
+            settings.sample_rate,
+        ):
+            self.client.admin.command(
+                "profile", -1, slowms=settings.slow_ms, sampleRate=settings.sample_rate
+            )
+            changed = True
+
+        for database in sorted(self.get_databases()):
+            if self.client[database].command("profile", -1).get("was") != settings.level:
+                self.client[database].command("profile", settings.level)
+                changed = True
+
+        return changed
+
+    def get_slow_operations(self, slow_ms: int) -> List[SlowOperation]:
+        """Returns the operations profiled on the member, and those running for over slow_ms.
+
+        Each member has its own profiler, this should therefore be called with a direct
+        connection to the member of interest. Operations on the default databases, including the
+        reads of the profiler itself, are left out.
+
+        Raises:
+            ConfigurationError, ConfigurationError, OperationFailure
+        """
+        operations = []
+        for database in sorted(self.get_databases()):
+            profile = self.client[database]["system.profile"].find(
+                {"ns": {"$ne": f"{database}.system.profile"}}
+            )
+            operations.extend(SlowOperation.from_profile(entry) for entry in profile)
+
+        current_ops = self.client.admin.aggregate(
+            [
+                {"$currentOp": {"allUsers": True, "idleConnections": False}},
+                {"$match": {"active": True, "microsecs_running": {"$gte": slow_ms * 1000}}},
+            ]
+        )
+        operations.extend(
+            SlowOperation.from_current_op(entry)
+            for entry in current_ops
+            if entry.get("ns", "").partition(".")[0] not in ("", *SYSTEM_DATABASES)
+        )
+        return operations
+
+    def get_replset_status(self, refresh: bool = False) -> Dict:
         """Get a replica set status as a dict.
 
+        Args:
+            refresh: fetch a new snapshot of the replica set rather than the one of the hook.
+
         Returns:
             A set of the replica set members along with their status.
 
         Raises:
             ConfigurationError, ConfigurationError, OperationFailure
         """
-        rs_status = self.client.admin.command("replSetGetStatus")
-        rs_status_parsed = {}
-        for member in rs_status["members"]:
-            member_name = self._hostname_from_hostport(member["name"])
-            rs_status_parsed[member_name] = member["stateStr"]
-
-        return rs_status_parsed
+        return self.get_topology(refresh=refresh).states
 
     def get_replset_members(self) -> Set[str]:
         """Get a replica set members.
@@ -221,11 +1033,23 @@ class MongoDBConnection:
         Raises:
             ConfigurationError, ConfigurationError, OperationFailure
         """
-        rs_status = self.client.admin.command("replSetGetStatus")
-        curr_members = [
-            self._hostname_from_hostport(member["name"]) for member in rs_status["members"]
-        ]
-        return set(curr_members)
+        return set(self.get_topology().hosts)
+
+    def get_electable_members(self) -> Set[str]:
+        """Get the members which can become primary, those with a vote and a priority.
+
+        Members added without a vote, until they are promoted or for good past the limit of
+        voting members, have a priority of 0 and are never elected.
+
+        Raises:
+            ConfigurationError, ConfigurationError, OperationFailure
+        """
+        rs_config = self.client.admin.command("replSetGetConfig")["config"]
+        return {
+            self._hostname_from_hostport(member["host"])
+            for member in rs_config["members"]
+            if member.get("votes", 1) and member.get("priority", 1)
+        }
 
     def add_replset_member(self, hostname: str) -> None:
         """Add a new member to replica set config inside MongoDB.
@@ -233,26 +1057,89 @@ class MongoDBConnection:
         Raises:
             ConfigurationError, ConfigurationError, OperationFailure, NotReadyError
         """
+        self.add_replset_members({hostname})
+
+    def add_replset_members(self, hostnames: Set[str]) -> None:
+        """Add new members to replica set config inside MongoDB, with a single reconfig.
+
+        Members join as non-voting members with priority 0, so that adding several of them at
+        once is a safe reconfiguration and that they cannot affect elections or write concern
+        majority while syncing. They are given a vote by promote_replset_members once they are
+        SECONDARY.
+
+        Raises:
+            ConfigurationError, ConfigurationError, OperationFailure, NotReadyError
+        """
+        if not hostnames:
+            return
+
         rs_config = self.client.admin.command("replSetGetConfig")
-        rs_status = self.client.admin.command("replSetGetStatus")
+        topology = self.get_topology()
 
         # When we add a new member, MongoDB transfer data from existing member to new.
         # Such operation reduce performance of the cluster. To avoid huge performance
         # degradation, before adding new members, it is needed to check that all other
         # members finished init sync.
-        if self.is_any_sync(rs_status):
+        if self.is_any_sync(topology.raw_status):
             # it can take a while, we should defer
+            self.invalidate_topology()
             raise NotReadyError
 
         # Avoid reusing IDs, according to the doc
         # https://www.mongodb.com/docs/manual/reference/replica-configuration/
         max_id = max([int(member["_id"]) for member in rs_config["config"]["members"]])
-        new_member = {"_id": int(max_id + 1), "host": hostname}
+        new_members = [
+            {"_id": int(max_id + 1 + offset), "host": hostname, "votes": 0, "priority": 0}
+            for offset, hostname in enumerate(sorted(hostnames))
+        ]
 
         rs_config["config"]["version"] += 1
-        rs_config["config"]["members"].extend([new_member])
+        rs_config["config"]["members"].extend(new_members)
         logger.debug("rs_config: %r", rs_config["config"])
         self.client.admin.command("replSetReconfig", rs_config["config"])
+        self.invalidate_topology()
+
+    def promote_replset_members(self, max_lag: Optional[float] = None) -> Set[str]:
+        """Give a vote to the non-voting members which finished their initial sync.
+
+        MongoDB only allows a single voting member to be added per reconfig, members are therefore
+        promoted one reconfig at a time, for as long as the replica set has less than 7 voters.
+
+        Args:
+            max_lag: seconds a member can be behind the primary to be promoted, members are
+                promoted regardless of their lag if not provided.
+
+        Returns:
+            The hosts of the promoted members.
+
+        Raises:
+            ConfigurationError, ConfigurationError, OperationFailure
+        """
+        promoted = set()
+        while True:
+            rs_config = self.client.admin.command("replSetGetConfig")["config"]
+            states = self.get_topology().states
+            voters = [member for member in rs_config["members"] if member.get("votes", 1)]
+            candidates = [
+                member
+                for member in rs_config["members"]
+                if not member.get("votes", 1)
+                and states.get(self._hostname_from_hostport(member["host"])) == "SECONDARY"
+                and self._is_caught_up(self._hostname_from_hostport(member["host"]), max_lag)
+            ]
+            if not candidates or len(voters) >= MAX_VOTING_MEMBERS:
+                return promoted
+
+            member = min(candidates, key=lambda member: member["_id"])
+            member["votes"] = 1
+            member["priority"] = 1
+            rs_config["version"] += 1
+            logger.debug(
+                "Promoting %s to a voting member, rs_config: %r", member["host"], rs_config
+            )
+            self.client.admin.command("replSetReconfig", rs_config)
+            self.invalidate_topology()
+            promoted.add(self._hostname_from_hostport(member["host"]))
 
     @retry(
         stop=stop_after_attempt(20),
@@ -267,7 +1154,8 @@ class MongoDBConnection:
             ConfigurationError, ConfigurationError, OperationFailure, NotReadyError
         """
         rs_config = self.client.admin.command("replSetGetConfig")
-        rs_status = self.client.admin.command("replSetGetStatus")
+        # each attempt of the retry needs a fresh snapshot.
+        rs_status = self.get_topology(refresh=True).raw_status
 
         # When we remove member, to avoid issues when majority members is removed, we need to
         # remove next member only when MongoDB forget the previous removed member.
@@ -279,7 +1167,7 @@ class MongoDBConnection:
         # avoid downtime we need to reelect new primary if removable member is the primary.
         logger.debug("primary: %r", self._is_primary(rs_status, hostname))
         if self._is_primary(rs_status, hostname):
-            self.client.admin.command("replSetStepDown", {"stepDownSecs": "60"})
+            self.step_down_primary()
 
         rs_config["config"]["version"] += 1
         rs_config["config"]["members"][:] = [
@@ -289,42 +1177,136 @@ class MongoDBConnection:
         ]
         logger.debug("rs_config: %r", dumps(rs_config["config"]))
         self.client.admin.command("replSetReconfig", rs_config["config"])
+        self.invalidate_topology()
 
     def step_down_primary(self) -> None:
         """Steps down the current primary, forcing a re-election."""
         self.client.admin.command("replSetStepDown", {"stepDownSecs": "60"})
+        self.invalidate_topology()
 
-    def move_primary(self, new_primary_ip: str) -> None:
-        """Forcibly moves the primary to the new primary provided.
+    def move_primary(
+        self, new_primary_ip: str, max_lag: Optional[float] = MOVE_PRIMARY_MAX_LAG
+    ) -> float:
+        """Moves the primary to the member provided, within a single election.
+
+        The other secondaries are frozen so that they do not run for election, and the primary
+        steps down once the new primary caught up with it. The members are unfrozen once the
+        election is over, whatever its outcome.
 
         Args:
             new_primary_ip: ip address of the unit chosen to be the new primary.
+            max_lag: seconds the new primary can be behind the primary when it is handed over,
+                None to leave it to the catch up period of the step down.
+
+        Returns:
+            seconds from the step down of the old primary to the election of the new one.
+
+        Raises:
+            NotReadyError if the replica set is syncing, or the new primary has no vote or
+            priority or is lagging behind, FailedToMovePrimaryError if it was not elected.
         """
-        # Do not move a priary unless the cluster is in sync
-        rs_status = self.client.admin.command("replSetGetStatus")
-        if self.is_any_sync(rs_status):
+        topology = self.get_topology(refresh=True)
+        # Do not move a primary unless the cluster is in sync
+        if self.is_any_sync(topology.raw_status):
             # it can take a while, we should defer
             raise NotReadyError
 
-        is_move_successful = True
-        self.set_replicaset_election_priority(priority=0.5, ignore_member=new_primary_ip)
+        if topology.primary == new_primary_ip:
+            return 0.0
+
+        if new_primary_ip not in self.get_electable_members():
+            logger.info("Not moving the primary to %s, it cannot be elected.", new_primary_ip)
+            raise NotReadyError
+
+        if topology.states.get(new_primary_ip) != "SECONDARY" or not self._is_caught_up(
+            new_primary_ip, max_lag
+        ):
+            logger.info("Not moving the primary to %s, it is lagging behind.", new_primary_ip)
+            raise NotReadyError
+
+        frozen_members = [
+            member.host
+            for member in topology.members
+            if member.state_str == "SECONDARY" and member.host != new_primary_ip
+        ]
+        started_at = time.monotonic()
         try:
-            for attempt in Retrying(stop=stop_after_delay(180), wait=wait_fixed(3)):
-                with attempt:
-                    self.step_down_primary()
-                    if self.primary() != new_primary_ip:
-                        raise FailedToMovePrimaryError
-        except RetryError:
-            # catch all possible exceptions when failing to step down primary. We do this in order
-            # to ensure that we reset the replica set election priority.
-            is_move_successful = False
-
-        # reset all replicas to the same priority
-        self.set_replicaset_election_priority(priority=1)
-
-        if not is_move_successful:
+            self._freeze_members(frozen_members, STEP_DOWN_SECS)
+            try:
+                self.client.admin.command(
+                    "replSetStepDown",
+                    STEP_DOWN_SECS,
+                    secondaryCatchUpPeriodSecs=STEP_DOWN_CATCH_UP_SECS,
+                )
+            except AutoReconnect:
+                # older servers close the connections of the primary when it steps down.
+                pass
+
+            new_primary = self._wait_for_election()
+        except PyMongoError as e:
+            logger.error("Failed to move the primary to %s, error=%r", new_primary_ip, e)
+            raise FailedToMovePrimaryError from e
+        finally:
+            self.invalidate_topology()
+            self._unfreeze_members(frozen_members)
+
+        if new_primary != new_primary_ip:
+            logger.error("Failed to move the primary to %s, %s won", new_primary_ip, new_primary)
             raise FailedToMovePrimaryError
 
+        latency = time.monotonic() - started_at
+        logger.info("Moved the primary to %s in %.2fs.", new_primary_ip, latency)
+        return latency
+
+    def _freeze_members(self, hosts: Iterable[str], seconds: int) -> None:
+        """Prevents the members from running for election for the provided seconds.
+
+        replSetFreeze only applies to the member running it, each member is therefore sent the
+        command over a direct connection of its own.
+        """
+        for host in hosts:
+            config = replace(self.mongodb_config, hosts={host})
+            with MongoDBConnection(config, direct=True) as mongo:
+                mongo.client.admin.command("replSetFreeze", seconds)
+
+    def _unfreeze_members(self, hosts: Iterable[str]) -> None:
+        """Lets the members run for election again, they are unfrozen anyway once it expires."""
+        try:
+            self._freeze_members(hosts, 0)
+        except PyMongoError as e:
+            logger.warning("Failed to unfreeze members, they unfreeze on their own. error=%r", e)
+
+    def _wait_for_election(self) -> Optional[str]:
+        """Waits for a primary to be elected and returns its hostname.
+
+        Raises:
+            NotReadyError if no primary was elected in time.
+        """
+        for attempt in Retrying(
+            stop=stop_after_delay(ELECTION_TIMEOUT),
+            wait=wait_fixed(ELECTION_CHECK_INTERVAL),
+            retry=retry_if_exception_type((NotReadyError, AutoReconnect)),
+            reraise=True,
+        ):
+            with attempt:
+                primary = self.get_topology(refresh=True).primary
+                if primary is None:
+                    raise NotReadyError
+
+        return primary
+
+    def _is_caught_up(self, hostname: str, max_lag: Optional[float]) -> bool:
+        """Returns True if the member is behind the primary by at most max_lag seconds."""
+        if max_lag is None:
+            return True
+
+        lag = self.get_topology().lag(hostname)
+        if lag is None or lag > max_lag:
+            logger.debug("Not promoting %s yet, lag: %s, max lag: %s", hostname, lag, max_lag)
+            return False
+
+        return True
+
     def set_replicaset_election_priority(self, priority: int, ignore_member: str = None) -> None:
         """Set the election priority for the entire replica set."""
         rs_config = self.client.admin.command("replSetGetConfig")
@@ -337,7 +1319,8 @@ class MongoDBConnection:
         original_rs_config = rs_config
 
         for member in rs_config["members"]:
-            if member["host"] == ignore_member:
+            # non-voting members must keep a priority of 0
+            if member["host"] == ignore_member or not member.get("votes", 1):
                 continue
 
             member["priority"] = priority
@@ -347,6 +1330,7 @@ class MongoDBConnection:
 
         logger.debug("rs_config: %r", rs_config)
         self.client.admin.command("replSetReconfig", rs_config)
+        self.invalidate_topology()
 
     def create_user(self, config: MongoDBConfiguration):
         """Create user.
@@ -425,29 +1409,55 @@ class MongoDBConnection:
         """Drop user."""
         self.client.admin.command("dropUser", username)
 
+    def iter_users(self, batch_size: int = USERS_BATCH_SIZE) -> Iterator[Dict]:
+        """Yields the relation users with their roles, streamed from the server in batches.
+
+        usersInfo replies with all the users in a single document, hence the users collection
+        is read through a cursor instead. Credentials and privileges are never sent.
+        """
+        with self.client.admin["system.users"].find(
+            {"db": "admin", "user": {"$regex": RELATION_USER_PATTERN}},
+            projection={"_id": 0, "user": 1, "roles": 1},
+            batch_size=batch_size,
+        ) as cursor:
+            yield from cursor
+
     def get_users(self) -> Set[str]:
-        """Add a new member to replica set config inside MongoDB."""
-        users_info = self.client.admin.command("usersInfo")
-        return set(
-            [
-                user_obj["user"]
-                for user_obj in users_info["users"]
-                if re.match(r"^relation-\d+$", user_obj["user"])
-            ]
+        """Returns the names of the relation users."""
+        return {user_obj["user"] for user_obj in self.iter_users()}
+
+    def get_users_roles(self, usernames: Iterable[str]) -> Dict[str, List[Dict]]:
+        """Returns the roles granted to each of the provided users, with a single usersInfo."""
+        users_info = self.client.admin.command(
+            "usersInfo",
+            [{"user": username, "db": "admin"} for username in usernames],
+            showCredentials=False,
+            showPrivileges=False,
         )
+        return {user_obj["user"]: user_obj["roles"] for user_obj in users_info["users"]}
 
     def get_databases(self) -> Set[str]:
         """Return list of all non-default databases."""
-        system_dbs = ("admin", "local", "config")
-        databases = self.client.list_database_names()
-        return set([db for db in databases if db not in system_dbs])
-
-    def drop_database(self, database: str):
-        """Drop a non-default database."""
-        system_dbs = ("admin", "local", "config")
-        if database in system_dbs:
-            return
-        self.client.drop_database(database)
+        databases = self.client.admin.command(
+            "listDatabases",
+            nameOnly=True,
+            filter={"name": {"$nin": list(SYSTEM_DATABASES)}},
+        )
+        return {database["name"] for database in databases["databases"]}
+
+    def drop_database(self, database: str) -> int:
+        """Drop a non-default database.
+
+        The drop is acknowledged by a majority of the members, so that it is not rolled back.
+
+        Returns:
+            the bytes the database used on disk, for its data and indexes.
+        """
+        if database in SYSTEM_DATABASES:
+            return 0
+        db_stats = self.client[database].command("dbStats")
+        self.client[database].command("dropDatabase", writeConcern={"w": "majority"})
+        return int(db_stats.get("storageSize", 0)) + int(db_stats.get("indexSize", 0))
 
     def _is_primary(self, rs_status: Dict, hostname: str) -> bool:
         """Returns True if passed host is the replica set primary.
@@ -462,18 +1472,9 @@ class MongoDBConnection:
             for member in rs_status["members"]
         )
 
-    def primary(self) -> str:
-        """Returns primary replica host."""
-        status = self.client.admin.command("replSetGetStatus")
-
-        primary = None
-        # loop through all members in the replica set
-        for member in status["members"]:
-            # check replica's current state
-            if member["stateStr"] == "PRIMARY":
-                primary = self._hostname_from_hostport(member["name"])
-
-        return primary
+    def primary(self, refresh: bool = False) -> str:
+        """Returns primary replica host, from a new snapshot if refresh is set."""
+        return self.get_topology(refresh=refresh).primary
 
     @staticmethod
     def is_any_sync(rs_status: Dict) -> bool:
@@ -7,15 +7,18 @@ This class creates a user and database for each application relation
 and expose needed information for client connection via fields in
 external relation.
 """
+import hashlib
 import json
 import logging
 import re
+import time
 from collections import namedtuple
-from typing import List, Optional, Set
+from functools import partial
+from typing import Dict, List, Optional, Set
 
 from charms.data_platform_libs.v0.data_interfaces import DatabaseProvides
-from charms.mongodb.v1.helpers import generate_password
-from charms.mongodb.v1.mongodb import MongoDBConfiguration, MongoDBConnection
+from charms.mongodb.v1.helpers import generate_password, parse_connection_options
+from charms.mongodb.v1.mongodb import MongoDBConfiguration, MongoDBConnection, gather
 from ops.charm import CharmBase, EventBase, RelationBrokenEvent, RelationChangedEvent
 from ops.framework import Object
 from ops.model import Relation
@@ -31,7 +34,7 @@ LIBAPI = 1
 
 # Increment this PATCH version before using `charmcraft publish-lib` or reset
 # to 0 if you are raising the major API version
-LIBPATCH = 8
+LIBPATCH = 14
 
 logger = logging.getLogger(__name__)
 REL_NAME = "database"
@@ -42,6 +45,14 @@ MONGOS_RELATIONS = "cluster"
 MONGODB_PORT = 27017
 MONGODB_VERSION = "5.0"
 PEER = "database-peers"
+# digests of the roles granted to each relation user, as last reconciled with the database.
+USER_ROLES_DIGESTS_KEY = "user-roles-digests"
+# endpoints last published to each relation user, with whether the user was created.
+PUBLISHED_ENDPOINTS_KEY = "published-endpoints"
+# databases of removed relations waiting to be dropped, with the time they were queued at.
+DATABASES_TO_DROP_KEY = "databases-to-drop"
+# totals of the databases dropped by the cleanup queue.
+DROPPED_DATABASES_KEY = "dropped-databases"
 
 Diff = namedtuple("Diff", "added changed deleted")
 Diff.__doc__ = """
@@ -51,6 +62,43 @@ changed — keys that still exist but have new values
 deleted — key that were deleted."""
 
 
+class RelationDataBuffer:
+    """Write buffer over the application databags of the client relations.
+
+    Fields are collected per relation and written with a single update per relation when the
+    buffer is flushed, leaving out the fields which already hold the same value. Every update is
+    a relation-set (and possibly a secret) round trip to the Juju controller.
+    """
+
+    def __init__(self, database_provides: DatabaseProvides):
+        self.database_provides = database_provides
+        self._pending: Dict[int, Dict[str, str]] = {}
+
+    def update(self, relation_id: int, data: Dict[str, str]) -> None:
+        """Buffers fields to write to the databag of a relation."""
+        self._pending.setdefault(relation_id, {}).update(data)
+
+    def fetch_field(self, relation_id: int, field: str) -> Optional[str]:
+        """Returns a field of the databag of a relation, including buffered writes."""
+        if field in self._pending.get(relation_id, {}):
+            return self._pending[relation_id][field]
+
+        return self.database_provides.fetch_my_relation_field(relation_id, field)
+
+    def flush(self) -> None:
+        """Writes the buffered fields whose values changed, once per relation."""
+        pending, self._pending = self._pending, {}
+        for relation_id, data in pending.items():
+            current_data = (
+                self.database_provides.fetch_my_relation_data([relation_id], list(data)) or {}
+            ).get(relation_id, {})
+            changed_data = {
+                field: value for field, value in data.items() if current_data.get(field) != value
+            }
+            if changed_data:
+                self.database_provides.update_relation_data(relation_id, changed_data)
+
+
 class MongoDBProvider(Object):
     """In this class, we manage client database relations."""
 
@@ -80,10 +128,17 @@ class MongoDBProvider(Object):
 
         # Charm events defined in the database provides charm library.
         self.database_provides = DatabaseProvides(self.charm, relation_name=self.relation_name)
+        self.relation_data = RelationDataBuffer(self.database_provides)
+        # writes which were not flushed by the handler that made them are flushed with the hook.
+        self.framework.observe(self.framework.on.pre_commit, self._on_pre_commit)
         self.framework.observe(
             self.database_provides.on.database_requested, self._on_relation_event
         )
 
+    def _on_pre_commit(self, _) -> None:
+        if self.charm.unit.is_leader():
+            self.relation_data.flush()
+
     def pass_hook_checks(self, event: EventBase) -> bool:
         """Runs the pre-hooks checks for MongoDBProvider, returns True if all pass."""
         # We shouldn't try to create or update users if the database is not
@@ -164,40 +219,261 @@ class MongoDBProvider(Object):
         relation is still on the list of all relations. Therefore, for proper
         work of the function, we need to exclude departed relation from the list.
         """
+        try:
+            self._oversee_users(departed_relation_id, event)
+            # the URIs of existing users are republished when their connection options changed
+            self.update_app_relation_data()
+        finally:
+            self.relation_data.flush()
+
+    def _oversee_users(self, departed_relation_id: Optional[int], event) -> None:
+        """Creates, updates and drops the users and databases of the client relations."""
         with MongoDBConnection(self.charm.mongodb_config) as mongo:
             database_users = mongo.get_users()
             relation_users = self._get_users_from_relations(departed_relation_id)
+            roles_digests = self._get_roles_digests()
+            published_endpoints = self._get_published_endpoints()
 
-            for username in database_users - relation_users:
+            removed_users = sorted(database_users - relation_users)
+            for username in removed_users:
                 logger.info("Remove relation user: %s", username)
-                mongo.drop_user(username)
-
-            for username in relation_users - database_users:
-                config = self._get_config(username, None)
-                if config.database is None:
-                    # We need to wait for the moment when the provider library
-                    # set the database name into the relation.
-                    continue
-                logger.info("Create relation user: %s on %s", config.username, config.database)
-
-                mongo.create_user(config)
-                self._set_relation(config)
-
-            for username in relation_users.intersection(database_users):
-                config = self._get_config(username, None)
-                logger.info("Update relation user: %s on %s", config.username, config.database)
-                mongo.update_user(config)
+            # the users are independent, the commands of all of them are sent at once
+            gather([partial(mongo.drop_user, username) for username in removed_users])
+            for username in removed_users:
+                roles_digests.pop(username, None)
+                published_endpoints.pop(username, None)
+
+            errors = self._create_users(
+                mongo, relation_users - database_users, roles_digests, published_endpoints
+            )
+
+            existing_users = relation_users.intersection(database_users)
+            if existing_users:
+                self._update_users(mongo, existing_users, roles_digests)
                 logger.info("Updating relation data according to diff")
                 self._diff(event)
 
+            for username in existing_users:
+                self._record_published_endpoints(published_endpoints, username, None)
+
+            self._set_roles_digests(roles_digests)
+            self._set_published_endpoints(published_endpoints)
+            if errors:
+                raise errors[0]
+
             if not self.charm.model.config["auto-delete"]:
+                self._set_databases_to_drop({})
                 return
 
             database_dbs = mongo.get_databases()
             relation_dbs = self._get_databases_from_relations(departed_relation_id)
-            for database in database_dbs - relation_dbs:
-                logger.info("Drop database: %s", database)
-                mongo.drop_database(database)
+            self._queue_databases_to_drop(database_dbs - relation_dbs)
+            self._drop_queued_databases(mongo, database_dbs, relation_dbs)
+
+    def drop_queued_databases(self) -> None:
+        """Drops the queued databases whose grace period expired.
+
+        Databases of removed relations are queued by `oversee_users` and dropped by the leader,
+        either right away or, with a grace period, by a later update-status hook.
+        """
+        if not self.charm.unit.is_leader() or not self.charm.db_initialised:
+            return
+
+        if not self._get_databases_to_drop():
+            return
+
+        if not self.charm.model.config["auto-delete"]:
+            logger.info("auto-delete is disabled, clearing the queue of databases to drop.")
+            self._set_databases_to_drop({})
+            return
+
+        with MongoDBConnection(self.charm.mongodb_config) as mongo:
+            self._drop_queued_databases(
+                mongo, mongo.get_databases(), self._get_databases_from_relations(None)
+            )
+
+    def get_cleanup_status(self) -> Dict[str, str]:
+        """Returns the databases waiting to be dropped and the totals of the dropped ones.
+
+        The pending databases are mapped to what is left of their grace period.
+        """
+        grace_period = self.charm.model.config["auto-delete-grace-period"]
+        now = time.time()
+        pending = {
+            database: f"{max(0, queued_at + grace_period - now):.0f}s"
+            for database, queued_at in sorted(self._get_databases_to_drop().items())
+        }
+        dropped = json.loads(self.charm.app_peer_data.get(DROPPED_DATABASES_KEY, "{}"))
+        return {
+            "pending": json.dumps(pending),
+            "dropped": str(dropped.get("count", 0)),
+            "bytes-reclaimed": str(dropped.get("bytes-reclaimed", 0)),
+        }
+
+    def _queue_databases_to_drop(self, databases: Set[str]) -> None:
+        """Queues databases to drop, the ones which are no longer candidates are dequeued."""
+        queue = self._get_databases_to_drop()
+        now = time.time()
+        self._set_databases_to_drop(
+            {database: queue.get(database, now) for database in sorted(databases)}
+        )
+
+    def _drop_queued_databases(
+        self, mongo: MongoDBConnection, database_dbs: Set[str], relation_dbs: Set[str]
+    ) -> None:
+        """Drops the queued databases whose grace period expired, concurrently.
+
+        Databases which were requested again by a relation, or which no longer exist, are
+        dequeued without being dropped. The databases that failed to drop stay queued and the
+        first error is raised once the others were recorded.
+        """
+        queue = {
+            database: queued_at
+            for database, queued_at in self._get_databases_to_drop().items()
+            if database in database_dbs and database not in relation_dbs
+        }
+        deadline = time.time() - self.charm.model.config["auto-delete-grace-period"]
+        due_databases = sorted(
+            database for database, queued_at in queue.items() if queued_at <= deadline
+        )
+        for database in due_databases:
+            logger.info("Drop database: %s", database)
+
+        results = gather(
+            [partial(mongo.drop_database, database) for database in due_databases],
+            return_exceptions=True,
+        )
+        errors = []
+        reclaimed_bytes = 0
+        for database, result in zip(due_databases, results):
+            if isinstance(result, Exception):
+                logger.error("Failed to drop database %s, error=%r", database, result)
+                errors.append(result)
+                continue
+
+            queue.pop(database)
+            reclaimed_bytes += result
+
+        self._set_databases_to_drop(queue)
+        if len(errors) < len(due_databases):
+            self._record_dropped_databases(len(due_databases) - len(errors), reclaimed_bytes)
+
+        if errors:
+            raise errors[0]
+
+    def _get_databases_to_drop(self) -> Dict[str, float]:
+        """Returns the queued databases, with the time they were queued at."""
+        return json.loads(self.charm.app_peer_data.get(DATABASES_TO_DROP_KEY, "{}"))
+
+    def _set_databases_to_drop(self, queue: Dict[str, float]) -> None:
+        """Saves the queue of databases to drop, if it changed."""
+        serialised_queue = json.dumps(queue, sort_keys=True)
+        if self.charm.app_peer_data.get(DATABASES_TO_DROP_KEY, "{}") != serialised_queue:
+            self.charm.app_peer_data[DATABASES_TO_DROP_KEY] = serialised_queue
+
+    def _record_dropped_databases(self, count: int, reclaimed_bytes: int) -> None:
+        """Adds dropped databases and the bytes they used to the totals of the queue."""
+        dropped = json.loads(self.charm.app_peer_data.get(DROPPED_DATABASES_KEY, "{}"))
+        dropped["count"] = dropped.get("count", 0) + count
+        dropped["bytes-reclaimed"] = dropped.get("bytes-reclaimed", 0) + reclaimed_bytes
+        self.charm.app_peer_data[DROPPED_DATABASES_KEY] = json.dumps(dropped, sort_keys=True)
+
+    def _create_users(
+        self,
+        mongo: MongoDBConnection,
+        usernames: Set[str],
+        roles_digests: Dict[str, str],
+        published_endpoints: Dict[str, Dict],
+    ) -> List[PyMongoError]:
+        """Creates the users of new relations, and publishes their credentials.
+
+        The users are created concurrently, the relations of the users which could not be created
+        are left as they are.
+
+        Returns:
+            the errors of the users which could not be created.
+        """
+        configs = {}
+        for username in sorted(usernames):
+            config = self._get_config(username, None)
+            if config.database is None:
+                # We need to wait for the moment when the provider library
+                # set the database name into the relation.
+                continue
+            logger.info("Create relation user: %s on %s", config.username, config.database)
+            configs[username] = config
+
+        results = gather(
+            [partial(mongo.create_user, config) for config in configs.values()],
+            return_exceptions=True,
+        )
+        errors = []
+        for (username, config), result in zip(configs.items(), results):
+            if isinstance(result, Exception):
+                logger.error("Failed to create relation user %s, error=%r", username, result)
+                errors.append(result)
+                continue
+
+            roles_digests[username] = _roles_digest(MongoDBConnection._get_roles(config))
+            self._set_relation(config)
+            self._record_published_endpoints(
+                published_endpoints,
+                username,
+                self._get_endpoints_digest(
+                    self._get_relation_from_username(username), config.hosts
+                ),
+            )
+
+        return errors
+
+    def _update_users(
+        self, mongo: MongoDBConnection, usernames: Set[str], roles_digests: Dict[str, str]
+    ) -> None:
+        """Updates the roles of the users whose roles differ from the ones of their relation.
+
+        Users whose roles did not change since they were last reconciled are skipped without
+        querying the database, the others are compared against usersInfo, so that only the users
+        which actually changed are rewritten (and replicated).
+        """
+        configs = {username: self._get_config(username, None) for username in sorted(usernames)}
+        desired_digests = {
+            username: _roles_digest(MongoDBConnection._get_roles(config))
+            for username, config in configs.items()
+        }
+        stale_users = [
+            username
+            for username, digest in desired_digests.items()
+            if roles_digests.get(username) != digest
+        ]
+        if not stale_users:
+            return
+
+        current_roles = mongo.get_users_roles(stale_users)
+        changed_users = [
+            username
+            for username in stale_users
+            if _roles_digest(current_roles.get(username, [])) != desired_digests[username]
+        ]
+        for username in changed_users:
+            logger.info(
+                "Update relation user: %s on %s",
+                configs[username].username,
+                configs[username].database,
+            )
+        gather([partial(mongo.update_user, configs[username]) for username in changed_users])
+
+        for username in stale_users:
+            roles_digests[username] = desired_digests[username]
+
+    def _get_roles_digests(self) -> Dict[str, str]:
+        """Returns the digests of the roles of the relation users, as last reconciled."""
+        return json.loads(self.charm.app_peer_data.get(USER_ROLES_DIGESTS_KEY, "{}"))
+
+    def _set_roles_digests(self, roles_digests: Dict[str, str]) -> None:
+        """Saves the digests of the roles of the relation users, if they changed."""
+        serialised_digests = json.dumps(roles_digests, sort_keys=True)
+        if self.charm.app_peer_data.get(USER_ROLES_DIGESTS_KEY, "{}") != serialised_digests:
+            self.charm.app_peer_data[USER_ROLES_DIGESTS_KEY] = serialised_digests
 
     def _diff(self, event: RelationChangedEvent) -> Diff:
         """Retrieves the diff of the data in the relation changed databag.
@@ -239,32 +515,92 @@ class MongoDBProvider(Object):
         return Diff(added, changed, deleted)
 
     def update_app_relation_data(self) -> None:
-        """Helper function to update application relation data."""
+        """Publishes the current hosts to the relations whose endpoints changed.
+
+        Each relation has a record of the endpoints last published to it. Only the relations
+        whose rendered hosts or URI differ from their record are updated, and the database is
+        only queried for the relations whose user is not yet recorded as created.
+        """
         if not self.charm.db_initialised:
             return
 
-        database_users = set()
-
-        with MongoDBConnection(self.charm.mongodb_config) as mongo:
-            database_users = mongo.get_users()
+        # relations with the mongos server should not connect though the config-server directly
+        if self.charm.is_role(Config.Role.CONFIG_SERVER):
+            return
 
+        hosts = self.charm.mongodb_config.hosts
+        published_endpoints = self._get_published_endpoints()
+        outdated_relations = {}
         for relation in self._get_relations(rel=REL_NAME):
+            if self._get_database_from_relation(relation) is None:
+                # no user is created until the database is requested
+                continue
+
             username = self._get_username_from_relation_id(relation.id)
-            password = self._get_or_set_password(relation)
-            config = self._get_config(username, password)
-            # relations with the mongos server should not connect though the config-server directly
-            if self.charm.is_role(Config.Role.CONFIG_SERVER):
+            digest = self._get_endpoints_digest(relation, hosts)
+            if published_endpoints.get(username, {}).get("digest") != digest:
+                outdated_relations[username] = (relation, digest)
+
+        if not outdated_relations:
+            return
+
+        database_users = set()
+        if any(
+            not published_endpoints.get(username, {}).get("user-created")
+            for username in outdated_relations
+        ):
+            with MongoDBConnection(self.charm.mongodb_config) as mongo:
+                database_users = mongo.get_users()
+
+        for username, (relation, digest) in outdated_relations.items():
+            record = published_endpoints.get(username, {})
+            if not record.get("user-created") and username not in database_users:
                 continue
 
-            if username in database_users:
-                self.database_provides.set_endpoints(
-                    relation.id,
-                    ",".join(config.hosts),
-                )
-                self.database_provides.set_uris(
-                    relation.id,
-                    config.uri,
-                )
+            config = self._get_config(username, None)
+            self.relation_data.update(
+                relation.id, {"endpoints": ",".join(config.hosts), "uris": config.uri}
+            )
+            self._record_published_endpoints(published_endpoints, username, digest)
+
+        self.relation_data.flush()
+        self._set_published_endpoints(published_endpoints)
+
+    def _get_endpoints_digest(self, relation: Relation, hosts: Set[str]) -> str:
+        """Returns a digest of the endpoints of a relation, without reading its credentials."""
+        config = MongoDBConfiguration(
+            replset=self.charm.app.name,
+            database=self._get_database_from_relation(relation),
+            username=self._get_username_from_relation_id(relation.id),
+            password="",
+            hosts=sorted(hosts),
+            roles=set(),
+            tls_external=False,
+            tls_internal=False,
+            uri_options=self._get_uri_options(relation),
+        )
+        return hashlib.sha256(config.uri.encode()).hexdigest()
+
+    def _get_published_endpoints(self) -> Dict[str, Dict]:
+        """Returns the records of the endpoints published to each relation user."""
+        return json.loads(self.charm.app_peer_data.get(PUBLISHED_ENDPOINTS_KEY, "{}"))
+
+    def _set_published_endpoints(self, published_endpoints: Dict[str, Dict]) -> None:
+        """Saves the records of the endpoints published to each relation user, if changed."""
+        serialised_records = json.dumps(published_endpoints, sort_keys=True)
+        if self.charm.app_peer_data.get(PUBLISHED_ENDPOINTS_KEY, "{}") != serialised_records:
+            self.charm.app_peer_data[PUBLISHED_ENDPOINTS_KEY] = serialised_records
+
+    @staticmethod
+    def _record_published_endpoints(
+        published_endpoints: Dict[str, Dict], username: str, digest: Optional[str]
+    ) -> None:
+        """Records that the user of a relation exists, with the endpoints published to it."""
+        record = published_endpoints.setdefault(username, {"version": 0})
+        record["user-created"] = True
+        if digest and record.get("digest") != digest:
+            record["digest"] = digest
+            record["version"] += 1
 
     def _get_or_set_password(self, relation: Relation) -> str:
         """Retrieve password from cache or generate a new one.
@@ -275,11 +611,11 @@ class MongoDBProvider(Object):
         Returns:
             str: The password.
         """
-        password = self.database_provides.fetch_my_relation_field(relation.id, "password")
+        password = self.relation_data.fetch_field(relation.id, "password")
         if password:
             return password
         password = generate_password()
-        self.database_provides.update_relation_data(relation.id, {"password": password})
+        self.relation_data.update(relation.id, {"password": password})
         return password
 
     def _get_config(self, username: str, password: Optional[str]) -> MongoDBConfiguration:
@@ -299,33 +635,52 @@ class MongoDBProvider(Object):
             roles=self._get_roles_from_relation(relation),
             tls_external=False,
             tls_internal=False,
+            uri_options=self._get_uri_options(relation),
         )
 
+    def _get_uri_options(self, relation: Relation) -> Dict[str, str]:
+        """Returns the connection string options of a relation.
+
+        The options set in the charm config apply to every relation, the ones requested in the
+        databag of a relation take precedence. Invalid options are logged and ignored.
+        """
+        uri_options = {}
+        for source, options in (
+            ("config", self.charm.model.config[Config.Connection.OPTIONS_KEY]),
+            (
+                f"relation {relation.id}",
+                relation.data[relation.app].get(Config.Connection.OPTIONS_KEY),
+            ),
+        ):
+            try:
+                uri_options.update(parse_connection_options(options))
+            except ValueError as e:
+                logger.error("Ignoring the connection options of the %s: %s", source, e)
+
+        return uri_options
+
     def _set_relation(self, config: MongoDBConfiguration):
         """Save all output fields into application relation."""
         relation = self._get_relation_from_username(config.username)
         if relation is None:
             return None
 
-        self.database_provides.set_credentials(relation.id, config.username, config.password)
-        self.database_provides.set_database(relation.id, config.database)
-
+        data = {
+            "username": config.username,
+            "password": config.password,
+            "database": config.database,
+        }
         # relations with the mongos server should not connect though the config-server directly
-        if self.charm.is_role(Config.Role.CONFIG_SERVER):
-            return
+        if not self.charm.is_role(Config.Role.CONFIG_SERVER):
+            data.update(
+                {
+                    "endpoints": ",".join(config.hosts),
+                    "replset": config.replset,
+                    "uris": config.uri,
+                }
+            )
 
-        self.database_provides.set_endpoints(
-            relation.id,
-            ",".join(config.hosts),
-        )
-        self.database_provides.set_replset(
-            relation.id,
-            config.replset,
-        )
-        self.database_provides.set_uris(
-            relation.id,
-            config.uri,
-        )
+        self.relation_data.update(relation.id, data)
 
     @staticmethod
     def _get_username_from_relation_id(relation_id: int) -> str:
@@ -400,3 +755,9 @@ class MongoDBProvider(Object):
         if roles is not None:
             return set(roles.split(","))
         return {"default"}
+
+
+def _roles_digest(roles: List[Dict]) -> str:
+    """Returns a digest of roles, ignoring the fields usersInfo does not report."""
+    granted_roles = sorted({(role["role"], role["db"]) for role in roles})
+    return hashlib.sha256(json.dumps(granted_roles).encode()).hexdigest()
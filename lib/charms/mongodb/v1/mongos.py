@@ -5,12 +5,19 @@
 
 import logging
 from dataclasses import dataclass
+from functools import partial
 from typing import List, Optional, Set, Tuple
 from urllib.parse import quote_plus
 
-from charms.mongodb.v1.mongodb import NotReadyError
-from pymongo import MongoClient, collection
-from tenacity import RetryError, Retrying, stop_after_delay, wait_fixed
+from charms.mongodb.v1.mongodb import (
+    MongoClientRegistry,
+    NotReadyError,
+    ReadinessProber,
+    gather,
+    get_mongo_client,
+)
+from pymongo import collection
+from tenacity import Retrying, stop_after_delay, wait_fixed
 
 from config import Config
 
@@ -22,7 +29,7 @@ LIBAPI = 1
 
 # Increment this PATCH version before using `charmcraft publish-lib` or reset
 # to 0 if you are raising the major API version
-LIBPATCH = 5
+LIBPATCH = 9
 
 # path to store mongodb ketFile
 logger = logging.getLogger(__name__)
@@ -75,6 +82,15 @@ class MongosConfiguration:
         )
 
 
+@dataclass(frozen=True)
+class DrainProgress:
+    """Data left on a shard which is being drained from the cluster."""
+
+    remaining_chunks: int
+    jumbo_chunks: int
+    dbs_to_move: Tuple[str, ...]
+
+
 class NotEnoughSpaceError(Exception):
     """Raised when there isn't enough space to movePrimary."""
 
@@ -128,13 +144,7 @@ class MongosConnection:
         if uri is None:
             uri = config.uri
 
-        self.client = MongoClient(
-            uri,
-            directConnection=direct,
-            connect=False,
-            serverSelectionTimeoutMS=1000,
-            connectTimeoutMS=2000,
-        )
+        self.client, self._shared_client = get_mongo_client(uri, direct, config.tls_external)
         return
 
     def __enter__(self):
@@ -143,7 +153,8 @@ class MongosConnection:
 
     def __exit__(self, object_type, value, traceback):
         """Disconnect from MongoDB client."""
-        self.client.close()
+        if not self._shared_client:
+            self.client.close()
         self.client = None
 
     def get_shard_members(self) -> Set[str]:
@@ -280,6 +291,27 @@ class MongosConnection:
             f"Shard {shard_name} not in cluster, could not retrieve draining status"
         )
 
+    def get_drain_progress(self, shard_name: str) -> DrainProgress:
+        """Returns the data left to move off of a shard.
+
+        Unlike re-running removeShard, reading the config database does not start the removal of
+        a shard which is not being drained yet.
+        """
+        chunks = self.client["config"]["chunks"]
+        # the reads are independent, they are sent at once to save round trips to mongos
+        remaining_chunks, jumbo_chunks, dbs_to_move = gather(
+            [
+                partial(chunks.count_documents, {"shard": shard_name}),
+                partial(chunks.count_documents, {"shard": shard_name, "jumbo": True}),
+                partial(self.get_databases_for_shard, shard_name),
+            ]
+        )
+        return DrainProgress(
+            remaining_chunks=remaining_chunks,
+            jumbo_chunks=jumbo_chunks,
+            dbs_to_move=tuple(dbs_to_move or []),
+        )
+
     def get_databases_for_shard(self, primary_shard) -> Optional[List[str]]:
         """Returns a list of databases using the given shard as a primary shard.
 
@@ -354,21 +386,16 @@ class MongosConnection:
         """Is mongos ready for services requests.
 
         Returns:
-            True if services is ready False otherwise. Retries over a period of 60 seconds times to
-            allow server time to start up.
+            True if services is ready False otherwise. Retries with an exponential backoff, for
+            up to 60 seconds or the readiness budget left in the hook, to allow server time to
+            start up.
 
         Raises:
             ConfigurationError, ConfigurationError, OperationFailure
         """
-        try:
-            for attempt in Retrying(stop=stop_after_delay(60), wait=wait_fixed(3)):
-                with attempt:
-                    # The ping command is cheap and does not require auth.
-                    self.client.admin.command("ping")
-        except RetryError:
-            return False
-
-        return True
+        registry = MongoClientRegistry.active()
+        prober = registry.prober if registry and registry.prober else ReadinessProber()
+        return prober.probe(self.client, target="mongos")
 
     def are_all_shards_aware(self) -> bool:
         """Returns True if all shards are shard aware."""
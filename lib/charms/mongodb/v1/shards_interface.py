@@ -8,7 +8,9 @@ shards.
 """
 import json
 import logging
+import math
 import time
+from dataclasses import asdict, dataclass, field
 from typing import List, Optional, Set, Tuple
 
 from charms.data_platform_libs.v0.data_interfaces import (
@@ -63,7 +65,7 @@ LIBAPI = 1
 
 # Increment this PATCH version before using `charmcraft publish-lib` or reset
 # to 0 if you are raising the major API version
-LIBPATCH = 8
+LIBPATCH = 10
 
 KEYFILE_KEY = "key-file"
 HOSTS_KEY = "host"
@@ -75,6 +77,74 @@ AUTH_FAILED_CODE = 18
 UNAUTHORISED_CODE = 13
 TLS_CANNOT_FIND_PRIMARY = 133
 
+DRAIN_PHASE_DRAINING = "draining"
+DRAIN_PHASE_WAITING = "waiting"
+DRAIN_PHASE_FAILED = "failed"
+DRAIN_PHASE_DRAINED = "drained"
+
+
+@dataclass
+class DrainState:
+    """Progress of the drain of a shard from the cluster, as persisted in the unit peer data."""
+
+    mongos_hosts: List[str]
+    started_at: float
+    phase: str = DRAIN_PHASE_DRAINING
+    initial_chunks: Optional[int] = None
+    remaining_chunks: Optional[int] = None
+    jumbo_chunks: int = 0
+    dbs_to_move: List[str] = field(default_factory=list)
+    updated_at: Optional[float] = None
+
+    @property
+    def rate(self) -> Optional[float]:
+        """Average number of chunks moved off of the shard per minute, if any were moved."""
+        if self.initial_chunks is None or self.remaining_chunks is None or not self.updated_at:
+            return None
+
+        moved_chunks = self.initial_chunks - self.remaining_chunks
+        elapsed_minutes = (self.updated_at - self.started_at) / 60
+        if moved_chunks <= 0 or elapsed_minutes <= 0:
+            return None
+
+        return moved_chunks / elapsed_minutes
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Estimated seconds until all chunks are moved off of the shard."""
+        if not self.rate:
+            return None
+
+        return self.remaining_chunks / self.rate * 60
+
+    def get_status(self) -> StatusBase:
+        """Returns the status reporting the progress of the drain."""
+        if self.phase == DRAIN_PHASE_WAITING:
+            return WaitingStatus("Waiting for config-server to remove shard")
+
+        if self.phase == DRAIN_PHASE_FAILED:
+            return BlockedStatus("Failed to drain shard from cluster")
+
+        if self.phase == DRAIN_PHASE_DRAINED:
+            return ActiveStatus("Shard drained from cluster, ready for removal")
+
+        if self.remaining_chunks is None:
+            return MaintenanceStatus("Draining shard from cluster")
+
+        if not self.remaining_chunks and self.dbs_to_move:
+            return MaintenanceStatus(
+                f"Draining shard from cluster: moving primary of {len(self.dbs_to_move)} databases"
+            )
+
+        message = f"Draining shard from cluster: {self.remaining_chunks} chunks left"
+        if self.jumbo_chunks:
+            message += f" ({self.jumbo_chunks} jumbo)"
+
+        if self.rate:
+            message += f", {self.rate:.1f} chunks/min, ~{math.ceil(self.eta / 60)}m left"
+
+        return MaintenanceStatus(message)
+
 
 class ShardAuthError(Exception):
     """Raised when a shard doesn't have the same auth as the config server."""
@@ -696,6 +766,7 @@ class ConfigServerRequirer(Object):
         """Sets status and flags in relation data relevant to sharding."""
         # if re-using an old shard, re-set flags.
         self.charm.unit_peer_data["drained"] = json.dumps(False)
+        self.save_drain_state(None)
         self.charm.status.set_and_share_status(MaintenanceStatus("Adding shard to config-server"))
 
     def _on_relation_changed(self, event):
@@ -847,51 +918,109 @@ class ConfigServerRequirer(Object):
             )
             return
 
-        self.charm.status.set_and_share_status(MaintenanceStatus("Draining shard from cluster"))
+        # draining can take hours, it is advanced on update-status rather than waited for here.
         mongos_hosts = json.loads(self.charm.app_peer_data["mongos_hosts"])
-        self.wait_for_draining(mongos_hosts)
-        self.charm.status.set_and_share_status(
-            ActiveStatus("Shard drained from cluster, ready for removal")
-        )
+        self.start_drain(mongos_hosts)
+        self.charm.status.set_and_share_status(self.advance_drain().get_status())
 
     def wait_for_draining(self, mongos_hosts: List[str]):
-        """Waits for shards to be drained from sharded cluster."""
-        drained = False
-
-        while not drained:
-            try:
-                # no need to continuously check and abuse resources while shard is draining
-                time.sleep(60)
-                drained = self.drained(mongos_hosts, self.charm.app.name)
-                self.charm.status.set_and_share_status(
-                    MaintenanceStatus("Draining shard from cluster")
-                )
-                draining_status = (
-                    "Shard is still draining" if not drained else "Shard is fully drained."
-                )
-                self.charm.status.set_and_share_status(
-                    MaintenanceStatus("Draining shard from cluster")
-                )
-                logger.debug(draining_status)
-            except PyMongoError as e:
-                logger.error("Error occurred while draining shard: %s", e)
-                self.charm.status.set_and_share_status(
-                    BlockedStatus("Failed to drain shard from cluster")
-                )
-            except ShardNotPlannedForRemovalError:
-                logger.info(
-                    "Shard %s has not been identifies for removal. Must wait for mongos cluster-admin to remove shard."
-                )
-                self.charm.status.set_and_share_status(
-                    WaitingStatus("Waiting for config-server to remove shard")
-                )
-            except ShardNotInClusterError:
-                logger.info(
-                    "Shard to remove is not in sharded cluster. It has been successfully removed."
-                )
-                self.charm.unit_peer_data["drained"] = json.dumps(True)
+        """Confirms the shard is drained from the sharded cluster, before storage is detached.
+
+        The drain is advanced on update-status, by the time storage is detached it is usually
+        complete and this is a single confirmation against its persisted progress. The hook is not
+        blocked while the shard is still draining, it fails instead and is retried by Juju.
+
+        Raises:
+            NotDrainedError if the shard is not drained yet.
+        """
+        drain_state = self.get_drain_state()
+        if not drain_state or drain_state.phase != DRAIN_PHASE_DRAINED:
+            self.start_drain(mongos_hosts)
+            drain_state = self.advance_drain()
+
+        self.charm.status.set_and_share_status(drain_state.get_status())
+        if drain_state.phase == DRAIN_PHASE_DRAINED:
+            return
+
+        logger.warning("Shard is not yet drained, cannot detach storage until it is.")
+        raise NotDrainedError(f"Shard {self.charm.app.name} is still {drain_state.phase}.")
+
+    def get_drain_state(self) -> Optional[DrainState]:
+        """Returns the progress of the drain of this shard, if it was started."""
+        if Config.Drain.STATE_KEY not in self.charm.unit_peer_data:
+            return None
+
+        return DrainState(**json.loads(self.charm.unit_peer_data[Config.Drain.STATE_KEY]))
+
+    def save_drain_state(self, drain_state: Optional[DrainState]) -> None:
+        """Persists the progress of the drain of this shard, or clears it."""
+        if drain_state is None:
+            self.charm.unit_peer_data.pop(Config.Drain.STATE_KEY, None)
+            return
 
-                break
+        self.charm.unit_peer_data[Config.Drain.STATE_KEY] = json.dumps(asdict(drain_state))
+
+    def start_drain(self, mongos_hosts: List[str]) -> DrainState:
+        """Starts tracking the drain of this shard, or resumes tracking an ongoing one."""
+        drain_state = self.get_drain_state()
+        if drain_state and drain_state.phase != DRAIN_PHASE_DRAINED:
+            drain_state.mongos_hosts = mongos_hosts
+        else:
+            drain_state = DrainState(mongos_hosts=mongos_hosts, started_at=time.time())
+
+        self.save_drain_state(drain_state)
+        return drain_state
+
+    def advance_drain(self) -> Optional[DrainState]:
+        """Records the current progress of the drain of this shard, if one is ongoing.
+
+        Only reads the state of the cluster, removing the shard is up to the config-server.
+        """
+        drain_state = self.get_drain_state()
+        if not drain_state or drain_state.phase == DRAIN_PHASE_DRAINED:
+            return drain_state
+
+        shard_name = self.charm.app.name
+        mongos_config = self.charm.remote_mongos_config(set(drain_state.mongos_hosts))
+        try:
+            with MongosConnection(mongos_config) as mongo:
+                # a shard is "drained" if it is NO LONGER draining.
+                drained = not mongo._is_shard_draining(shard_name)
+                if not drained:
+                    progress = mongo.get_drain_progress(shard_name)
+        except ShardNotInClusterError:
+            logger.info("Shard to remove is not in sharded cluster. It has been removed.")
+            drained = True
+        except ShardNotPlannedForRemovalError:
+            logger.info(
+                "Shard %s has not been identified for removal. Must wait for mongos cluster-admin to remove shard.",
+                shard_name,
+            )
+            drain_state.phase = DRAIN_PHASE_WAITING
+            self.save_drain_state(drain_state)
+            return drain_state
+        except PyMongoError as e:
+            logger.error("Error occurred while draining shard: %s", e)
+            drain_state.phase = DRAIN_PHASE_FAILED
+            self.save_drain_state(drain_state)
+            return drain_state
+
+        drain_state.updated_at = time.time()
+        if drained:
+            drain_state.phase = DRAIN_PHASE_DRAINED
+        else:
+            drain_state.phase = DRAIN_PHASE_DRAINING
+            drain_state.remaining_chunks = progress.remaining_chunks
+            drain_state.jumbo_chunks = progress.jumbo_chunks
+            drain_state.dbs_to_move = list(progress.dbs_to_move)
+            if drain_state.initial_chunks is None:
+                drain_state.initial_chunks = progress.remaining_chunks
+                drain_state.started_at = drain_state.updated_at
+
+        logger.debug("Drain of shard %s: %s", shard_name, drain_state)
+        self.charm.unit_peer_data["drained"] = json.dumps(drained)
+        self.save_drain_state(drain_state)
+        return drain_state
 
     def get_relations_statuses(self) -> Optional[StatusBase]:
         """Returns status based on relations and their validity regarding sharding."""
@@ -926,14 +1055,14 @@ class ConfigServerRequirer(Object):
         return
 
     def get_shard_status(self) -> Optional[StatusBase]:
-        """Returns the current status of the shard.
-
-        Note: No need to report if currently draining, since that check block other hooks from
-        executing.
-        """
+        """Returns the current status of the shard."""
         if self.skip_shard_status():
             return None
 
+        drain_state = self.get_drain_state()
+        if drain_state and drain_state.phase != DRAIN_PHASE_DRAINED:
+            return drain_state.get_status()
+
         relation_status = self.get_relations_statuses()
         if relation_status:
             return relation_status
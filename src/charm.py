@@ -6,11 +6,13 @@ import json
 import logging
 import os
 import pwd
+import socket
 import subprocess
-import time
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Set
 
+import yaml
 from charms.grafana_agent.v0.cos_agent import COSAgentProvider
 from charms.mongodb.v0.config_server_interface import ClusterProvider
 from charms.mongodb.v0.mongodb_secrets import SecretCache, generate_secret_label
@@ -25,12 +27,16 @@ from charms.mongodb.v1.helpers import (
     generate_keyfile,
     generate_password,
     get_create_user_cmd,
+    parse_connection_options,
+    parse_server_parameters,
 )
 from charms.mongodb.v1.mongodb import (
+    MongoClientRegistry,
     MongoDBConfiguration,
     MongoDBConnection,
     NotReadyError,
     PyMongoError,
+    ReadinessProber,
 )
 from charms.mongodb.v1.mongodb_backups import MongoDBBackups
 from charms.mongodb.v1.mongodb_provider import MongoDBProvider
@@ -44,7 +50,6 @@ from charms.mongodb.v1.users import (
     MonitorUser,
     OperatorUser,
 )
-from charms.operator_libs_linux.v1.systemd import service_running
 from charms.operator_libs_linux.v2 import snap
 from data_platform_helpers.version_check import (
     CrossAppVersionChecker,
@@ -89,10 +94,17 @@ from exceptions import (
 from machine_helpers import (
     MONGO_USER,
     ROOT_USER_GID,
+    get_data_directory_per_db,
+    get_memory_limit,
     setup_logrotate_and_cron,
     update_mongod_service,
 )
+from oplog import OplogManager
+from profiler import ProfilerManager
+from rolling_restart import RollingRestart
+from snap_cache import LazySnapCache
 from upgrades.mongodb_upgrade import MongoDBUpgrade
+from workload_services import WorkloadServices
 
 logger = logging.getLogger(__name__)
 
@@ -107,6 +119,8 @@ class MongodbOperatorCharm(CharmBase):
     def __init__(self, *args):
         super().__init__(*args)
         self._port = Config.MONGODB_PORT
+        # snaps are looked up on first use and shared by the whole hook, see snap_cache.
+        self._snap_cache: Optional[LazySnapCache] = None
 
         # lifecycle events
         self.framework.observe(self.on.config_changed, self._on_config_changed)
@@ -129,6 +143,12 @@ class MongodbOperatorCharm(CharmBase):
 
         # actions
         self.framework.observe(self.on.get_primary_action, self._on_get_primary_action)
+        self.framework.observe(
+            self.on.get_initial_sync_status_action, self._on_get_initial_sync_status_action
+        )
+        self.framework.observe(
+            self.on.get_database_cleanup_status_action, self._on_get_database_cleanup_status_action
+        )
         self.framework.observe(self.on.get_password_action, self._on_get_password)
         self.framework.observe(self.on.set_password_action, self._on_set_password)
 
@@ -157,6 +177,10 @@ class MongodbOperatorCharm(CharmBase):
         self.cluster = ClusterProvider(self)
         self.shard = ConfigServerRequirer(self)
         self.status = MongoDBStatusHandler(self)
+        self.oplog = OplogManager(self)
+        self.profiler = ProfilerManager(self)
+        self.rolling_restart = RollingRestart(self)
+        self.workload_services = WorkloadServices(self)
 
         # relation events for Prometheus metrics are handled in the MetricsEndpointProvider
         self._grafana_agent = COSAgentProvider(
@@ -168,6 +192,7 @@ class MongodbOperatorCharm(CharmBase):
         )
 
         self.secrets = SecretCache(self)
+        self._configure_readiness_prober()
 
     # BEGIN: properties
     def _mongo_scrape_config(self) -> List[Dict]:
@@ -186,6 +211,18 @@ class MongodbOperatorCharm(CharmBase):
             }
         ]
 
+    @property
+    def snap_cache(self) -> LazySnapCache:
+        """Snaps of the unit, loaded on first use and shared by the whole hook.
+
+        Raises:
+            snap.SnapError
+        """
+        if self._snap_cache is None:
+            self._snap_cache = LazySnapCache()
+
+        return self._snap_cache
+
     @property
     def primary(self) -> str:
         """Retrieves the unit with the primary replica."""
@@ -343,6 +380,82 @@ class MongodbOperatorCharm(CharmBase):
         """Checks if application is running in provided role."""
         return self.role == role_name
 
+    @property
+    def server_parameters(self) -> Dict[str, Any]:
+        """Returns the server parameters tuned with the server-parameters config option."""
+        try:
+            return parse_server_parameters(self.model.config["server-parameters"])
+        except ValueError as e:
+            logger.error("Invalid server-parameters, ignoring them: %s", str(e))
+            return {}
+
+    @property
+    def mongod_storage_options(self) -> Dict[str, Optional[str]]:
+        """Returns the storage engine options mongod is started with, based on the charm config."""
+        storage_options = {"wiredTigerCacheSizeGB": f"{self._get_cache_size_gb():.2f}"}
+        for name, option in (
+            ("wiredTigerCollectionBlockCompressor", "storage-block-compressor"),
+            ("wiredTigerJournalCompressor", "storage-journal-compressor"),
+        ):
+            if self.model.config[option] in Config.Storage.COMPRESSORS:
+                storage_options[name] = self.model.config[option]
+            else:
+                logger.error("Unsupported %s %s.", option, self.model.config[option])
+
+        if self.model.config["oplog-size"] > 0:
+            storage_options["oplogSize"] = str(self.model.config["oplog-size"])
+
+        # the layout of existing data cannot change, mongod would fail to start
+        directory_per_db = get_data_directory_per_db()
+        if directory_per_db is None:
+            directory_per_db = self.model.config["storage-directory-per-db"]
+        if directory_per_db:
+            storage_options["directoryperdb"] = None
+
+        return storage_options
+
+    def _get_cache_size_gb(self) -> float:
+        """Returns the size of the WiredTiger cache, from the config or the memory available."""
+        memory_gb = get_memory_limit() / 1024**3
+        default_cache_size = max(
+            (memory_gb - Config.Storage.RESERVED_MEMORY_GB) * Config.Storage.CACHE_SIZE_RATIO,
+            Config.Storage.MIN_CACHE_SIZE_GB,
+        )
+        try:
+            cache_size_gb = self._parse_cache_size_gb(
+                self.model.config["storage-cache-size"], memory_gb
+            )
+        except ValueError as e:
+            logger.error("Invalid storage-cache-size, using the default: %s", str(e))
+            return default_cache_size
+
+        if cache_size_gb is None:
+            return default_cache_size
+
+        return max(cache_size_gb, Config.Storage.MIN_CACHE_SIZE_GB)
+
+    @staticmethod
+    def _parse_cache_size_gb(cache_size: str, memory_gb: float) -> Optional[float]:
+        """Parses the size of the WiredTiger cache, in gigabytes or as a percentage of memory.
+
+        Returns:
+            the size of the cache in gigabytes, None if it is not set.
+
+        Raises:
+            ValueError if the size is malformed.
+        """
+        cache_size = cache_size.strip()
+        if not cache_size:
+            return None
+
+        try:
+            if cache_size.endswith("%"):
+                return memory_gb * float(cache_size[:-1]) / 100
+
+            return float(cache_size)
+        except ValueError:
+            raise ValueError(f"Malformed cache size: {cache_size}")
+
     @db_initialised.setter
     def db_initialised(self, value):
         """Set the db_initialised flag."""
@@ -380,8 +493,7 @@ class MongodbOperatorCharm(CharmBase):
             self.status.set_and_share_status(BlockedStatus("couldn't install MongoDB"))
             return
 
-        # clear the default config file - user provided config files will be added in the config
-        # changed hook
+        # clear the default config file - the charm renders its own from the charm config below
         try:
             with open(Config.MONGOD_CONF_FILE_PATH, "r+") as f:
                 f.truncate(0)
@@ -389,11 +501,14 @@ class MongodbOperatorCharm(CharmBase):
             self.status.set_and_share_status(BlockedStatus("Could not install MongoDB"))
             return
 
-        # Construct the mongod startup commandline args for systemd and reload the daemon.
+        # Construct the mongod configuration file read by the service when it starts.
         update_mongod_service(
             machine_ip=self.unit_host(self.unit),
             config=self.mongodb_config,
             role=self.role,
+            parameters=self.server_parameters,
+            storage_options=self.mongod_storage_options,
+            profiling=self.profiler.settings,
         )
         setup_logrotate_and_cron()
         # add licenses
@@ -423,6 +538,99 @@ class MongodbOperatorCharm(CharmBase):
                 f"Migration of sharding components not permitted, revert config role to {self.role}"
             )
 
+        if self.unit.is_leader():
+            # only the relations whose connection options changed are republished
+            self.client_relations.update_app_relation_data()
+
+        self._update_mongod_options(event)
+
+        invalid_config_status = self.get_invalid_config_status()
+        if invalid_config_status:
+            self.status.set_and_share_status(invalid_config_status)
+
+    def _update_mongod_options(self, event: ConfigChangedEvent) -> None:
+        """Rewrites the configuration of mongod and applies the options which changed.
+
+        Server parameters which can be set at runtime are set on the running mongod, any other
+        change is picked up by mongod when it restarts.
+        """
+        if self.upgrade_in_progress:
+            logger.info("Deferring the update of the mongod options until the upgrade completes.")
+            event.defer()
+            return
+
+        try:
+            config_changes = update_mongod_service(
+                machine_ip=self.unit_host(self.unit),
+                config=self.mongodb_config,
+                role=self.role,
+                parameters=self.server_parameters,
+                storage_options=self.mongod_storage_options,
+                profiling=self.profiler.settings,
+            )
+        except OSError as e:
+            logger.error("Failed to update the mongod options, error: %s.", str(e))
+            return
+
+        if not config_changes or not self.is_mongod_running():
+            return
+
+        restart_required = bool(config_changes.restart_options)
+        if config_changes.parameters:
+            restart_required |= not self._set_server_parameters(config_changes.parameters)
+
+        if config_changes.runtime_options:
+            restart_required |= not self.profiler.update()
+
+        if restart_required:
+            logger.info(
+                "mongod options %s changed, requesting a rolling restart.",
+                ", ".join(config_changes.restart_options) or "parameters",
+            )
+            self.rolling_restart.request_restart()
+
+    def _reconcile_server_parameters(self) -> None:
+        """Sets the tuned server parameters again on mongod, if their values drifted."""
+        server_parameters = self.server_parameters
+        if not server_parameters:
+            return
+
+        local_config = self.remote_mongodb_config({self.unit_host(self.unit)}, standalone=True)
+        try:
+            with MongoDBConnection(local_config, direct=True) as mongo:
+                current_parameters = mongo.get_server_parameters(server_parameters)
+                drifted_parameters = {
+                    name: value
+                    for name, value in server_parameters.items()
+                    if current_parameters.get(name) != value
+                }
+                if not drifted_parameters:
+                    return
+
+                logger.info(
+                    "Server parameters drifted, setting them again: %s", drifted_parameters
+                )
+                mongo.set_server_parameters(drifted_parameters)
+        except PyMongoError as e:
+            logger.error("Failed to reconcile the server parameters, error: %r", e)
+
+    def _set_server_parameters(self, parameters: Dict[str, Any]) -> bool:
+        """Sets server parameters on the mongod of this unit, without restarting it.
+
+        Returns:
+            whether the parameters were set.
+        """
+        local_config = self.remote_mongodb_config({self.unit_host(self.unit)}, standalone=True)
+        try:
+            with MongoDBConnection(local_config, direct=True) as mongo:
+                mongo.set_server_parameters(parameters)
+        except PyMongoError as e:
+            logger.error("Failed to set server parameters %s, error: %r", parameters, e)
+            return False
+
+        logger.info("Set server parameters %s at runtime.", ", ".join(sorted(parameters)))
+        return True
+
     def _on_start(self, event: StartEvent) -> None:
         """Enables MongoDB service and initialises replica set.
 
@@ -529,23 +737,32 @@ class MongodbOperatorCharm(CharmBase):
                 replset_members = mongo.get_replset_members()
                 # compare set of mongod replica set members and juju hosts to avoid the unnecessary
                 # reconfiguration.
-                if replset_members == self.mongodb_config.hosts:
-                    return
-
-                for member in self.mongodb_config.hosts - replset_members:
-                    logger.debug("Adding %s to replica set", member)
+                new_members = self.mongodb_config.hosts - replset_members
+                ready_members = set()
+                for member in new_members:
                     with MongoDBConnection(
                         self.mongodb_config, member, direct=True
                     ) as direct_mongo:
-                        if not direct_mongo.is_ready:
-                            self.status.set_and_share_status(
-                                WaitingStatus("waiting to reconfigure replica set")
-                            )
-                            logger.debug("Deferring reconfigure: %s is not ready yet.", member)
-                            event.defer()
-                            return
-                    mongo.add_replset_member(member)
+                        if direct_mongo.is_ready:
+                            ready_members.add(member)
+
+                # all ready members are added at once, as non-voting members.
+                if ready_members:
+                    logger.debug("Adding %s to replica set", ready_members)
+                    mongo.add_replset_members(ready_members)
                     self.status.set_and_share_status(ActiveStatus())
+
+                # members which finished syncing and caught up with the primary get their vote.
+                mongo.promote_replset_members(max_lag=self.model.config["promotion-max-lag"])
+
+                if ready_members != new_members:
+                    self.status.set_and_share_status(
+                        WaitingStatus("waiting to reconfigure replica set")
+                    )
+                    logger.debug(
+                        "Deferring reconfigure: %s not ready yet.", new_members - ready_members
+                    )
+                    event.defer()
             except NotReadyError:
                 self.status.set_and_share_status(
                     WaitingStatus("waiting to reconfigure replica set")
@@ -608,7 +825,7 @@ class MongodbOperatorCharm(CharmBase):
                 logger.error(early_removal_message)
                 raise EarlyRemovalOfConfigServerError(early_removal_message)
 
-            # cannot drain shard after storage detached.
+            # cannot drain shard after storage detached, the hook fails until it is drained.
             if self.is_role(Config.Role.SHARD) and self.shard.has_config_server():
                 logger.info("Wait for shard to drain before detaching storage.")
                 self.status.set_and_share_status(MaintenanceStatus("Draining shard from cluster"))
@@ -673,11 +890,55 @@ class MongodbOperatorCharm(CharmBase):
             deployment_mode = "replica set" if self.is_role(Config.Role.REPLICATION) else "cluster"
             WaitingStatus(f"Waiting to sync internal membership across the {deployment_mode}")
 
-        self.status.set_and_share_status(self.status.process_statuses())
+        if self.is_role(Config.Role.SHARD):
+            # record the progress of an ongoing drain, it is reported by the shard status.
+            self.shard.advance_drain()
+
+        try:
+            # drop the databases of removed relations whose grace period expired.
+            self.client_relations.drop_queued_databases()
+        except PyMongoError as e:
+            logger.error("Failed to drop the queued databases, error=%r", e)
+
+        self._reconcile_server_parameters()
+        self.profiler.reconcile()
+        self.oplog.update()
+        # invalid options are ignored until fixed, they do not hold back the work above.
+        self.status.set_and_share_status(
+            self.get_invalid_config_status()
+            or self.oplog.get_unit_status(self.status.process_statuses())
+        )
 
     def _on_get_primary_action(self, event: ActionEvent):
         event.set_results({"replica-set-primary": self.primary})
 
+    def _on_get_initial_sync_status_action(self, event: ActionEvent) -> None:
+        """Returns the source, progress and timing of the initial sync of this unit."""
+        local_config = self.remote_mongodb_config({self.unit_host(self.unit)}, standalone=True)
+        try:
+            with MongoDBConnection(local_config, direct=True) as direct_mongo:
+                initial_sync = direct_mongo.get_initial_sync_status()
+        except PyMongoError as e:
+            event.fail(f"Failed to get the initial sync status: {e}")
+            return
+
+        results = {"in-progress": "true" if initial_sync else "false"}
+        if initial_sync:
+            results.update(
+                {
+                    "source": initial_sync.source or "unknown",
+                    "progress": self._format_optional(initial_sync.progress, "{:.1f}%"),
+                    "elapsed": self._format_optional(initial_sync.elapsed, "{:.0f}s"),
+                    "remaining": self._format_optional(initial_sync.remaining, "{:.0f}s"),
+                }
+            )
+
+        event.set_results(results)
+
+    def _on_get_database_cleanup_status_action(self, event: ActionEvent) -> None:
+        """Returns the databases waiting to be dropped by auto-delete and the space reclaimed."""
+        event.set_results(self.client_relations.get_cleanup_status())
+
     def _on_get_password(self, event: ActionEvent) -> None:
         """Returns the password for the user as an action response."""
         username = self._get_user_or_fail_event(
@@ -843,8 +1104,8 @@ class MongodbOperatorCharm(CharmBase):
 
         # leader should reconnect to exporter after creating the monitor user - since the snap
         # will have an authorisation error until the the user has been created and the daemon
-        # has been restarted
-        self._connect_mongodb_exporter()
+        # has been restarted, even though its URI did not change
+        self._connect_mongodb_exporter(force=True)
 
     @retry(
         stop=stop_after_attempt(3),
@@ -1024,6 +1285,11 @@ class MongodbOperatorCharm(CharmBase):
         with MongoDBConnection(self.mongodb_config) as mongod:
             mongod.set_replicaset_election_priority(priority=1)
 
+    @staticmethod
+    def _format_optional(value: Optional[float], template: str) -> str:
+        """Formats a value which may not be known."""
+        return template.format(value) if value is not None else "unknown"
+
     def _open_ports_tcp(self, ports: int) -> None:
         """Open the given port.
 
@@ -1046,8 +1312,7 @@ class MongodbOperatorCharm(CharmBase):
         """
         for snap_name, snap_channel, snap_revision in packages:
             try:
-                snap_cache = snap.SnapCache()
-                snap_package = snap_cache[snap_name]
+                snap_package = self.snap_cache[snap_name]
                 snap_package.ensure(
                     snap.SnapState.Latest, channel=snap_channel, revision=snap_revision
                 )
@@ -1157,8 +1422,12 @@ class MongodbOperatorCharm(CharmBase):
         ]:
             self.remove_file_from_unit(Config.MONGOD_CONF_DIR, file)
 
-    def _connect_mongodb_exporter(self) -> None:
-        """Exposes the endpoint to mongodb_exporter."""
+    def _connect_mongodb_exporter(self, force: bool = False) -> None:
+        """Exposes the endpoint to mongodb_exporter.
+
+        Args:
+            force: restart the exporter even if its URI is unchanged.
+        """
         if not self.db_initialised:
             return
 
@@ -1166,10 +1435,11 @@ class MongodbOperatorCharm(CharmBase):
         if not self.get_secret(APP_SCOPE, MonitorUser.get_password_key_name()):
             return
 
-        snap_cache = snap.SnapCache()
-        mongodb_snap = snap_cache["charmed-mongodb"]
-        mongodb_snap.set({Config.Monitoring.URI_PARAM_NAME: self.monitor_config.uri})
-        mongodb_snap.restart(services=[Config.Monitoring.SERVICE_NAME])
+        self.workload_services.ensure_config(
+            Config.Monitoring.SERVICE_NAME,
+            {Config.Monitoring.URI_PARAM_NAME: self.monitor_config.uri},
+            force=force,
+        )
 
     def _connect_pbm_agent(self) -> None:
         """Updates URI for pbm-agent."""
@@ -1180,29 +1450,11 @@ class MongodbOperatorCharm(CharmBase):
         if not self.get_secret(APP_SCOPE, BackupUser.get_password_key_name()):
             return
 
-        snap_cache = snap.SnapCache()
-        pbm_snap = snap_cache["charmed-mongodb"]
-
         try:
-            current_pbm_uri = pbm_snap.get(Config.Backup.URI_PARAM_NAME)
-        except snap.SnapError:
-            # if a snap variable has not been set, the retrieve of it fails
-            current_pbm_uri = ""
-
-        if current_pbm_uri == self.backup_config.uri and service_running(
-            "snap.charmed-mongodb.pbm-agent.service"
-        ):
-            return
-
-        logger.debug("PBM uri needs to be updated, resetting the URI and restarting the daemon")
-
-        pbm_snap.stop(services=[Config.Backup.SERVICE_NAME])
-        pbm_snap.set({Config.Backup.URI_PARAM_NAME: self.backup_config.uri})
-        try:
-            # Added to avoid systemd error:
-            # 'snap.charmed-mongodb.pbm-agent.service: Start request repeated too quickly'
-            time.sleep(1)
-            pbm_snap.start(services=[Config.Backup.SERVICE_NAME], enable=True)
+            self.workload_services.ensure_config(
+                Config.Backup.SERVICE_NAME,
+                {Config.Backup.URI_PARAM_NAME: self.backup_config.uri},
+            )
         except snap.SnapError as e:
             logger.error(f"Failed to restart {Config.Backup.SERVICE_NAME}: {str(e)}")
             self._get_service_status(Config.Backup.SERVICE_NAME)
@@ -1211,10 +1463,10 @@ class MongodbOperatorCharm(CharmBase):
     def _get_service_status(self, service_name) -> None:
         logger.error(f"Getting status of {service_name} service:")
         self._run_diagnostic_command(
-            f"systemctl status snap.charmed-mongodb.{service_name}.service"
+            f"systemctl status snap.{Config.SNAP_NAME}.{service_name}.service"
         )
         self._run_diagnostic_command(
-            f"journalctl -xeu snap.charmed-mongodb.{service_name}.service"
+            f"journalctl -xeu snap.{Config.SNAP_NAME}.{service_name}.service"
         )
 
     def _run_diagnostic_command(self, cmd) -> None:
@@ -1337,8 +1589,7 @@ class MongodbOperatorCharm(CharmBase):
         Raises:
             snap.SnapError
         """
-        snap_cache = snap.SnapCache()
-        mongodb_snap = snap_cache["charmed-mongodb"]
+        mongodb_snap = self.snap_cache[Config.SNAP_NAME]
         mongodb_snap.start(services=["mongod"], enable=True)
 
         # charms running as config server are responsible for maintaining a server side mongos
@@ -1351,8 +1602,7 @@ class MongodbOperatorCharm(CharmBase):
         Raises:
             snap.SnapError
         """
-        snap_cache = snap.SnapCache()
-        mongodb_snap = snap_cache["charmed-mongodb"]
+        mongodb_snap = self.snap_cache[Config.SNAP_NAME]
         mongodb_snap.stop(services=["mongod"])
 
         # charms running as config server are responsible for maintaining a server side mongos
@@ -1367,6 +1617,9 @@ class MongodbOperatorCharm(CharmBase):
                 self.unit_host(self.unit),
                 config=self.mongodb_config,
                 role=self.role,
+                parameters=self.server_parameters,
+                storage_options=self.mongod_storage_options,
+                profiling=self.profiler.settings,
             )
             self.start_charm_services()
         except snap.SnapError as e:
@@ -1376,6 +1629,16 @@ class MongodbOperatorCharm(CharmBase):
 
     def auth_enabled(self) -> bool:
         """Returns true is a mongod service has the auth configuration."""
+        try:
+            with open(Config.MONGOD_CONF_FILE_PATH, "r") as mongod_config_file:
+                mongod_config = yaml.safe_load(mongod_config_file) or {}
+        except FileNotFoundError:
+            mongod_config = {}
+
+        if mongod_config.get("security", {}).get("authorization") == "enabled":
+            return True
+
+        # units which were not restarted since the options moved to the configuration file
         with open(Config.ENV_VAR_PATH, "r") as env_vars_file:
             env_vars = env_vars_file.readlines()
 
@@ -1383,8 +1646,7 @@ class MongodbOperatorCharm(CharmBase):
 
     def has_backup_service(self):
         """Verifies the backup service is available."""
-        snap_cache = snap.SnapCache()
-        mongodb_snap = snap_cache["charmed-mongodb"]
+        mongodb_snap = self.snap_cache[Config.SNAP_NAME]
         if mongodb_snap.present:
             return True
 
@@ -1412,8 +1674,7 @@ class MongodbOperatorCharm(CharmBase):
         Raises:
             snap.SnapError
         """
-        snap_cache = snap.SnapCache()
-        charmed_mongodb_snap = snap_cache["charmed-mongodb"]
+        charmed_mongodb_snap = self.snap_cache[Config.SNAP_NAME]
         charmed_mongodb_snap.start(services=["pbm-agent"], enable=True)
 
     def restart_backup_service(self) -> None:
@@ -1422,8 +1683,7 @@ class MongodbOperatorCharm(CharmBase):
         Raises:
             snap.SnapError
         """
-        snap_cache = snap.SnapCache()
-        charmed_mongodb_snap = snap_cache["charmed-mongodb"]
+        charmed_mongodb_snap = self.snap_cache[Config.SNAP_NAME]
         charmed_mongodb_snap.restart(services=["pbm-agent"])
 
     def _scope_obj(self, scope: Scopes) -> Application | Unit:
@@ -1514,6 +1774,25 @@ class MongodbOperatorCharm(CharmBase):
 
         return self.get_cluster_mismatched_revision_status()
 
+    def get_invalid_config_status(self) -> Optional[StatusBase]:
+        """Returns a status if an option of the charm config is invalid."""
+        # only the format of the cache size is validated, whatever the memory available
+        for option, parse in (
+            (Config.Connection.OPTIONS_KEY, parse_connection_options),
+            ("server-parameters", parse_server_parameters),
+            ("storage-cache-size", partial(self._parse_cache_size_gb, memory_gb=1)),
+        ):
+            try:
+                parse(self.model.config[option])
+            except ValueError as e:
+                return BlockedStatus(f"Invalid {option}: {e}")
+
+        for option in ("storage-block-compressor", "storage-journal-compressor"):
+            if self.model.config[option] not in Config.Storage.COMPRESSORS:
+                return BlockedStatus(f"Invalid {option} {self.model.config[option]}")
+
+        return None
+
     def is_relation_feasible(self, rel_interface) -> bool:
         """Returns true if the proposed relation is feasible."""
         if self.is_sharding_component() and rel_interface in Config.Relations.DB_RELATIONS:
@@ -1614,6 +1893,43 @@ class MongodbOperatorCharm(CharmBase):
 
         return self.shard.get_config_server_name()
 
+    def _configure_readiness_prober(self) -> None:
+        """Sets the readiness budget of the current hook for all the connections it makes."""
+        registry = MongoClientRegistry.active()
+        if not registry:
+            return
+
+        hook_name = os.environ.get("JUJU_DISPATCH_PATH", "").split("/")[-1]
+        registry.prober = ReadinessProber(
+            budget=Config.Readiness.HOOK_BUDGETS.get(
+                hook_name, Config.Readiness.DEFAULT_HOOK_BUDGET
+            ),
+            probe_timeout=Config.Readiness.PROBE_TIMEOUT,
+            local_precheck=self.is_mongod_running,
+            fail_fast=hook_name in Config.Readiness.FAIL_FAST_HOOKS,
+        )
+
+    def is_mongod_running(self) -> bool:
+        """Returns False when mongod is known to be down, without connecting to it."""
+        try:
+            mongodb_snap = self.snap_cache[Config.SNAP_NAME]
+            if not mongodb_snap.services.get("mongod", {}).get("active", False):
+                logger.debug("mongod service is not active.")
+                return False
+        except snap.SnapError as e:
+            # no conclusion can be drawn, leave it to the readiness probe.
+            logger.debug("Cannot check the status of the mongod service, error: %s", str(e))
+            return True
+
+        try:
+            with socket.create_connection(
+                ("localhost", Config.MONGODB_PORT), timeout=Config.Readiness.PORT_CHECK_TIMEOUT
+            ):
+                return True
+        except OSError:
+            logger.debug("mongod is not listening on port %d.", Config.MONGODB_PORT)
+            return False
+
     def is_db_service_ready(self) -> bool:
         """Returns True if the underlying database service is ready."""
         with MongoDBConnection(self.mongodb_config) as mongod:
@@ -1641,4 +1957,6 @@ class EarlyRemovalOfConfigServerError(Exception):
 
 
 if __name__ == "__main__":
-    main(MongodbOperatorCharm)
+    # share MongoDB clients across the whole hook and close them once it is over.
+    with MongoClientRegistry.hook_scope():
+        main(MongodbOperatorCharm)
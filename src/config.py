@@ -21,7 +21,8 @@ class Config:
     MONGOD_CONF_DIR = f"{MONGODB_SNAP_DATA_DIR}/etc/mongod"
     MONGOD_CONF_FILE_PATH = f"{MONGOD_CONF_DIR}/mongod.conf"
     CHARM_INTERNAL_VERSION_FILE = "charm_internal_version"
-    SNAP_PACKAGES = [("charmed-mongodb", "6/edge", 118)]
+    SNAP_NAME = "charmed-mongodb"
+    SNAP_PACKAGES = [(SNAP_NAME, "6/edge", 118)]
 
     # Keep these alphabetically sorted
     class Actions:
@@ -43,6 +44,11 @@ class Config:
         SERVICE_NAME = "pbm-agent"
         URI_PARAM_NAME = "pbm-uri"
 
+    class Drain:
+        """Shard draining related config for MongoDB Charm."""
+
+        STATE_KEY = "drain"
+
     class LogRotate:
         """Log rotate related constants."""
 
@@ -62,6 +68,122 @@ class Config:
         URI_PARAM_NAME = "monitor-uri"
         SERVICE_NAME = "mongodb-exporter"
 
+    class ServerParameters:
+        """Server parameters related config for MongoDB Charm."""
+
+        # server parameters users can tune with the server-parameters option, integer ones with
+        # the smallest value mongod accepts
+        INT_PARAMETERS = {
+            "wiredTigerConcurrentReadTransactions": 1,
+            "wiredTigerConcurrentWriteTransactions": 1,
+            "transactionLifetimeLimitSeconds": 1,
+            "maxIndexBuildMemoryUsageMegabytes": 50,
+            "ttlMonitorSleepSecs": 1,
+        }
+        BOOL_PARAMETERS = ["diagnosticDataCollectionEnabled"]
+        # server parameters which can be changed with setParameter, without restarting mongod.
+        # mongod only reads the others, i.e. processUmask, at startup.
+        RUNTIME_SETTABLE = (*INT_PARAMETERS, *BOOL_PARAMETERS)
+
+    class Profiling:
+        """Database profiler related config for MongoDB Charm."""
+
+        # operationProfiling.mode of mongod, indexed by profiler level
+        MODES = ["off", "slowOp", "all"]
+        # the profiler settings are applied with the profile command, without restarting mongod
+        CONFIG_SECTION = "operationProfiling"
+        DEFAULT_SLOW_QUERIES_LIMIT = 10
+
+    class Storage:
+        """Storage engine related config for MongoDB Charm."""
+
+        COMPRESSORS = ["none", "snappy", "zlib", "zstd"]
+        # the WiredTiger cache defaults to half of the memory left once this much is reserved
+        RESERVED_MEMORY_GB = 1
+        CACHE_SIZE_RATIO = 0.5
+        MIN_CACHE_SIZE_GB = 0.25
+        # metadata mongod writes in the data directory on its first start
+        METADATA_FILE = "storage.bson"
+        CGROUP_MEMORY_LIMIT_FILES = [
+            "/sys/fs/cgroup/memory.max",
+            "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+        ]
+
+    class RollingRestart:
+        """Rolling restart related config for MongoDB Charm."""
+
+        # unit peer data keys: when the restart was requested, when mongod was restarted, how
+        # long handing over the primary took, and the timings of the last restart
+        REQUESTED_KEY = "restart-requested"
+        RESTARTED_KEY = "restart-restarted-at"
+        HANDOVER_KEY = "restart-primary-handover"
+        TIMINGS_KEY = "restart-timings"
+        # app peer data key holding the unit granted the restart lock
+        GRANTED_KEY = "restart-granted"
+        # seconds a hook waits for the restarted member to catch up before retrying later
+        CATCH_UP_TIMEOUT = 60
+        CATCH_UP_INTERVAL = 5
+
+    class Oplog:
+        """Oplog sizing related config for MongoDB Charm."""
+
+        # the oplog is grown with some headroom, to absorb write bursts
+        GROWTH_FACTOR = 1.2
+        # smallest oplog mongod accepts, in megabytes
+        MIN_SIZE_MB = 990
+        # share of the free disk space the oplog may grow into
+        MAX_FREE_DISK_RATIO = 0.5
+
+    class Connection:
+        """Client connection string related config for MongoDB Charm."""
+
+        # databag field and config option holding the options of the published connection URIs
+        OPTIONS_KEY = "connection-options"
+        # compressors mongod negotiates with clients, in order of preference
+        COMPRESSORS = ["zstd", "snappy", "zlib"]
+        READ_PREFERENCES = [
+            "primary",
+            "primaryPreferred",
+            "secondary",
+            "secondaryPreferred",
+            "nearest",
+        ]
+        READ_CONCERN_LEVELS = ["local", "majority", "available"]
+        INT_OPTIONS = [
+            "maxPoolSize",
+            "minPoolSize",
+            "maxIdleTimeMS",
+            "waitQueueTimeoutMS",
+            "connectTimeoutMS",
+            "socketTimeoutMS",
+            "wtimeoutMS",
+        ]
+        BOOL_OPTIONS = ["retryWrites", "retryReads"]
+
+    class Readiness:
+        """Readiness probing related config for MongoDB Charm."""
+
+        # seconds all readiness probes of a hook may take, keyed by hook or action name. Hooks
+        # which (re)start mongod wait for it to come back up, i.e. replay its journal.
+        RESTART_BUDGET = 180
+        HOOK_BUDGETS = {
+            "start": RESTART_BUDGET,
+            "upgrade-charm": RESTART_BUDGET,
+            "upgrade-version-a-relation-changed": RESTART_BUDGET,
+            "resume-upgrade": RESTART_BUDGET,
+            "force-upgrade": RESTART_BUDGET,
+            "database-peers-relation-changed": RESTART_BUDGET,
+            "certificates-relation-changed": RESTART_BUDGET,
+            "certificates-relation-broken": RESTART_BUDGET,
+            "update-status": 20,
+        }
+        # other hooks and actions expect mongod to be up already: a full probe plus headroom
+        DEFAULT_HOOK_BUDGET = 90
+        PROBE_TIMEOUT = 60
+        # hooks in which mongod is not expected to be starting, so a down service fails the probe
+        FAIL_FAST_HOOKS = ["update-status"]
+        PORT_CHECK_TIMEOUT = 1
+
     class TLS:
         """TLS related config for MongoDB Charm."""
 
@@ -117,6 +239,10 @@ class Config:
 
         STATUS_READY_FOR_UPGRADE = "status-shows-ready-for-upgrade"
 
+        # statuses of subsystems reused across update-status hooks while their inputs are
+        # unchanged, and recomputed at least once every CACHE_MAX_AGE seconds.
+        CACHE_MAX_AGE = 900
+
         # TODO Future PR add more status messages here as constants
         UNHEALTHY_UPGRADE = BlockedStatus("Unhealthy after upgrade.")
 
@@ -3,16 +3,24 @@
 # Copyright 2023 Canonical Ltd.
 # See LICENSE file for licensing details.
 import logging
+import os
+from dataclasses import replace
+from typing import Any, Dict, Optional
 
+import bson
 import jinja2
+import yaml
 from charms.mongodb.v1.helpers import (
+    DATA_DIR,
     LOG_DIR,
     MONGODB_COMMON_DIR,
+    ConfigChanges,
     add_args_to_env,
-    get_mongod_args,
+    diff_mongod_config,
+    get_mongod_config,
     get_mongos_args,
 )
-from charms.mongodb.v1.mongodb import MongoDBConfiguration
+from charms.mongodb.v1.mongodb import MongoDBConfiguration, ProfilingSettings
 
 from config import Config
 
@@ -24,18 +32,99 @@ MONGO_USER = "snap_daemon"
 
 
 def update_mongod_service(
-    machine_ip: str, config: MongoDBConfiguration, role: str = "replication"
-) -> None:
-    """Updates the mongod service file with the new options for starting."""
-    # write our arguments and write them to /etc/environment - the environment variable here is
-    # read in in the charmed-mongob.mongod.service file.
-    mongod_start_args = get_mongod_args(config, auth=True, role=role, snap_install=True)
-    add_args_to_env("MONGOD_ARGS", mongod_start_args)
+    machine_ip: str,
+    config: MongoDBConfiguration,
+    role: str = "replication",
+    parameters: Optional[Dict[str, Any]] = None,
+    storage_options: Optional[Dict[str, Optional[str]]] = None,
+    profiling: Optional[ProfilingSettings] = None,
+) -> ConfigChanges:
+    """Updates the mongod configuration file with the new options for starting.
+
+    The file is only rewritten if its content changed. mongod reads it from
+    Config.MONGOD_CONF_FILE_PATH when it starts, the options it was previously started with on
+    the command line are dropped so that they do not override the file.
+
+    Returns:
+        the changes to the configuration, split between the server parameters and profiler
+        settings which can be set at runtime and the options which require a restart of mongod.
+    """
+    mongod_config = get_mongod_config(
+        config,
+        auth=True,
+        role=role,
+        snap_install=True,
+        parameters=parameters,
+        compressors=Config.Connection.COMPRESSORS,
+        storage_options=storage_options,
+        profiling=profiling,
+    )
+    try:
+        with open(Config.MONGOD_CONF_FILE_PATH, "r") as f:
+            current_config = yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        current_config = {}
+
+    config_changes = diff_mongod_config(
+        current_config,
+        mongod_config,
+        runtime_parameters=Config.ServerParameters.RUNTIME_SETTABLE,
+        runtime_sections=(Config.Profiling.CONFIG_SECTION,),
+    )
+    if config_changes:
+        with open(Config.MONGOD_CONF_FILE_PATH, "w") as f:
+            yaml.safe_dump(mongod_config, f, sort_keys=True)
+
+    # the environment variable here is read in in the charmed-mongob.mongod.service file.
+    if add_args_to_env("MONGOD_ARGS", "\n"):
+        config_changes = replace(
+            config_changes, restart_options=[*config_changes.restart_options, "MONGOD_ARGS"]
+        )
 
     if role == Config.Role.CONFIG_SERVER:
         mongos_start_args = get_mongos_args(config, snap_install=True)
         add_args_to_env("MONGOS_ARGS", mongos_start_args)
 
+    return config_changes
+
+
+def get_memory_limit() -> int:
+    """Returns the bytes of memory available to the unit.
+
+    This is the lower of the physical memory of the machine and the limit of the memory cgroup,
+    if any, i.e. on a LXD container sharing its host.
+    """
+    memory_limit = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    for limit_file in Config.Storage.CGROUP_MEMORY_LIMIT_FILES:
+        try:
+            with open(limit_file, "r") as f:
+                limit = f.read().strip()
+        except OSError:
+            continue
+
+        # cgroup v2 reports "max" when there is no limit, v1 reports a huge number
+        if limit.isdigit():
+            memory_limit = min(memory_limit, int(limit))
+
+    return memory_limit
+
+
+def get_data_directory_per_db() -> Optional[bool]:
+    """Returns whether the existing data is laid out with a directory per database.
+
+    Returns:
+        None if mongod has not initialised its data yet.
+    """
+    metadata_path = f"{MONGODB_COMMON_DIR}{DATA_DIR}/{Config.Storage.METADATA_FILE}"
+    try:
+        with open(metadata_path, "rb") as f:
+            metadata = bson.decode(f.read())
+    except FileNotFoundError:
+        return None
+
+    # mongod records the options the data was created with under storage.options
+    return bool(metadata.get("storage", {}).get("options", {}).get("directoryPerDB", False))
+
 
 def setup_logrotate_and_cron() -> None:
     """Create and write the logrotate config file.
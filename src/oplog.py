@@ -0,0 +1,121 @@
+# Copyright 2024 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Manager for sizing the oplog of MongoDB to a replication window."""
+
+import logging
+import math
+import shutil
+from typing import Optional
+
+from charms.mongodb.v1.helpers import DATA_DIR, MONGODB_COMMON_DIR
+from charms.mongodb.v1.mongodb import MongoDBConnection, OplogWindow
+from ops.charm import CharmBase
+from ops.framework import Object
+from ops.model import ActiveStatus, StatusBase
+from pymongo.errors import PyMongoError
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+BYTES_PER_MB = 1024**2
+SECONDS_PER_HOUR = 3600
+
+
+class OplogManager(Object):
+    """Samples the replication window of the unit and grows its oplog to a minimum window."""
+
+    def __init__(self, charm: CharmBase):
+        super().__init__(charm, "oplog")
+        self.charm = charm
+        # sampled once per hook, the window changes with every write so it is not persisted.
+        self.oplog_window: Optional[OplogWindow] = None
+
+    @property
+    def min_window(self) -> float:
+        """Minimum replication window the oplog should hold, in seconds."""
+        return self.charm.model.config["oplog-min-window"] * SECONDS_PER_HOUR
+
+    def update(self) -> None:
+        """Samples the oplog window of the unit and resizes the oplog if it is too short.
+
+        The sampling and resizing use a direct connection, since each member has its own oplog:
+        the window is read with the monitor user, the oplog is resized with the operator user.
+        Without a minimum window the oplog is left alone, its window is still exported as a
+        metric.
+        """
+        if not self.min_window:
+            return
+
+        try:
+            with MongoDBConnection(self.charm.monitor_config, direct=True) as mongo:
+                self.oplog_window = oplog_window = mongo.get_oplog_window()
+        except PyMongoError as e:
+            logger.error("Failed to sample the oplog window, error=%r", e)
+            return
+
+        if oplog_window is None:
+            return
+
+        size = self.get_target_size(oplog_window)
+        if size is None:
+            return
+
+        logger.info(
+            "Oplog window %.1fh is below %.1fh, resizing the oplog from %dMB to %dMB.",
+            oplog_window.window / SECONDS_PER_HOUR,
+            self.min_window / SECONDS_PER_HOUR,
+            oplog_window.max_size // BYTES_PER_MB,
+            size,
+        )
+        local_config = self.charm.remote_mongodb_config(
+            {self.charm.unit_host(self.charm.unit)}, standalone=True
+        )
+        try:
+            with MongoDBConnection(local_config, direct=True) as mongo:
+                mongo.resize_oplog(size)
+        except PyMongoError as e:
+            logger.error("Failed to resize the oplog, error=%r", e)
+
+    def get_target_size(self, oplog_window: OplogWindow) -> Optional[int]:
+        """Returns the size, in megabytes, the oplog should grow to, None if it should not.
+
+        The oplog only grows once it is full: until then its window tells how long the unit has
+        been written to, not how long the oplog can hold. The size needed to hold the minimum
+        window is extrapolated from the current write rate, and capped by the free disk space.
+        """
+        if not self.min_window or not oplog_window.is_full:
+            return None
+
+        if oplog_window.window <= 0 or oplog_window.window >= self.min_window:
+            return None
+
+        needed_size = (
+            oplog_window.size * self.min_window / oplog_window.window * Config.Oplog.GROWTH_FACTOR
+        )
+        free_disk = shutil.disk_usage(f"{MONGODB_COMMON_DIR}{DATA_DIR}").free
+        max_size = oplog_window.max_size + free_disk * Config.Oplog.MAX_FREE_DISK_RATIO
+        size = max(math.ceil(min(needed_size, max_size) / BYTES_PER_MB), Config.Oplog.MIN_SIZE_MB)
+        if size * BYTES_PER_MB <= oplog_window.max_size:
+            logger.warning("Not enough free disk space to grow the oplog.")
+            return None
+
+        return size
+
+    def get_unit_status(self, unit_status: StatusBase) -> StatusBase:
+        """Returns the status of the unit, reporting the sampled oplog window if it is too short.
+
+        Only an active unit reports its oplog window, any other status takes precedence.
+        """
+        if not isinstance(unit_status, ActiveStatus) or self.oplog_window is None:
+            return unit_status
+
+        if self.oplog_window.window >= self.min_window:
+            return unit_status
+
+        oplog_message = (
+            f"oplog window {self.oplog_window.window / SECONDS_PER_HOUR:.1f}h "
+            f"below {self.min_window / SECONDS_PER_HOUR:.0f}h"
+        )
+        return ActiveStatus(", ".join(filter(None, [unit_status.message, oplog_message])))
@@ -0,0 +1,237 @@
+# Copyright 2024 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Manager for the database profiler of MongoDB, and the report of its slow operations."""
+
+import json
+import logging
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Dict, Iterable, List
+
+from charms.mongodb.v1.mongodb import (
+    DeadlineExceededError,
+    MongoDBConnection,
+    ProfilingSettings,
+    SlowOperation,
+    gather,
+)
+from ops.charm import ActionEvent, CharmBase
+from ops.framework import Object
+from pymongo.errors import PyMongoError
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# keys of the command holding the predicate of the operation, in order of precedence
+PREDICATE_KEYS = ("filter", "q", "query", "pipeline")
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass
+class QueryShapeStats:
+    """Slow operations sharing a query shape, across the members of the replica set.
+
+    — shape: normalised query shape, see get_query_shape.
+    — latencies: durations of the operations, in milliseconds.
+    — docs_examined: documents scanned by the finished operations.
+    — returned: documents returned by the finished operations.
+    — plan_summaries: number of operations of each query plan.
+    — in_progress: number of operations which were still running.
+    """
+
+    shape: str
+    latencies: List[float] = field(default_factory=list)
+    docs_examined: int = 0
+    returned: int = 0
+    plan_summaries: Counter = field(default_factory=Counter)
+    in_progress: int = 0
+
+    @property
+    def total(self) -> float:
+        """Total time spent in the operations, in milliseconds."""
+        return sum(self.latencies)
+
+    def add(self, operation: SlowOperation) -> None:
+        """Accounts for an operation of the shape."""
+        self.latencies.append(operation.millis)
+        self.docs_examined += operation.docs_examined or 0
+        self.returned += operation.returned
+        self.plan_summaries[operation.plan_summary or "unknown"] += 1
+        self.in_progress += operation.in_progress
+
+    def percentile(self, percent: int) -> float:
+        """Latency below which the given percentage of the operations fall, by nearest rank."""
+        latencies = sorted(self.latencies)
+        rank = math.ceil(percent / 100 * len(latencies))
+        return latencies[max(rank, 1) - 1]
+
+    def to_results(self) -> Dict[str, str]:
+        """Returns the statistics of the shape, formatted as action results."""
+        results = {
+            "shape": self.shape,
+            "count": str(len(self.latencies)),
+            "in-progress": str(self.in_progress),
+            "total-ms": f"{self.total:.0f}",
+            # a high ratio points at a missing or unselective index
+            "docs-examined-per-returned": f"{self.docs_examined / max(self.returned, 1):.1f}",
+            "plan": self.plan_summaries.most_common(1)[0][0],
+        }
+        for percent in PERCENTILES:
+            results[f"p{percent}-ms"] = f"{self.percentile(percent):.0f}"
+
+        return results
+
+
+def get_query_shape(operation: SlowOperation) -> str:
+    """Returns the shape of the query of an operation.
+
+    The shape is the type and namespace of the operation, along with its predicate where the
+    values are replaced by "?": operations differing only by the values they query share a
+    shape. Field paths of aggregation pipelines, i.e. "$amount", are kept.
+    """
+    predicate = next(
+        (operation.command[key] for key in PREDICATE_KEYS if key in operation.command), {}
+    )
+    shape = json.dumps(_normalise(predicate), separators=(",", ":"))
+    return f"{operation.op} {operation.ns} {shape}"
+
+
+def _normalise(value: Any) -> Any:
+    """Replaces the values of a predicate by "?", keeping its fields and operators."""
+    if isinstance(value, dict):
+        return {key: _normalise(item) for key, item in value.items()}
+
+    if isinstance(value, list):
+        if all(not isinstance(item, (dict, list)) for item in value):
+            # lists of values, i.e. of $in, match the same shape whatever their length
+            return "?"
+        return [_normalise(item) for item in value]
+
+    if isinstance(value, str) and value.startswith("$"):
+        return value
+
+    return "?"
+
+
+def summarise_slow_operations(
+    operations: Iterable[SlowOperation], limit: int
+) -> List[QueryShapeStats]:
+    """Groups operations by query shape and returns the shapes which took the most time."""
+    shapes = {}
+    for operation in operations:
+        shape = get_query_shape(operation)
+        shapes.setdefault(shape, QueryShapeStats(shape=shape)).add(operation)
+
+    return sorted(shapes.values(), key=lambda stats: stats.total, reverse=True)[:limit]
+
+
+class ProfilerManager(Object):
+    """Applies the profiler settings of the charm config to the unit and reports slow queries."""
+
+    def __init__(self, charm: CharmBase):
+        super().__init__(charm, "profiler")
+        self.charm = charm
+        self.framework.observe(charm.on.get_slow_queries_action, self._on_get_slow_queries_action)
+
+    @property
+    def settings(self) -> ProfilingSettings:
+        """Settings of the profiler, based on the charm config."""
+        try:
+            return ProfilingSettings(
+                level=self.charm.model.config["profiling-level"],
+                slow_ms=self.charm.model.config["profiling-slow-ms"],
+                sample_rate=self.charm.model.config["profiling-sample-rate"],
+            )
+        except ValueError as e:
+            logger.error("Invalid profiling settings, using the defaults: %s", str(e))
+            return ProfilingSettings()
+
+    def update(self) -> bool:
+        """Applies the profiler settings to the mongod of this unit, if they drifted.
+
+        mongod starts with the settings of its configuration file, the level of the databases
+        created since or changed by hand is set again.
+
+        Returns:
+            whether the settings are applied.
+        """
+        settings = self.settings
+        local_config = self.charm.remote_mongodb_config(
+            {self.charm.unit_host(self.charm.unit)}, standalone=True
+        )
+        try:
+            with MongoDBConnection(local_config, direct=True) as mongo:
+                changed = mongo.set_profiling(settings)
+        except PyMongoError as e:
+            logger.error("Failed to apply the profiling settings, error=%r", e)
+            return False
+
+        if changed:
+            logger.info("Applied the profiling settings %s.", settings)
+
+        return True
+
+    def reconcile(self) -> None:
+        """Applies the profiler settings again, if the profiler is enabled.
+
+        With the profiler disabled there is nothing to reconcile: mongod runs with the slow
+        operation threshold of its configuration file, and every database, including those
+        created since, is profiled with its operationProfiling.mode, i.e. not at all.
+        """
+        if not self.settings.level:
+            return
+
+        self.update()
+
+    def _on_get_slow_queries_action(self, event: ActionEvent) -> None:
+        """Returns the query shapes of the slow operations which took the most time.
+
+        The profiled and running operations of each member are read concurrently, with a direct
+        connection, since each member profiles the operations it serves.
+        """
+        limit = event.params.get("limit", Config.Profiling.DEFAULT_SLOW_QUERIES_LIMIT)
+        hosts = sorted(self.charm.app_hosts)
+        try:
+            member_operations = gather(
+                [partial(self._get_slow_operations, host) for host in hosts],
+                return_exceptions=True,
+            )
+        except DeadlineExceededError as e:
+            event.fail(f"Failed to read the slow operations in time: {e}")
+            return
+
+        operations = []
+        unreachable = []
+        for host, result in zip(hosts, member_operations):
+            if isinstance(result, Exception):
+                logger.error("Failed to read the slow operations of %s, error=%r", host, result)
+                unreachable.append(host)
+            else:
+                operations.extend(result)
+
+        if len(unreachable) == len(hosts):
+            event.fail(f"Failed to read the slow operations of {', '.join(unreachable)}.")
+            return
+
+        shapes = summarise_slow_operations(operations, limit)
+        results = {
+            "profiling-level": str(self.settings.level),
+            "operations": str(len(operations)),
+            "unreachable-members": ",".join(unreachable) or "none",
+        }
+        if shapes:
+            results["shapes"] = {
+                str(rank): stats.to_results() for rank, stats in enumerate(shapes, start=1)
+            }
+
+        event.set_results(results)
+
+    def _get_slow_operations(self, host: str) -> List[SlowOperation]:
+        """Returns the slow operations of a member."""
+        member_config = self.charm.remote_mongodb_config({host}, standalone=True)
+        with MongoDBConnection(member_config, direct=True) as mongo:
+            return mongo.get_slow_operations(self.settings.slow_ms)
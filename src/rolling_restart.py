@@ -0,0 +1,247 @@
+# Copyright 2024 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Coordinator restarting mongod on the units of the replica set one at a time."""
+
+import json
+import logging
+import time
+from typing import Dict, List
+
+from charms.mongodb.v1.mongodb import (
+    FailedToMovePrimaryError,
+    MongoDBConnection,
+    NotReadyError,
+)
+from ops.charm import ActionEvent, CharmBase
+from ops.framework import Object
+from pymongo.errors import PyMongoError
+from tenacity import RetryError, Retrying, stop_after_delay, wait_fixed
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class RollingRestart(Object):
+    """Restarts mongod on one unit at a time, secondaries first and the primary last.
+
+    The lock is held in the peer relation: units request a restart in their databag, the leader
+    grants the lock to one of them in the application databag. The unit holding the lock hands
+    over its primary if it is one, restarts, and releases the lock once it is a secondary which
+    caught up with the primary again.
+    """
+
+    def __init__(self, charm: CharmBase):
+        super().__init__(charm, "rolling-restart")
+        self.charm = charm
+        self.framework.observe(
+            charm.on[Config.Relations.PEERS].relation_changed, self._on_peer_relation_changed
+        )
+        self.framework.observe(
+            charm.on[Config.Relations.PEERS].relation_departed, self._on_peer_relation_changed
+        )
+        self.framework.observe(charm.on.update_status, self._on_peer_relation_changed)
+        self.framework.observe(
+            charm.on.get_restart_status_action, self._on_get_restart_status_action
+        )
+
+    def request_restart(self) -> None:
+        """Requests mongod of this unit to be restarted once it holds the restart lock."""
+        if self.charm.unit_peer_data.get(Config.RollingRestart.REQUESTED_KEY):
+            return
+
+        logger.info("Requesting a restart of mongod.")
+        self.charm.unit_peer_data[Config.RollingRestart.REQUESTED_KEY] = f"{time.time():.3f}"
+        self._on_peer_relation_changed(None)
+
+    def _on_peer_relation_changed(self, _) -> None:
+        """Grants the lock to the next unit and restarts this unit if it holds the lock."""
+        if not self.charm.peers:
+            return
+
+        if self.charm.unit.is_leader():
+            self._grant_lock()
+
+        if self.charm.app_peer_data.get(Config.RollingRestart.GRANTED_KEY) != self.charm.unit.name:
+            return
+
+        if not self.charm.unit_peer_data.get(Config.RollingRestart.REQUESTED_KEY):
+            return
+
+        if self._restart():
+            self._release_lock()
+
+    def _grant_lock(self) -> None:
+        """Grants the lock to the next unit requesting a restart, if no unit holds it."""
+        requests = self._get_requests()
+        granted_unit = self.charm.app_peer_data.get(Config.RollingRestart.GRANTED_KEY)
+        if granted_unit in requests:
+            return
+
+        if not requests:
+            if granted_unit:
+                self.charm.app_peer_data[Config.RollingRestart.GRANTED_KEY] = ""
+            return
+
+        next_unit = self._get_restart_order(requests)[0]
+        logger.info("Granting the restart lock to %s.", next_unit)
+        self.charm.app_peer_data[Config.RollingRestart.GRANTED_KEY] = next_unit
+
+    def _get_requests(self) -> Dict[str, float]:
+        """Returns the time each unit requested a restart at, keyed by unit name."""
+        requests = {}
+        for unit in [self.charm.unit, *self.charm.peers_units]:
+            requested_at = self.charm.peers.data[unit].get(Config.RollingRestart.REQUESTED_KEY)
+            if requested_at:
+                requests[unit.name] = float(requested_at)
+
+        return requests
+
+    def _get_restart_order(self, requests: Dict[str, float]) -> List[str]:
+        """Returns the units requesting a restart, secondaries first and the primary last."""
+        primary = self.charm.primary
+        return sorted(requests, key=lambda unit_name: (unit_name == primary, requests[unit_name]))
+
+    def _restart(self) -> bool:
+        """Restarts mongod on this unit, unless it already did, and waits for it to catch up.
+
+        Returns:
+            whether the unit is healthy again and the lock can be released.
+        """
+        if not self.charm.unit_peer_data.get(Config.RollingRestart.RESTARTED_KEY):
+            if not self._hand_over_primary():
+                return False
+
+            started_at = time.time()
+            logger.info("Restarting mongod, holding the restart lock.")
+            self.charm.restart_charm_services()
+            self.charm.unit_peer_data[Config.RollingRestart.RESTARTED_KEY] = f"{started_at:.3f}"
+
+        try:
+            for attempt in Retrying(
+                stop=stop_after_delay(Config.RollingRestart.CATCH_UP_TIMEOUT),
+                wait=wait_fixed(Config.RollingRestart.CATCH_UP_INTERVAL),
+                reraise=True,
+            ):
+                with attempt:
+                    if not self._is_caught_up():
+                        raise NotReadyError
+        except (NotReadyError, RetryError):
+            logger.info("mongod restarted, waiting for it to catch up with the primary.")
+            return False
+
+        self._record_timings()
+        return True
+
+    def _hand_over_primary(self) -> bool:
+        """Moves the primary to the most up to date secondary, if this unit is the primary.
+
+        Only secondaries with a vote and a priority are candidates, the members without a vote
+        cannot be elected.
+
+        Returns:
+            whether this unit is not the primary anymore, or there is no member to hand over to.
+        """
+        host = self.charm.unit_host(self.charm.unit)
+        try:
+            with MongoDBConnection(self.charm.mongodb_config) as mongo:
+                topology = mongo.get_topology(refresh=True)
+                if topology.primary != host:
+                    return True
+
+                electable_members = mongo.get_electable_members()
+                secondaries = [
+                    member.host
+                    for member in topology.members
+                    if member.state_str == "SECONDARY"
+                    and member.host in electable_members
+                    and topology.lag(member.host) is not None
+                ]
+                if not secondaries:
+                    logger.info("No secondary to hand over the primary to, restarting anyway.")
+                    return True
+
+                new_primary = min(secondaries, key=topology.lag)
+                logger.info("Moving the primary to %s before restarting.", new_primary)
+                latency = mongo.move_primary(new_primary_ip=new_primary)
+        except (NotReadyError, FailedToMovePrimaryError, PyMongoError) as e:
+            logger.error("Failed to hand over the primary before restarting, error=%r", e)
+            return False
+
+        self.charm.unit_peer_data[Config.RollingRestart.HANDOVER_KEY] = f"{latency:.3f}"
+        return True
+
+    def _is_caught_up(self) -> bool:
+        """Returns whether this unit is a secondary at most promotion-max-lag behind primary."""
+        host = self.charm.unit_host(self.charm.unit)
+        try:
+            with MongoDBConnection(self.charm.mongodb_config) as mongo:
+                topology = mongo.get_topology(refresh=True)
+        except PyMongoError as e:
+            logger.debug("Cannot check the state of the restarted member, error=%r", e)
+            return False
+
+        if topology.states.get(host) == "PRIMARY":
+            return True
+
+        lag = topology.lag(host)
+        return (
+            topology.states.get(host) == "SECONDARY"
+            and lag is not None
+            and lag <= self.charm.model.config["promotion-max-lag"]
+        )
+
+    def _record_timings(self) -> None:
+        """Records how long this unit waited for the lock, handed over, restarted and caught up."""
+        requested_at = float(self.charm.unit_peer_data[Config.RollingRestart.REQUESTED_KEY])
+        restarted_at = float(self.charm.unit_peer_data[Config.RollingRestart.RESTARTED_KEY])
+        now = time.time()
+        timings = {
+            "completed-at": round(now, 3),
+            "waited": round(restarted_at - requested_at, 3),
+            "restart-and-catch-up": round(now - restarted_at, 3),
+            "total": round(now - requested_at, 3),
+        }
+        handover = self.charm.unit_peer_data.get(Config.RollingRestart.HANDOVER_KEY)
+        if handover:
+            timings["primary-handover"] = float(handover)
+
+        logger.info("mongod restarted and caught up: %s", timings)
+        self.charm.unit_peer_data[Config.RollingRestart.TIMINGS_KEY] = json.dumps(timings)
+
+    def _release_lock(self) -> None:
+        """Clears the restart request of this unit, which releases its lock."""
+        logger.info("Releasing the restart lock.")
+        self.charm.unit_peer_data[Config.RollingRestart.REQUESTED_KEY] = ""
+        self.charm.unit_peer_data[Config.RollingRestart.RESTARTED_KEY] = ""
+        self.charm.unit_peer_data[Config.RollingRestart.HANDOVER_KEY] = ""
+        if self.charm.unit.is_leader():
+            # the leader is not notified of the changes to its own databag
+            self._grant_lock()
+
+    def _on_get_restart_status_action(self, event: ActionEvent) -> None:
+        """Returns the units waiting for a restart, the lock holder and the last timings.
+
+        The restarts of the other services of the unit, i.e. mongodb-exporter, are reported too.
+        """
+        if not self.charm.peers:
+            event.fail("The peer relation is not available yet.")
+            return
+
+        results = {
+            "lock-holder": self.charm.app_peer_data.get(Config.RollingRestart.GRANTED_KEY)
+            or "none",
+            "pending": ",".join(sorted(self._get_requests())) or "none",
+        }
+        last_restart = json.loads(
+            self.charm.unit_peer_data.get(Config.RollingRestart.TIMINGS_KEY) or "{}"
+        )
+        if last_restart:
+            results["last-restart"] = {key: str(value) for key, value in last_restart.items()}
+
+        workload_restarts = self.charm.workload_services.get_restart_stats()
+        if workload_restarts:
+            results["workload-services"] = workload_restarts
+
+        event.set_results(results)
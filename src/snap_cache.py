@@ -0,0 +1,87 @@
+# Copyright 2024 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Snap cache of the unit, loading only the snaps the charm looks up."""
+
+import logging
+from typing import Dict
+
+from charms.operator_libs_linux.v2 import snap
+
+logger = logging.getLogger(__name__)
+
+
+class _CountingSnapClient(snap.SnapClient):
+    """Snapd client counting the requests it sends, to measure the snapd load of a hook."""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = 0
+
+    def _request_raw(self, method: str, path: str, *args, **kwargs):
+        self.requests += 1
+        logger.debug("snapd request %d: %s %s", self.requests, method, path)
+        return super()._request_raw(method, path, *args, **kwargs)
+
+    def get_installed_snap(self, name: str) -> Dict:
+        """Get information about a single installed snap."""
+        return self._request("GET", f"snaps/{name}")
+
+
+class LazySnapCache(snap.SnapCache):
+    """SnapCache looking up the snaps one by one, when they are first requested.
+
+    snap.SnapCache loads every installed snap from snapd, and the list of available snaps from
+    disk, when it is created. The charm only ever needs charmed-mongodb: this cache requests the
+    snaps it is asked for, with a single snapd request each, and is shared by the whole hook
+    through MongodbOperatorCharm.snap_cache. Only the snaps already looked up are part of the
+    mapping.
+    """
+
+    def __init__(self):
+        if not self.snapd_installed:
+            raise snap.SnapError("snapd is not installed or not in /usr/bin") from None
+
+        self._snap_client = _CountingSnapClient()
+        self._snap_map = {}
+
+    @property
+    def requests(self) -> int:
+        """Number of snapd API requests sent by the cache and the snaps it loaded."""
+        return self._snap_client.requests
+
+    def __getitem__(self, snap_name: str) -> snap.Snap:
+        """Return the installed version of the snap, or its latest version if not installed."""
+        if self._snap_map.get(snap_name) is None:
+            self._snap_map[snap_name] = self._load_snap(snap_name)
+
+        return self._snap_map[snap_name]
+
+    def _load_snap(self, snap_name: str) -> snap.Snap:
+        """Loads an installed snap, falling back to the store if it is not installed."""
+        try:
+            info = self._snap_client.get_installed_snap(snap_name)
+        except snap.SnapAPIError as e:
+            if e.code != 404:
+                raise snap.SnapError(f"Failed to look up snap {snap_name}: {e.message}")
+
+            try:
+                return self._share_client(self._load_info(snap_name))
+            except snap.SnapAPIError:
+                raise snap.SnapNotFoundError(f"Snap '{snap_name}' not found!")
+
+        return self._share_client(
+            snap.Snap(
+                name=info["name"],
+                state=snap.SnapState.Latest,
+                channel=info["channel"],
+                revision=info["revision"],
+                confinement=info["confinement"],
+                apps=info.get("apps", None),
+            )
+        )
+
+    def _share_client(self, loaded_snap: snap.Snap) -> snap.Snap:
+        """Makes the snap send its own requests, i.e. for its services, through the cache."""
+        loaded_snap._snap_client = self._snap_client
+        return loaded_snap
@@ -6,9 +6,12 @@
 import logging
 import secrets
 import string
-from typing import List, Optional, Tuple
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import Dict, List, Optional, Tuple
 
-from charms.mongodb.v1.mongodb import MongoDBConfiguration, MongoDBConnection
+from charms.mongodb.v1.mongodb import MongoDBConfiguration, MongoDBConnection, gather
 from charms.mongodb.v1.mongos import (
     BalancerNotEnabledError,
     MongosConfiguration,
@@ -47,6 +50,24 @@ class BalancerStillRunningError(Exception):
 # END: Exceptions
 
 
+@dataclass(frozen=True)
+class ReplicaSetHealth:
+    """Outcome of the health check of a single replica set of the deployment."""
+
+    replset: str
+    healthy: bool
+    latency: float
+    error: Optional[str] = None
+
+    def to_action_result(self) -> Dict[str, str]:
+        """Returns the health of the replica set in a format suitable for action results."""
+        result = {"healthy": str(self.healthy).lower(), "latency": f"{self.latency:.3f}s"}
+        if self.error:
+            result["error"] = self.error
+
+        return result
+
+
 class _PostUpgradeCheckMongoDB(EventBase):
     """Run post upgrade check on MongoDB to verify that the cluster is healhty."""
 
@@ -63,6 +84,8 @@ class MongoDBUpgrade(Object):
     def __init__(self, charm: CharmBase):
         self.charm = charm
         super().__init__(charm, upgrade.PEER_RELATION_ENDPOINT_NAME)
+        # health of each replica set, as found by the last check of the nodes of the deployment.
+        self.health_report: List[ReplicaSetHealth] = []
         self.framework.observe(
             charm.on[upgrade.PRECHECK_ACTION_NAME].action, self._on_pre_upgrade_check_action
         )
@@ -151,10 +174,11 @@ class MongoDBUpgrade(Object):
                 f"Charm is *not* ready for upgrade. Pre-upgrade check failed: {exception.message}"
             )
             logger.debug(f"Pre-upgrade check event failed: {message}")
+            event.set_results(self.get_health_report_results())
             event.fail(message)
             return
         message = "Charm is ready for upgrade"
-        event.set_results({"result": message})
+        event.set_results({"result": message, **self.get_health_report_results()})
         logger.debug(f"Pre-upgrade check event succeeded: {message}")
 
     def _on_resume_upgrade_action(self, event: ActionEvent) -> None:
@@ -279,7 +303,7 @@ class MongoDBUpgrade(Object):
     def move_primary_to_last_upgrade_unit(self) -> None:
         """Moves the primary to last unit that gets upgraded (the unit with the lowest id).
 
-        Raises FailedToMovePrimaryError
+        Raises FailedToMovePrimaryError, NotReadyError if the last unit is lagging behind
         """
         # no need to move primary in the scenario of one unit
         if len(self._upgrade._sorted_units) < 2:
@@ -294,7 +318,8 @@ class MongoDBUpgrade(Object):
                 return
 
             logger.debug("Moving primary to unit: %s", unit_with_lowest_id)
-            mongod.move_primary(new_primary_ip=self.charm.unit_host(unit_with_lowest_id))
+            latency = mongod.move_primary(new_primary_ip=self.charm.unit_host(unit_with_lowest_id))
+            logger.info("Moved primary to unit %s in %.2fs", unit_with_lowest_id, latency)
 
     def _set_upgrade_status(self):
         # In the future if we decide to support app statuses, we will need to handle this
@@ -370,7 +395,7 @@ class MongoDBUpgrade(Object):
     def are_nodes_healthy(self) -> bool:
         """Returns true if all nodes in the MongoDB deployment are healthy."""
         if self.charm.is_role(Config.Role.REPLICATION):
-            return self.are_replica_set_nodes_healthy(self.charm.mongodb_config)
+            return self.are_all_replica_sets_healthy([self.charm.mongodb_config])
 
         mongos_config = self.get_cluster_mongos()
         if not self.are_shards_healthy(mongos_config):
@@ -387,13 +412,55 @@ class MongoDBUpgrade(Object):
 
     def are_replicas_in_sharded_cluster_healthy(self, mongos_config: MongosConfiguration) -> bool:
         """Returns True if all replicas in the sharded cluster are healthy."""
-        # dictionary of all replica sets in the sharded cluster
-        for mongodb_config in self.get_all_replica_set_configs_in_cluster():
-            if not self.are_replica_set_nodes_healthy(mongodb_config):
-                logger.debug(f"Replica set: {mongodb_config.replset} contains unhealthy nodes.")
-                return False
+        return self.are_all_replica_sets_healthy(self.get_all_replica_set_configs_in_cluster())
 
-        return True
+    def are_all_replica_sets_healthy(self, mongodb_configs: List[MongoDBConfiguration]) -> bool:
+        """Returns True if all the provided replica sets are healthy.
+
+        Replica sets are checked concurrently, so that an unreachable shard costs a single server
+        selection timeout rather than delaying the checks of every other shard.
+        """
+        report = gather(
+            [partial(self.check_replica_set_health, config) for config in mongodb_configs]
+        )
+        self.health_report = sorted(report, key=lambda health: health.replset)
+        for health in self.health_report:
+            if not health.healthy:
+                logger.debug(
+                    "Replica set: %s contains unhealthy nodes (error: %s).",
+                    health.replset,
+                    health.error,
+                )
+
+        return all(health.healthy for health in self.health_report)
+
+    def check_replica_set_health(self, mongodb_config: MongoDBConfiguration) -> ReplicaSetHealth:
+        """Returns the health of a replica set, along with how long it took to check it."""
+        start = time.monotonic()
+        error = None
+        try:
+            healthy = self.are_replica_set_nodes_healthy(mongodb_config)
+        except PyMongoError as e:
+            healthy = False
+            error = str(e)
+
+        return ReplicaSetHealth(
+            replset=mongodb_config.replset,
+            healthy=healthy,
+            latency=time.monotonic() - start,
+            error=error,
+        )
+
+    def get_health_report_results(self) -> Dict[str, Dict[str, Dict[str, str]]]:
+        """Returns the last health report in a format suitable for action results."""
+        if not self.health_report:
+            return {}
+
+        return {
+            "health-report": {
+                health.replset: health.to_action_result() for health in self.health_report
+            }
+        }
 
     def are_shards_healthy(self, mongos_config: MongosConfiguration) -> bool:
         """Returns True if all shards in the cluster are healthy."""
@@ -441,11 +508,12 @@ class MongoDBUpgrade(Object):
         return mongodb_configurations
 
     def are_replica_set_nodes_healthy(self, mongodb_config: MongoDBConfiguration) -> bool:
-        """Returns true if all nodes in the MongoDB replica set are healthy."""
+        """Returns true if all nodes in the MongoDB replica set are healthy.
+
+        The health is polled until the replica set settles, each check takes a new snapshot.
+        """
         with MongoDBConnection(mongodb_config) as mongod:
-            rs_status = mongod.get_replset_status()
-            rs_status = mongod.client.admin.command("replSetGetStatus")
-            return not mongod.is_any_sync(rs_status)
+            return not mongod.is_any_sync(mongod.get_topology(refresh=True).raw_status)
 
     def is_cluster_able_to_read_write(self) -> bool:
         """Returns True if read and write is feasible for cluster."""
@@ -598,15 +666,20 @@ class MongoDBUpgrade(Object):
             )
             return
 
-        old_primary = self.charm.primary
         with MongoDBConnection(self.charm.mongodb_config) as mongod:
+            old_primary = mongod.primary()
             mongod.step_down_primary()
 
-        for attempt in Retrying(stop=stop_after_attempt(30), wait=wait_fixed(1), reraise=True):
-            with attempt:
-                new_primary = self.charm.primary
-                if new_primary == old_primary:
-                    raise FailedToElectNewPrimaryError()
+            for attempt in Retrying(stop=stop_after_attempt(30), wait=wait_fixed(1), reraise=True):
+                with attempt:
+                    # the election is polled, each attempt needs a new snapshot.
+                    try:
+                        new_primary = mongod.primary(refresh=True)
+                    except PyMongoError as e:
+                        raise FailedToElectNewPrimaryError() from e
+
+                    if new_primary in (None, old_primary):
+                        raise FailedToElectNewPrimaryError()
 
     def are_pre_upgrade_operations_config_server_successful(self):
         """Runs pre-upgrade operations for config-server and returns True if successful."""
@@ -641,22 +714,28 @@ class MongoDBUpgrade(Object):
         Note it is NOT sufficient to check only mongos or the individual shards. It is necessary to
         check each node according to MongoDB upgrade docs.
         """
-        for replica_set_config in self.get_all_replica_set_configs_in_cluster():
-            for single_host in replica_set_config.hosts:
-                single_replica_config = self.charm.remote_mongodb_config(
-                    single_host, replset=replica_set_config.replset, standalone=True
-                )
-                with MongoDBConnection(single_replica_config) as mongod:
-                    version = mongod.client.admin.command(
-                        ({"getParameter": 1, "featureCompatibilityVersion": 1})
-                    )
-                    if (
-                        version["featureCompatibilityVersion"]["version"]
-                        != expected_feature_version
-                    ):
-                        return False
+        single_replica_configs = [
+            self.charm.remote_mongodb_config(
+                single_host, replset=replica_set_config.replset, standalone=True
+            )
+            for replica_set_config in self.get_all_replica_set_configs_in_cluster()
+            for single_host in replica_set_config.hosts
+        ]
+        versions = gather(
+            [
+                partial(self.get_feature_compatibility_version, single_replica_config)
+                for single_replica_config in single_replica_configs
+            ]
+        )
+        return all(version == expected_feature_version for version in versions)
 
-        return True
+    def get_feature_compatibility_version(self, mongodb_config: MongoDBConfiguration) -> str:
+        """Returns the feature compatibility version of a single node."""
+        with MongoDBConnection(mongodb_config) as mongod:
+            version = mongod.client.admin.command(
+                ({"getParameter": 1, "featureCompatibilityVersion": 1})
+            )
+            return version["featureCompatibilityVersion"]["version"]
 
     def set_mongos_feature_compatibilty_version(self, feature_version) -> None:
         """Sets the mongos feature compatibility version."""
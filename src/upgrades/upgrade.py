@@ -17,7 +17,7 @@ import typing
 
 import ops
 import poetry.core.constraints.version as poetry_version
-from charms.mongodb.v1.mongodb import FailedToMovePrimaryError
+from charms.mongodb.v1.mongodb import FailedToMovePrimaryError, NotReadyError
 from tenacity import RetryError
 
 import status_exception
@@ -296,6 +296,9 @@ class Upgrade(abc.ABC):
         except FailedToMovePrimaryError:
             logger.error("Cluster failed to move primary before re-election.")
             raise PrecheckFailed("Primary switchover failed")
+        except NotReadyError:
+            logger.error("Unit to move primary to is not caught up with the primary.")
+            raise PrecheckFailed("Primary switchover target lagging")
 
         if not self._charm.upgrade.is_cluster_able_to_read_write():
             logger.error("Cluster cannot read/write to replicas")
@@ -0,0 +1,87 @@
+# Copyright 2024 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Manager applying the snap configuration of the workload services, only when it changed."""
+
+import hashlib
+import json
+import logging
+import time
+from typing import Dict
+
+from charms.operator_libs_linux.v1.systemd import service_running
+from ops.charm import CharmBase
+from ops.framework import Object, StoredState
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class WorkloadServices(Object):
+    """Configures the services of the snap, i.e. mongodb-exporter and pbm-agent.
+
+    The hash of the snap configuration each service was last started with is kept in the local
+    state of the unit: as long as it is unchanged and the service is running, neither snapd nor
+    the service are touched. Restarts are counted and timed, and reported by the
+    get-restart-status action.
+    """
+
+    _stored = StoredState()
+
+    def __init__(self, charm: CharmBase):
+        super().__init__(charm, "workload-services")
+        self.charm = charm
+        self._stored.set_default(config_hashes={}, restarts={})
+
+    def ensure_config(self, service: str, config: Dict[str, str], force: bool = False) -> bool:
+        """Applies the snap configuration of the service and restarts it, if it changed.
+
+        Args:
+            service: name of the service of the snap.
+            config: snap configuration keys read by the service.
+            force: restart the service even if its configuration is unchanged, i.e. once the
+                user it authenticates with was created.
+
+        Returns:
+            whether the service was (re)started.
+
+        Raises:
+            snap.SnapError
+        """
+        config_hash = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+        running = service_running(f"snap.{Config.SNAP_NAME}.{service}.service")
+        if not force and self._stored.config_hashes.get(service) == config_hash and running:
+            logger.debug("%s configuration is unchanged, not restarting it.", service)
+            return False
+
+        logger.info("Applying the configuration of %s and restarting it.", service)
+        started_at = time.monotonic()
+        mongodb_snap = self.charm.snap_cache[Config.SNAP_NAME]
+        mongodb_snap.set(config)
+        if running:
+            # services of the snap without a reload command are restarted instead.
+            mongodb_snap.restart(services=[service], reload=True)
+        else:
+            mongodb_snap.start(services=[service], enable=True)
+
+        self._record_restart(service, time.monotonic() - started_at)
+        self._stored.config_hashes[service] = config_hash
+        return True
+
+    def get_restart_stats(self) -> Dict[str, Dict[str, str]]:
+        """Returns the number of restarts and the duration of the last one, keyed by service."""
+        return {
+            service: {key: str(value) for key, value in stats.items()}
+            for service, stats in self._stored.restarts.items()
+        }
+
+    def _record_restart(self, service: str, duration: float) -> None:
+        """Counts the restart of the service and records how long it took."""
+        stats = self._stored.restarts.get(service, {})
+        self._stored.restarts[service] = {
+            "count": stats.get("count", 0) + 1,
+            "last-duration": round(duration, 3),
+            "last-at": round(time.time(), 3),
+        }
+        logger.info("Restarted %s in %.2fs.", service, duration)
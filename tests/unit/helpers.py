@@ -4,8 +4,17 @@
 
 """Helper functions for writing tests."""
 
-from typing import Callable
-from unittest.mock import patch
+import copy
+import time
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Callable, Dict, List, Optional, Set
+from unittest.mock import MagicMock, patch
+
+from charms.mongodb.v1.mongodb import MongoDBConnection
+from pymongo.errors import OperationFailure
+
+MAX_VOTING_MEMBERS = 7
 
 
 def patch_network_get(private_address="10.1.157.116") -> Callable:
@@ -29,3 +38,192 @@ def patch_network_get(private_address="10.1.157.116") -> Callable:
         }
 
     return patch("ops.testing._TestingModelBackend.network_get", network_get)
+
+
+class FakeReplicaSet:
+    """In-memory replica set answering the admin commands used to manage membership.
+
+    It enforces the same rules as mongod on replSetReconfig: the version must be incremented,
+    a single voting member can be added or removed per reconfig, a replica set has at most 7
+    voting members and non-voting members must have a priority of 0. Use it as the admin command
+    of a mocked MongoClient:
+
+    mock_client.return_value.admin.command.side_effect = FakeReplicaSet(hosts).command
+
+    Commands which only apply to the member they are sent to, i.e. replSetFreeze, need the
+    clients to be created by the replica set, which tells the members apart by their URI:
+
+    mock_client.side_effect = FakeReplicaSet(hosts).client
+    """
+
+    def __init__(self, hosts: List[str], replset: str = "mongodb", latency: float = 0):
+        self.config = {
+            "_id": replset,
+            "version": 1,
+            "members": [{"_id": _id, "host": host} for _id, host in enumerate(hosts)],
+        }
+        self.states: Dict[str, str] = {
+            host: "PRIMARY" if _id == 0 else "SECONDARY" for _id, host in enumerate(hosts)
+        }
+        # seconds each member is behind the primary
+        self.lags: Dict[str, float] = {}
+        self.reconfig_count = 0
+        # members which cannot run for election
+        self.frozen: Set[str] = set()
+        self.elections = 0
+        # seconds it takes to answer a command, as a network round trip would
+        self.latency = latency
+
+    @property
+    def voters(self) -> List[str]:
+        """Hosts of the voting members."""
+        return self._voters(self.config)
+
+    def finish_initial_syncs(self) -> None:
+        """Makes every member in initial sync a SECONDARY."""
+        for host, state in self.states.items():
+            if state == "STARTUP2":
+                self.states[host] = "SECONDARY"
+
+    def client(self, uri: str, directConnection: bool = False, **kwargs) -> MagicMock:
+        """Returns a client sending its admin commands to the member of the URI if direct."""
+        client = MagicMock()
+        host = uri.split("@")[-1].split("/")[0] if directConnection else None
+        client.admin.command.side_effect = partial(self.command, host=host)
+        return client
+
+    def command(self, command: str, *args, host: Optional[str] = None, **kwargs) -> Dict:
+        """Answers an admin command, sent to the provided member or to the primary."""
+        time.sleep(self.latency)
+        if command == "ping":
+            return {"ok": 1}
+
+        if command == "replSetGetConfig":
+            return {"config": copy.deepcopy(self.config)}
+
+        if command == "replSetGetStatus":
+            return {
+                "set": self.config["_id"],
+                "members": [
+                    {
+                        "_id": member["_id"],
+                        "name": f"{member['host']}:27017",
+                        "stateStr": self.states[member["host"]],
+                        "health": 1,
+                        "optimeDate": datetime(2024, 1, 1)
+                        - timedelta(seconds=self.lags.get(member["host"], 0)),
+                        "configVersion": self.config["version"],
+                        "self": self.states[member["host"]] == "PRIMARY",
+                    }
+                    for member in self.config["members"]
+                ],
+            }
+
+        if command == "replSetReconfig":
+            self._reconfig(args[0])
+            return {"ok": 1}
+
+        if command == "replSetFreeze":
+            if host is None or self.states[host] == "PRIMARY":
+                raise OperationFailure("cannot freeze node when primary", code=95)
+
+            if args[0]:
+                self.frozen.add(host)
+            else:
+                self.frozen.discard(host)
+            return {"ok": 1}
+
+        if command == "replSetStepDown":
+            self._step_down(kwargs.get("secondaryCatchUpPeriodSecs", 10))
+            return {"ok": 1}
+
+        raise OperationFailure(f"unsupported command {command}")
+
+    def _step_down(self, catch_up_secs: float) -> None:
+        """Steps down the primary, the most up to date electable secondary wins the election."""
+        electable = [
+            host
+            for host, state in self.states.items()
+            if state == "SECONDARY"
+            and host in self._electable_hosts()
+            and host not in self.frozen
+            and self.lags.get(host, 0) <= catch_up_secs
+        ]
+        if not electable:
+            raise OperationFailure("no electable secondaries caught up", code=262)
+
+        new_primary = min(electable, key=lambda host: self.lags.get(host, 0))
+        for host, state in self.states.items():
+            if state == "PRIMARY":
+                self.states[host] = "SECONDARY"
+        self.states[new_primary] = "PRIMARY"
+        self.lags[new_primary] = 0
+        self.elections += 1
+
+    def _electable_hosts(self) -> List[str]:
+        return [
+            member["host"]
+            for member in self.config["members"]
+            if member.get("votes", 1) and member.get("priority", 1)
+        ]
+
+    @staticmethod
+    def _voters(config: Dict) -> List[str]:
+        return [member["host"] for member in config["members"] if member.get("votes", 1)]
+
+    def _reconfig(self, config: Dict) -> None:
+        if config["version"] != self.config["version"] + 1:
+            raise OperationFailure("version must be incremented", code=103)
+
+        if len(set(self._voters(self.config)) ^ set(self._voters(config))) > 1:
+            raise OperationFailure(
+                "only one voting member can be added or removed at a time", code=103
+            )
+
+        if len(self._voters(config)) > MAX_VOTING_MEMBERS:
+            raise OperationFailure("replica set can have at most 7 voting members", code=103)
+
+        for member in config["members"]:
+            if not member.get("votes", 1) and member.get("priority", 1):
+                raise OperationFailure("non-voting members must have priority 0", code=103)
+
+            self.states.setdefault(member["host"], "STARTUP2")
+
+        self.config = copy.deepcopy(config)
+        self.reconfig_count += 1
+
+
+class FakeUserStore:
+    """In-memory user catalog standing in for a MongoDBConnection managing relation users.
+
+    Every write to the catalog, which on mongod would be an oplog entry, is counted.
+    """
+
+    def __init__(self):
+        self.users: Dict[str, List[Dict]] = {}
+        self.writes = 0
+        self.users_info_calls = 0
+
+    def get_users(self) -> Set[str]:
+        """Returns the relation users."""
+        return set(self.users)
+
+    def get_users_roles(self, usernames) -> Dict[str, List[Dict]]:
+        """Returns the roles of the provided users."""
+        self.users_info_calls += 1
+        return {username: self.users[username] for username in usernames}
+
+    def create_user(self, config) -> None:
+        """Creates a user with the roles of the config."""
+        self.users[config.username] = MongoDBConnection._get_roles(config)
+        self.writes += 1
+
+    def update_user(self, config) -> None:
+        """Updates the roles of a user to the ones of the config."""
+        self.users[config.username] = MongoDBConnection._get_roles(config)
+        self.writes += 1
+
+    def drop_user(self, username: str) -> None:
+        """Drops a user."""
+        del self.users[username]
+        self.writes += 1
@@ -8,6 +8,8 @@ from unittest import mock
 from unittest.mock import MagicMock, call, patch
 
 import pytest
+from charms.mongodb.v1.helpers import ConfigChanges
+from charms.mongodb.v1.mongodb import InitialSyncStatus
 from charms.operator_libs_linux.v2 import snap
 from ops.model import ActiveStatus, BlockedStatus, MaintenanceStatus, WaitingStatus
 from ops.testing import Harness
@@ -58,7 +60,7 @@ class TestCharm(unittest.TestCase):
     @patch("charm.MongoDBConnection")
     @patch("charm.MongodbOperatorCharm._init_operator_user")
     @patch("charm.MongodbOperatorCharm._open_ports_tcp")
-    @patch("charm.snap.SnapCache")
+    @patch("charm.LazySnapCache")
     @patch("charm.MongodbOperatorCharm.push_file_to_unit")
     @patch("builtins.open")
     def test_on_start_not_leader_doesnt_initialise_replica_set(
@@ -108,7 +110,7 @@ class TestCharm(unittest.TestCase):
     @patch_network_get(private_address="1.1.1.1")
     @patch("charm.MongodbOperatorCharm._open_ports_tcp")
     @patch("charm.MongodbOperatorCharm._initialise_replica_set")
-    @patch("charm.snap.SnapCache")
+    @patch("charm.LazySnapCache")
     @patch("charm.MongodbOperatorCharm.push_file_to_unit")
     @patch("builtins.open")
     @patch("charm.MongoDBConnection")
@@ -140,7 +142,7 @@ class TestCharm(unittest.TestCase):
 
     @patch_network_get(private_address="1.1.1.1")
     @patch("charm.MongodbOperatorCharm._open_ports_tcp")
-    @patch("charm.snap.SnapCache")
+    @patch("charm.LazySnapCache")
     @patch("charm.MongodbOperatorCharm.push_file_to_unit")
     @patch("builtins.open")
     def test_start_unable_to_open_tcp_moves_to_blocked(self, open, path, snap, _open_ports_tcp):
@@ -180,7 +182,7 @@ class TestCharm(unittest.TestCase):
 
     @patch_network_get(private_address="1.1.1.1")
     @patch("charm.update_mongod_service")
-    @patch("charm.snap.SnapCache")
+    @patch("charm.LazySnapCache")
     @patch("subprocess.check_call")
     def test_install_snap_packages_failure(self, _call, snap_cache, update_mongod_service):
         """Test verifies the correct functions get called when installing apt packages."""
@@ -230,7 +232,7 @@ class TestCharm(unittest.TestCase):
 
         # verify we go into waiting and don't reconfigure
         self.assertTrue(isinstance(self.harness.charm.unit.status, WaitingStatus))
-        connection.return_value.__enter__.return_value.add_replset_member.assert_not_called()
+        connection.return_value.__enter__.return_value.add_replset_members.assert_not_called()
 
     @patch_network_get(private_address="1.1.1.1")
     @patch("ops.framework.EventBase.defer")
@@ -259,7 +261,7 @@ class TestCharm(unittest.TestCase):
                 if departed:
                     # simulate removing 2nd MongoDB unit
                     self.harness.remove_relation_unit(rel.id, "mongodb/1")
-                    connection.return_value.__enter__.return_value.add_replset_member.assert_not_called()
+                    connection.return_value.__enter__.return_value.add_replset_members.assert_not_called()
                 else:
                     # simulate 2nd MongoDB unit joining
                     self.harness.add_relation_unit(rel.id, "mongodb/1")
@@ -289,7 +291,7 @@ class TestCharm(unittest.TestCase):
         exceptions = PYMONGO_EXCEPTIONS
         exceptions.append(NotReadyError)
         for exception in exceptions:
-            connection.return_value.__enter__.return_value.add_replset_member.side_effect = (
+            connection.return_value.__enter__.return_value.add_replset_members.side_effect = (
                 exception
             )
 
@@ -297,12 +299,12 @@ class TestCharm(unittest.TestCase):
             self.harness.add_relation_unit(rel.id, "mongodb/1")
             self.harness.update_relation_data(rel.id, "mongodb/1", PEER_ADDR)
 
-            connection.return_value.__enter__.return_value.add_replset_member.assert_called()
+            connection.return_value.__enter__.return_value.add_replset_members.assert_called()
             defer.assert_called()
 
     @patch_network_get(private_address="1.1.1.1")
     @patch("charm.MongodbOperatorCharm._open_ports_tcp")
-    @patch("charm.snap.SnapCache")
+    @patch("charm.LazySnapCache")
     @patch("charm.MongodbOperatorCharm.push_file_to_unit")
     @patch("builtins.open")
     @patch("charm.MongoDBConnection")
@@ -517,6 +519,43 @@ class TestCharm(unittest.TestCase):
         self.harness.charm.on.update_status.emit()
         self.assertEqual(self.harness.charm.unit.status, ActiveStatus("Primary"))
 
+    @patch_network_get(private_address="1.1.1.1")
+    @patch("charm.CrossAppVersionChecker.is_local_charm")
+    @patch("charm.CrossAppVersionChecker.is_integrated_to_locally_built_charm")
+    @patch("charm.get_charm_revision")
+    @patch("charms.mongodb.v0.set_status.MongoDBConnection")
+    @patch("charm.MongoDBConnection")
+    @patch("charm.MongoDBBackups.get_pbm_status")
+    @patch("charm.MongodbOperatorCharm._connect_mongodb_exporter")
+    @patch("charm.MongodbOperatorCharm._update_mongod_options")
+    @patch("charm.MongodbOperatorCharm._reconcile_server_parameters")
+    def test_update_status_invalid_config(
+        self,
+        reconcile_server_parameters,
+        _,
+        __,
+        pbm_status,
+        connection,
+        status_connection,
+        *unused,
+    ):
+        """Tests invalid options block the unit without holding back update-status."""
+        self.harness.set_leader(True)
+        self.harness.charm.app_peer_data["db_initialised"] = "True"
+        pbm_status.return_value = ActiveStatus("")
+        self.harness.update_config({"server-parameters": "processUmask=000"})
+
+        connection.return_value.__enter__.return_value.is_ready = True
+        status_connection.return_value.__enter__.return_value.get_replset_status.return_value = {
+            "1.1.1.1": "PRIMARY"
+        }
+        self.harness.charm.on.update_status.emit()
+        reconcile_server_parameters.assert_called_once()
+        self.assertEqual(
+            self.harness.charm.unit.status,
+            BlockedStatus("Invalid server-parameters: Unsupported server parameter: processUmask"),
+        )
+
     @patch_network_get(private_address="1.1.1.1")
     @patch("charm.CrossAppVersionChecker.is_local_charm")
     @patch("charm.CrossAppVersionChecker.is_integrated_to_locally_built_charm")
@@ -588,6 +627,9 @@ class TestCharm(unittest.TestCase):
         self.assertEqual(self.harness.charm.unit.status, WaitingStatus("Member is removing..."))
 
         # Case 3: Member is syncing to replica set
+        status_connection.return_value.__enter__.return_value.get_initial_sync_status.return_value = (
+            None
+        )
         for syncing_status in ["STARTUP", "STARTUP2", "ROLLBACK", "RECOVERING"]:
             status_connection.return_value.__enter__.return_value.get_replset_status.return_value = {
                 "1.1.1.1": syncing_status
@@ -595,6 +637,29 @@ class TestCharm(unittest.TestCase):
             self.harness.charm.on.update_status.emit()
             self.assertEqual(self.harness.charm.unit.status, WaitingStatus("Member is syncing..."))
 
+        # Case 3b: Member reports the progress of its initial sync
+        status_connection.return_value.__enter__.return_value.get_replset_status.return_value = {
+            "1.1.1.1": "STARTUP2"
+        }
+        status_connection.return_value.__enter__.return_value.get_initial_sync_status.return_value = InitialSyncStatus(
+            source="2.2.2.2", progress=42.4, elapsed=600, remaining=150
+        )
+        self.harness.charm.on.update_status.emit()
+        self.assertEqual(
+            self.harness.charm.unit.status,
+            WaitingStatus("Member is syncing from 2.2.2.2 (42%, ~3m left)..."),
+        )
+
+        # Case 3c: Member cannot report the progress of its initial sync yet
+        status_connection.return_value.__enter__.return_value.get_initial_sync_status.side_effect = OperationFailure(
+            "Authentication failed."
+        )
+        self.harness.charm.on.update_status.emit()
+        self.assertEqual(self.harness.charm.unit.status, WaitingStatus("Member is syncing..."))
+        status_connection.return_value.__enter__.return_value.get_initial_sync_status.side_effect = (
+            None
+        )
+
         # Case 4: Unknown status
         status_connection.return_value.__enter__.return_value.get_replset_status.return_value = {
             "1.1.1.1": "unknown"
@@ -1080,7 +1145,12 @@ class TestCharm(unittest.TestCase):
     def test_auth_enabled(self):
         self.assertEqual(self.harness.charm.auth_enabled(), True)
 
-    @patch("charm.snap.SnapCache")
+    @patch("config.Config.ENV_VAR_PATH", "tests/unit/data/env.txt")
+    @patch("config.Config.MONGOD_CONF_FILE_PATH", "tests/unit/data/mongod_auth.conf")
+    def test_auth_enabled_in_config_file(self):
+        self.assertEqual(self.harness.charm.auth_enabled(), True)
+
+    @patch("charm.LazySnapCache")
     def test_connect_mongodb_exporter_no_pass(
         self,
         snap_cache,
@@ -1098,3 +1168,201 @@ class TestCharm(unittest.TestCase):
     def test_unit_host(self):
         """Tests that get hosts returns the current unit hosts."""
         assert self.harness.charm.unit_host(self.harness.charm.unit) == "1.1.1.1"
+
+    @patch("charm.socket.create_connection")
+    @patch("charm.LazySnapCache")
+    def test_is_mongod_running(self, snap_cache, create_connection):
+        """Tests mongod is reported down when its service is inactive or its port is closed."""
+        mock_mongodb_snap = mock.Mock()
+        mock_mongodb_snap.services = {"mongod": {"active": False}}
+        snap_cache.return_value = {"charmed-mongodb": mock_mongodb_snap}
+        self.assertFalse(self.harness.charm.is_mongod_running())
+        create_connection.assert_not_called()
+
+        mock_mongodb_snap.services = {"mongod": {"active": True}}
+        create_connection.side_effect = ConnectionRefusedError
+        self.assertFalse(self.harness.charm.is_mongod_running())
+
+        create_connection.side_effect = None
+        self.assertTrue(self.harness.charm.is_mongod_running())
+
+    @patch_network_get(private_address="1.1.1.1")
+    @patch("charm.MongoDBConnection")
+    def test_get_initial_sync_status_action(self, connection):
+        """Tests the initial sync of the unit is reported with its source and timing."""
+        connection.return_value.__enter__.return_value.get_initial_sync_status.return_value = (
+            InitialSyncStatus(source="2.2.2.2", progress=42.42, elapsed=600, remaining=None)
+        )
+        mock_event = mock.Mock()
+        self.harness.charm._on_get_initial_sync_status_action(mock_event)
+        mock_event.set_results.assert_called_with(
+            {
+                "in-progress": "true",
+                "source": "2.2.2.2",
+                "progress": "42.4%",
+                "elapsed": "600s",
+                "remaining": "unknown",
+            }
+        )
+
+        # not syncing
+        connection.return_value.__enter__.return_value.get_initial_sync_status.return_value = None
+        self.harness.charm._on_get_initial_sync_status_action(mock_event)
+        mock_event.set_results.assert_called_with({"in-progress": "false"})
+
+    @patch("charm.MongodbOperatorCharm._update_mongod_options")
+    def test_get_invalid_config_status(self, _):
+        """Tests invalid options, which are ignored by mongod, block the unit."""
+        self.assertIsNone(self.harness.charm.get_invalid_config_status())
+
+        for config, status in [
+            (
+                {"connection-options": "maxPoolSize=many"},
+                "Invalid connection-options: Invalid value for connection option maxPoolSize: many",
+            ),
+            (
+                {"server-parameters": "processUmask=000"},
+                "Invalid server-parameters: Unsupported server parameter: processUmask",
+            ),
+            (
+                {"storage-cache-size": "lots"},
+                "Invalid storage-cache-size: Malformed cache size: lots",
+            ),
+            ({"storage-journal-compressor": "lz4"}, "Invalid storage-journal-compressor lz4"),
+        ]:
+            self.harness.update_config(config)
+            self.assertEqual(self.harness.charm.get_invalid_config_status(), BlockedStatus(status))
+            self.harness.update_config(unset=list(config))
+
+        self.harness.update_config({"storage-cache-size": "25%", "server-parameters": ""})
+        self.assertIsNone(self.harness.charm.get_invalid_config_status())
+
+    @patch("charm.MongodbOperatorCharm._update_mongod_options")
+    def test_server_parameters(self, _):
+        """Tests tuned server parameters are typed, and ignored altogether if invalid."""
+        self.harness.update_config(
+            {"server-parameters": "ttlMonitorSleepSecs=120,diagnosticDataCollectionEnabled=false"}
+        )
+        self.assertEqual(
+            self.harness.charm.server_parameters,
+            {"ttlMonitorSleepSecs": 120, "diagnosticDataCollectionEnabled": False},
+        )
+
+        self.harness.update_config({"server-parameters": "processUmask=000"})
+        self.assertEqual(self.harness.charm.server_parameters, {})
+
+    @patch_network_get(private_address="1.1.1.1")
+    @patch("charm.MongoDBConnection")
+    @patch("charm.MongodbOperatorCharm._update_mongod_options")
+    def test_reconcile_server_parameters(self, _, connection):
+        """Tests only the server parameters which drifted are set again."""
+        mongo = connection.return_value.__enter__.return_value
+        self.harness.charm._reconcile_server_parameters()
+        connection.assert_not_called()
+
+        self.harness.update_config(
+            {"server-parameters": "ttlMonitorSleepSecs=120,transactionLifetimeLimitSeconds=30"}
+        )
+        mongo.get_server_parameters.return_value = {
+            "ttlMonitorSleepSecs": 60,
+            "transactionLifetimeLimitSeconds": 30,
+        }
+        self.harness.charm._reconcile_server_parameters()
+        mongo.set_server_parameters.assert_called_once_with({"ttlMonitorSleepSecs": 120})
+
+        mongo.get_server_parameters.return_value = {
+            "ttlMonitorSleepSecs": 120,
+            "transactionLifetimeLimitSeconds": 30,
+        }
+        self.harness.charm._reconcile_server_parameters()
+        mongo.set_server_parameters.assert_called_once()
+
+    @patch("charm.MongodbOperatorCharm._update_mongod_options")
+    @patch("charm.get_data_directory_per_db")
+    @patch("charm.get_memory_limit")
+    def test_mongod_storage_options(self, memory_limit, directory_per_db, _):
+        """Tests the storage options are derived from the memory available and the config."""
+        memory_limit.return_value = 9 * 1024**3
+        directory_per_db.return_value = None
+        self.assertEqual(
+            self.harness.charm.mongod_storage_options,
+            {
+                "wiredTigerCacheSizeGB": "4.00",
+                "wiredTigerCollectionBlockCompressor": "snappy",
+                "wiredTigerJournalCompressor": "snappy",
+            },
+        )
+
+        self.harness.update_config(
+            {
+                "storage-cache-size": "25%",
+                "storage-block-compressor": "zstd",
+                "storage-journal-compressor": "lz4",
+                "storage-directory-per-db": True,
+                "oplog-size": 2048,
+            }
+        )
+        self.assertEqual(
+            self.harness.charm.mongod_storage_options,
+            {
+                "wiredTigerCacheSizeGB": "2.25",
+                "wiredTigerCollectionBlockCompressor": "zstd",
+                "directoryperdb": None,
+                "oplogSize": "2048",
+            },
+        )
+
+        # the layout of existing data is kept, invalid cache sizes fall back to the default
+        directory_per_db.return_value = False
+        self.harness.update_config({"storage-cache-size": "lots"})
+        storage_options = self.harness.charm.mongod_storage_options
+        self.assertNotIn("directoryperdb", storage_options)
+        self.assertEqual(storage_options["wiredTigerCacheSizeGB"], "4.00")
+
+    @patch_network_get(private_address="1.1.1.1")
+    @patch("charm.MongoDBConnection")
+    @patch("charm.RollingRestart.request_restart")
+    @patch("charm.MongodbOperatorCharm.is_mongod_running")
+    @patch("charm.update_mongod_service")
+    def test_config_changed_restarts_mongod_on_new_options(
+        self, update_mongod_service, is_mongod_running, request_restart, connection
+    ):
+        """Tests mongod is only restarted when options which are not runtime settable changed."""
+        mongo = connection.return_value.__enter__.return_value
+        is_mongod_running.return_value = True
+        update_mongod_service.return_value = ConfigChanges()
+        self.harness.update_config({"storage-block-compressor": "snappy"})
+        request_restart.assert_not_called()
+
+        update_mongod_service.return_value = ConfigChanges(
+            restart_options=["storage.wiredTiger.collectionConfig.blockCompressor"]
+        )
+        self.harness.update_config({"storage-block-compressor": "zstd"})
+        request_restart.assert_called_once()
+
+        # a mongod which has not started yet picks up the options when it starts
+        is_mongod_running.return_value = False
+        self.harness.update_config({"storage-block-compressor": "zlib"})
+        request_restart.assert_called_once()
+
+        # runtime settable parameters are set on the running mongod
+        is_mongod_running.return_value = True
+        update_mongod_service.return_value = ConfigChanges(parameters={"ttlMonitorSleepSecs": 120})
+        self.harness.update_config({"server-parameters": "ttlMonitorSleepSecs=120"})
+        mongo.set_server_parameters.assert_called_once_with({"ttlMonitorSleepSecs": 120})
+        request_restart.assert_called_once()
+
+        # mongod picks them up on restart if they could not be set
+        mongo.set_server_parameters.side_effect = OperationFailure("error")
+        self.harness.update_config({"server-parameters": "ttlMonitorSleepSecs=60"})
+        self.assertEqual(request_restart.call_count, 2)
+
+        # the profiler is set on the running mongod
+        update_mongod_service.return_value = ConfigChanges(
+            runtime_options=["operationProfiling.mode"]
+        )
+        with patch("charm.ProfilerManager.update") as update_profiler:
+            update_profiler.return_value = True
+            self.harness.update_config({"profiling-level": 1})
+            update_profiler.assert_called_once()
+        self.assertEqual(request_restart.call_count, 2)
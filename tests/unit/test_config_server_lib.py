@@ -3,8 +3,15 @@
 import unittest
 from unittest import mock
 
-from ops import BlockedStatus, WaitingStatus
+from charms.mongodb.v1.mongos import (
+    DrainProgress,
+    NotDrainedError,
+    ShardNotInClusterError,
+)
+from charms.mongodb.v1.shards_interface import DRAIN_PHASE_DRAINED, DrainState
+from ops import ActiveStatus, BlockedStatus, MaintenanceStatus, WaitingStatus
 from ops.testing import Harness
+from pymongo.errors import ServerSelectionTimeoutError
 
 from charm import MongodbOperatorCharm
 
@@ -229,3 +236,90 @@ class TestConfigServerInterface(unittest.TestCase):
         event.params = {}
         self.harness.charm.shard.pass_hook_checks(event)
         event.defer.assert_not_called()
+
+    def test_drain_state_status(self):
+        """The drain status reports the chunks left, the rate they are moved at and an ETA."""
+        drain_state = DrainState(mongos_hosts=["1.1.1.1"], started_at=0)
+        self.assertEqual(
+            drain_state.get_status(), MaintenanceStatus("Draining shard from cluster")
+        )
+
+        drain_state.initial_chunks = 100
+        drain_state.remaining_chunks = 70
+        drain_state.jumbo_chunks = 2
+        drain_state.updated_at = 120
+        self.assertEqual(
+            drain_state.get_status(),
+            MaintenanceStatus(
+                "Draining shard from cluster: 70 chunks left (2 jumbo), 15.0 chunks/min, ~5m left"
+            ),
+        )
+
+        drain_state.remaining_chunks = 0
+        drain_state.dbs_to_move = ["db1", "db2"]
+        self.assertEqual(
+            drain_state.get_status(),
+            MaintenanceStatus("Draining shard from cluster: moving primary of 2 databases"),
+        )
+
+    @mock.patch("charms.mongodb.v1.shards_interface.time.time")
+    @mock.patch("charms.mongodb.v1.shards_interface.MongosConnection")
+    def test_advance_drain(self, connection, now):
+        """The drain is advanced one check at a time and its progress persisted."""
+        mongos = connection.return_value.__enter__.return_value
+        shard = self.harness.charm.shard
+
+        # case 1: no drain was started
+        self.assertIsNone(shard.advance_drain())
+        connection.assert_not_called()
+
+        # case 2: the shard is draining
+        now.return_value = 0
+        shard.start_drain(["1.1.1.1"])
+        mongos._is_shard_draining.return_value = True
+        mongos.get_drain_progress.return_value = DrainProgress(100, 0, ())
+        shard.advance_drain()
+        now.return_value = 600
+        mongos.get_drain_progress.return_value = DrainProgress(40, 0, ("db1",))
+        shard.advance_drain()
+        drain_state = shard.get_drain_state()
+        self.assertEqual(drain_state.remaining_chunks, 40)
+        self.assertEqual(drain_state.rate, 6)
+        self.assertEqual(drain_state.dbs_to_move, ["db1"])
+
+        # case 3: mongos is unreachable, the progress so far is kept
+        connection.side_effect = ServerSelectionTimeoutError()
+        self.assertEqual(
+            shard.advance_drain().get_status(), BlockedStatus("Failed to drain shard from cluster")
+        )
+        self.assertEqual(shard.get_drain_state().remaining_chunks, 40)
+
+        # case 4: the config-server removed the shard
+        connection.side_effect = None
+        mongos._is_shard_draining.side_effect = ShardNotInClusterError()
+        self.assertEqual(shard.advance_drain().phase, DRAIN_PHASE_DRAINED)
+        self.assertEqual(
+            shard.get_drain_state().get_status(),
+            ActiveStatus("Shard drained from cluster, ready for removal"),
+        )
+
+    @mock.patch("charms.mongodb.v1.shards_interface.ConfigServerRequirer.advance_drain")
+    def test_wait_for_draining_confirms_finished_drain(self, advance_drain):
+        """A drain finished before storage detaches is confirmed once, without waiting."""
+        advance_drain.return_value = DrainState(
+            mongos_hosts=["1.1.1.1"], started_at=0, phase=DRAIN_PHASE_DRAINED
+        )
+        self.harness.charm.shard.wait_for_draining(["1.1.1.1"])
+        advance_drain.assert_called_once()
+
+        # a drain persisted as finished is not checked again
+        self.harness.charm.shard.save_drain_state(advance_drain.return_value)
+        self.harness.charm.shard.wait_for_draining(["1.1.1.1"])
+        advance_drain.assert_called_once()
+
+        # the hook fails rather than waits while the shard is still draining
+        self.harness.charm.shard.save_drain_state(None)
+        advance_drain.return_value = DrainState(mongos_hosts=["1.1.1.1"], started_at=0)
+        with self.assertRaises(NotDrainedError):
+            self.harness.charm.shard.wait_for_draining(["1.1.1.1"])
+        self.assertEqual(advance_drain.call_count, 2)
@@ -0,0 +1,39 @@
+# Copyright 2024 Canonical Ltd.
+# See LICENSE file for licensing details.
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import bson
+from charms.mongodb.v1.helpers import DATA_DIR
+
+from machine_helpers import get_data_directory_per_db
+
+
+class TestMachineHelpers(unittest.TestCase):
+    def setUp(self):
+        common_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(common_dir.cleanup)
+        os.makedirs(f"{common_dir.name}{DATA_DIR}")
+        self.metadata_path = f"{common_dir.name}{DATA_DIR}/storage.bson"
+        patcher = patch("machine_helpers.MONGODB_COMMON_DIR", common_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write_metadata(self, options):
+        with open(self.metadata_path, "wb") as f:
+            f.write(bson.encode({"storage": {"engine": "wiredTiger", "options": options}}))
+
+    def test_get_data_directory_per_db(self):
+        """The layout of the data is read from the metadata mongod writes on its first start."""
+        self.assertIsNone(get_data_directory_per_db())
+
+        self.write_metadata({"directoryPerDB": True})
+        self.assertTrue(get_data_directory_per_db())
+
+        self.write_metadata({"directoryPerDB": False})
+        self.assertFalse(get_data_directory_per_db())
+
+        self.write_metadata({})
+        self.assertFalse(get_data_directory_per_db())
@@ -108,7 +108,7 @@ class TestMongoBackups(unittest.TestCase):
         """Tests when configurations for pbm are not given through S3 there is no status."""
         self.assertTrue(self.harness.charm.backups.get_pbm_status() is None)
 
-    @patch("charm.snap.SnapCache")
+    @patch("charm.LazySnapCache")
     @patch("charms.mongodb.v1.mongodb_backups.wait_fixed")
     @patch("charms.mongodb.v1.mongodb_backups.stop_after_attempt")
     @patch("charm.MongodbOperatorCharm.has_backup_service")
@@ -130,7 +130,7 @@ class TestMongoBackups(unittest.TestCase):
         with self.assertRaises(ExecError):
             self.harness.charm.backups._resync_config_options()
 
-    @patch("charm.snap.SnapCache")
+    @patch("charm.LazySnapCache")
     @patch("charms.mongodb.v1.mongodb_backups.wait_fixed")
     @patch("charms.mongodb.v1.mongodb_backups.stop_after_attempt")
     @patch("charm.MongodbOperatorCharm.has_backup_service")
@@ -151,7 +151,7 @@ class TestMongoBackups(unittest.TestCase):
         with self.assertRaises(ExecError):
             self.harness.charm.backups._resync_config_options()
 
-    @patch("charm.snap.SnapCache")
+    @patch("charm.LazySnapCache")
     @patch("charm.MongodbOperatorCharm.has_backup_service")
     @patch("charm.MongodbOperatorCharm.run_pbm_command")
     @patch("charm.MongoDBBackups.get_pbm_status")
@@ -175,7 +175,7 @@ class TestMongoBackups(unittest.TestCase):
         with self.assertRaises(PBMBusyError):
             self.harness.charm.backups._resync_config_options()
 
-    @patch("charm.snap.SnapCache")
+    @patch("charm.LazySnapCache")
     @patch("charms.mongodb.v1.mongodb_backups.wait_fixed")
     @patch("charms.mongodb.v1.mongodb_backups.stop_after_attempt")
     @patch("charm.MongodbOperatorCharm.has_backup_service")
@@ -194,7 +194,7 @@ class TestMongoBackups(unittest.TestCase):
         with self.assertRaises(PBMBusyError):
             self.harness.charm.backups._resync_config_options()
 
-    @patch("charm.snap.SnapCache")
+    @patch("charm.LazySnapCache")
     @patch("charms.mongodb.v1.mongodb_backups.wait_fixed")
     @patch("charms.mongodb.v1.mongodb_backups.stop_after_attempt")
     @patch("charm.MongodbOperatorCharm.has_backup_service")
@@ -216,7 +216,7 @@ class TestMongoBackups(unittest.TestCase):
 
         mock_mongodb_snap.restart.assert_called()
 
-    @patch("charm.snap.SnapCache")
+    @patch("charm.LazySnapCache")
     @patch("charm.MongoDBBackups._get_pbm_configs")
     @patch("charm.MongodbOperatorCharm.run_pbm_command")
     @patch("charm.MongodbOperatorCharm.clear_pbm_config_file")
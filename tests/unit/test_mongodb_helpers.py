@@ -4,7 +4,16 @@
 import unittest
 from unittest import mock
 
-from charms.mongodb.v1.helpers import get_mongod_args
+from charms.mongodb.v1.helpers import (
+    diff_mongod_config,
+    get_mongod_args,
+    get_mongod_config,
+    parse_connection_options,
+    parse_server_parameters,
+)
+from charms.mongodb.v1.mongodb import ProfilingSettings
+
+from config import Config
 
 
 class TestMongoDBHelpers(unittest.TestCase):
@@ -83,3 +92,200 @@ class TestMongoDBHelpers(unittest.TestCase):
             get_mongod_args(config, auth=False, snap_install=False).split(),
             service_args,
         )
+
+    def test_get_mongod_args_parameters(self):
+        config = mock.Mock()
+        config.replset = "my_repl_set"
+        config.tls_external = False
+        config.tls_internal = False
+
+        args = get_mongod_args(
+            config,
+            auth=False,
+            snap_install=True,
+            parameters={"ttlMonitorSleepSecs": 120, "enableLocalhostAuthBypass": False},
+        ).split()
+
+        self.assertEqual(
+            args[-4:],
+            [
+                "--setParameter",
+                "enableLocalhostAuthBypass=False",
+                "--setParameter",
+                "ttlMonitorSleepSecs=120",
+            ],
+        )
+
+    def test_get_mongod_args_compressors(self):
+        config = mock.Mock()
+        config.replset = "my_repl_set"
+        config.tls_external = False
+        config.tls_internal = False
+
+        args = get_mongod_args(
+            config, auth=False, snap_install=True, compressors=["zstd", "snappy"]
+        ).split()
+
+        self.assertEqual(args[-1], "--networkMessageCompressors=zstd,snappy")
+
+    def test_parse_connection_options(self):
+        self.assertEqual(parse_connection_options(""), {})
+        self.assertEqual(
+            parse_connection_options(
+                "compressors=zstd,snappy&readPreference=secondaryPreferred&maxPoolSize=50"
+                "&retryWrites=true&w=majority"
+            ),
+            {
+                "compressors": "zstd,snappy",
+                "readPreference": "secondaryPreferred",
+                "maxPoolSize": "50",
+                "retryWrites": "true",
+                "w": "majority",
+            },
+        )
+
+        for options in [
+            "compressors=zstd,lz4",
+            "readPreference=any",
+            "maxPoolSize=-1",
+            "retryWrites=yes",
+            "w=all",
+            "replicaSet=other",
+            "maxPoolSize",
+        ]:
+            with self.assertRaises(ValueError):
+                parse_connection_options(options)
+
+    def test_get_mongod_args_storage_options(self):
+        config = mock.Mock()
+        config.replset = "my_repl_set"
+        config.tls_external = False
+        config.tls_internal = False
+
+        args = get_mongod_args(
+            config,
+            auth=False,
+            snap_install=True,
+            storage_options={"wiredTigerCacheSizeGB": "1.50", "directoryperdb": None},
+        ).split()
+
+        self.assertEqual(args[-2:], ["--directoryperdb", "--wiredTigerCacheSizeGB=1.50"])
+
+    def test_get_mongod_config(self):
+        config = mock.Mock()
+        config.replset = "my_repl_set"
+        config.tls_external = True
+        config.tls_internal = True
+
+        mongod_config = get_mongod_config(
+            config,
+            auth=True,
+            snap_install=True,
+            role="shard",
+            parameters={"enableLocalhostAuthBypass": False},
+            compressors=["zstd", "snappy"],
+            storage_options={
+                "wiredTigerCacheSizeGB": "1.50",
+                "wiredTigerJournalCompressor": "zstd",
+                "oplogSize": "2048",
+                "directoryperdb": None,
+            },
+            profiling=ProfilingSettings(level=1, slow_ms=50, sample_rate=0.5),
+        )
+
+        self.assertEqual(
+            mongod_config["replication"], {"replSetName": "my_repl_set", "oplogSizeMB": 2048}
+        )
+        self.assertEqual(
+            mongod_config["storage"],
+            {
+                "dbPath": "/var/snap/charmed-mongodb/common/var/lib/mongodb",
+                "directoryPerDB": True,
+                "wiredTiger": {"engineConfig": {"cacheSizeGB": 1.5, "journalCompressor": "zstd"}},
+            },
+        )
+        self.assertEqual(
+            mongod_config["setParameter"],
+            {"processUmask": "037", "enableLocalhostAuthBypass": False},
+        )
+        # internal TLS replaces the keyFile
+        self.assertEqual(
+            mongod_config["security"], {"authorization": "enabled", "clusterAuthMode": "x509"}
+        )
+        self.assertEqual(mongod_config["net"]["tls"]["mode"], "preferTLS")
+        self.assertEqual(mongod_config["net"]["compression"], {"compressors": "zstd,snappy"})
+        self.assertEqual(mongod_config["sharding"], {"clusterRole": "shardsvr"})
+        self.assertEqual(
+            mongod_config["operationProfiling"],
+            {"mode": "slowOp", "slowOpThresholdMs": 50, "slowOpSampleRate": 0.5},
+        )
+
+    def test_diff_mongod_config(self):
+        current = {
+            "net": {"port": 27017},
+            "setParameter": {"processUmask": "037", "ttlMonitorSleepSecs": 60},
+        }
+
+        # runtime settable parameters are set, other changes require a restart
+        changes = diff_mongod_config(
+            current,
+            {
+                "net": {"port": 27017, "compression": {"compressors": "zstd"}},
+                "setParameter": {
+                    "processUmask": "037",
+                    "ttlMonitorSleepSecs": 120,
+                    "enableLocalhostAuthBypass": False,
+                },
+            },
+            runtime_parameters=Config.ServerParameters.RUNTIME_SETTABLE,
+        )
+        self.assertEqual(changes.parameters, {"ttlMonitorSleepSecs": 120})
+        # the localhost exception can only be set at startup
+        self.assertEqual(
+            changes.restart_options,
+            ["net.compression.compressors", "setParameter.enableLocalhostAuthBypass"],
+        )
+
+        # removed parameters cannot be reset at runtime
+        changes = diff_mongod_config(
+            current,
+            {"net": {"port": 27017}, "setParameter": {"processUmask": "037"}},
+            runtime_parameters=Config.ServerParameters.RUNTIME_SETTABLE,
+        )
+        self.assertEqual(changes.parameters, {})
+        self.assertEqual(changes.restart_options, ["setParameter.ttlMonitorSleepSecs"])
+
+        # options of runtime sections are applied by the caller
+        changes = diff_mongod_config(
+            current,
+            {**current, "operationProfiling": {"mode": "slowOp"}},
+            runtime_sections=("operationProfiling",),
+        )
+        self.assertEqual(changes.runtime_options, ["operationProfiling.mode"])
+        self.assertEqual(changes.restart_options, [])
+        self.assertTrue(changes)
+
+        self.assertFalse(diff_mongod_config(current, current))
+
+    def test_parse_server_parameters(self):
+        self.assertEqual(parse_server_parameters(""), {})
+        self.assertEqual(
+            parse_server_parameters(
+                "wiredTigerConcurrentReadTransactions=256, diagnosticDataCollectionEnabled=false"
+            ),
+            {
+                "wiredTigerConcurrentReadTransactions": 256,
+                "diagnosticDataCollectionEnabled": False,
+            },
+        )
+
+        for parameters in [
+            "ttlMonitorSleepSecs",
+            "ttlMonitorSleepSecs=0",
+            "maxIndexBuildMemoryUsageMegabytes=10",
+            "transactionLifetimeLimitSeconds=-1",
+            "diagnosticDataCollectionEnabled=no",
+            "processUmask=000",
+        ]:
+            with self.assertRaises(ValueError):
+                parse_server_parameters(parameters)
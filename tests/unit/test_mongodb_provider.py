@@ -1,17 +1,19 @@
 # Copyright 2023 Canonical Ltd.
 # See LICENSE file for licensing details.
 
+import json
 import unittest
 from unittest import mock
 from unittest.mock import patch
 
+from charms.mongodb.v1.mongodb import MongoDBConnection
 from ops.charm import RelationEvent
 from ops.testing import Harness
 from pymongo.errors import ConfigurationError, ConnectionFailure, OperationFailure
 
 from charm import MongodbOperatorCharm
 
-from .helpers import patch_network_get
+from .helpers import FakeUserStore, patch_network_get
 
 PYMONGO_EXCEPTIONS = [
     (ConnectionFailure("error message"), ConnectionFailure),
@@ -223,6 +225,39 @@ class TestMongoProvider(unittest.TestCase):
                     )
                 set_relation.assert_not_called()
 
+    @patch_network_get(private_address="1.1.1.1")
+    @patch("charm.MongoDBProvider._get_relation_from_username")
+    @patch("charm.MongoDBProvider._get_endpoints_digest")
+    @patch("charm.MongoDBProvider._set_relation")
+    @patch("charm.MongoDBProvider._get_config")
+    @patch("charm.MongoDBProvider._get_users_from_relations")
+    @patch("charms.mongodb.v1.mongodb_provider.MongoDBConnection")
+    def test_oversee_users_create_users_concurrently(
+        self, connection, relation_users, get_config, set_relation, get_endpoints_digest, _
+    ):
+        """Verifies the users created are published even if the creation of another one fails."""
+        relation_users.return_value = {"relation-user1", "relation-user2"}
+        mongo = connection.return_value.__enter__.return_value
+        mongo.get_users.return_value = set()
+        get_config.side_effect = lambda username, _: mock.Mock(
+            username=username, database="db", hosts=["1.1.1.1"], roles={"default"}
+        )
+        get_endpoints_digest.return_value = "digest"
+
+        def create_user(config):
+            if config.username == "relation-user1":
+                raise OperationFailure("error message")
+
+        mongo.create_user.side_effect = create_user
+        with self.assertRaises(OperationFailure):
+            self.harness.charm.client_relations.oversee_users(
+                None, RelationEvent(mock.Mock(), mock.Mock())
+            )
+
+        self.assertEqual(mongo.create_user.call_count, 2)
+        set_relation.assert_called_once()
+        self.assertEqual(set_relation.call_args.args[0].username, "relation-user2")
+
     @patch_network_get(private_address="1.1.1.1")
     @patch("charm.MongoDBProvider._get_config")
     @patch("charm.MongoDBProvider._get_users_from_relations")
@@ -269,6 +304,9 @@ class TestMongoProvider(unittest.TestCase):
         # presets, such that the need to update user relations is triggered
         relation_users.return_value = {"relation-user1"}
         connection.return_value.__enter__.return_value.get_users.return_value = {"relation-user1"}
+        connection.return_value.__enter__.return_value.get_users_roles.return_value = {
+            "relation-user1": [{"role": "read", "db": "other-db"}]
+        }
 
         for dep_id in DEPARTED_IDS:
             for exception, expected_raise in PYMONGO_EXCEPTIONS:
@@ -339,3 +377,218 @@ class TestMongoProvider(unittest.TestCase):
                     self.harness.charm.client_relations.oversee_users(
                         dep_id, RelationEvent(mock.Mock(), mock.Mock())
                     )
+
+    @patch_network_get(private_address="1.1.1.1")
+    @patch("charms.mongodb.v1.mongodb_provider.MongoDBConnection")
+    def test_oversee_users_writes_only_changed_users(self, connection):
+        """The writes of a relation event do not grow with the number of relations."""
+        connection._get_roles.side_effect = MongoDBConnection._get_roles
+        event = RelationEvent(mock.Mock(), mock.Mock())
+        relation_ids = []
+        for relations in (10, 100, 300):
+            with self.subTest(relations=relations):
+                for _ in range(relations - len(relation_ids)):
+                    relation_id = self.harness.add_relation("database", "consumer")
+                    self.harness.update_relation_data(
+                        relation_id, "consumer", {"database": f"db-{relation_id}"}
+                    )
+                    relation_ids.append(relation_id)
+
+                store = FakeUserStore()
+                connection.return_value.__enter__.return_value = store
+                self.charm.app_peer_data.pop("user-roles-digests", None)
+
+                # every user is created once
+                self.charm.client_relations.oversee_users(None, event)
+                self.assertEqual(store.writes, relations)
+
+                # nothing changed, no user is read or written
+                store.writes = store.users_info_calls = 0
+                self.charm.client_relations.oversee_users(None, event)
+                self.assertEqual((store.writes, store.users_info_calls), (0, 0))
+
+                # only the user whose roles changed is updated
+                self.harness.update_relation_data(
+                    relation_ids[0], "consumer", {"extra-user-roles": "admin"}
+                )
+                self.charm.client_relations.oversee_users(None, event)
+                self.assertEqual((store.writes, store.users_info_calls), (1, 1))
+                self.harness.update_relation_data(
+                    relation_ids[0], "consumer", {"extra-user-roles": ""}
+                )
+
+    @patch_network_get(private_address="1.1.1.1")
+    @patch("charms.mongodb.v1.mongodb_provider.MongoDBConnection")
+    def test_relation_data_written_once_per_relation(self, connection):
+        """Fields of a relation are written together, and only when their values change."""
+        connection._get_roles.side_effect = MongoDBConnection._get_roles
+        connection.return_value.__enter__.return_value = FakeUserStore()
+        relation_id = self.harness.add_relation("database", "consumer")
+        self.harness.update_relation_data(relation_id, "consumer", {"database": "db"})
+        self.charm.app_peer_data["db_initialised"] = "True"
+        database_provides = self.charm.client_relations.database_provides
+
+        with patch.object(
+            database_provides,
+            "update_relation_data",
+            wraps=database_provides.update_relation_data,
+        ) as update_relation_data:
+            self.charm.client_relations.oversee_users(
+                None, RelationEvent(mock.Mock(), mock.Mock())
+            )
+            update_relation_data.assert_called_once()
+            self.assertEqual(
+                set(update_relation_data.call_args.args[1]),
+                {"username", "password", "database", "endpoints", "replset", "uris"},
+            )
+
+            # hosts did not change, nothing is written
+            update_relation_data.reset_mock()
+            self.charm.client_relations.update_app_relation_data()
+            update_relation_data.assert_not_called()
+
+    @patch_network_get(private_address="1.1.1.1")
+    @patch("charm.MongodbOperatorCharm.app_hosts", new_callable=mock.PropertyMock)
+    @patch("charms.mongodb.v1.mongodb_provider.MongoDBConnection")
+    def test_update_app_relation_data_only_outdated_relations(self, connection, app_hosts):
+        """Only relations whose endpoints changed are republished, without querying users."""
+        connection._get_roles.side_effect = MongoDBConnection._get_roles
+        connection.return_value.__enter__.return_value = FakeUserStore()
+        app_hosts.return_value = ["1.1.1.1"]
+        for database in ("db1", "db2"):
+            relation_id = self.harness.add_relation("database", f"consumer-{database}")
+            self.harness.update_relation_data(
+                relation_id, f"consumer-{database}", {"database": database}
+            )
+        self.charm.app_peer_data["db_initialised"] = "True"
+        self.charm.client_relations.oversee_users(None, RelationEvent(mock.Mock(), mock.Mock()))
+        connection.reset_mock()
+        database_provides = self.charm.client_relations.database_provides
+
+        with patch.object(
+            database_provides,
+            "update_relation_data",
+            wraps=database_provides.update_relation_data,
+        ) as update_relation_data:
+            # case 1: hosts did not change
+            self.charm.client_relations.update_app_relation_data()
+            update_relation_data.assert_not_called()
+
+            # case 2: a host was added, every relation is republished once
+            app_hosts.return_value = ["1.1.1.1", "2.2.2.2"]
+            self.charm.client_relations.update_app_relation_data()
+            self.assertEqual(update_relation_data.call_count, 2)
+            for call in update_relation_data.call_args_list:
+                self.assertEqual(
+                    sorted(call.args[1]["endpoints"].split(",")), ["1.1.1.1", "2.2.2.2"]
+                )
+
+        # users are known to exist, the database was never queried
+        connection.assert_not_called()
+
+    @patch_network_get(private_address="1.1.1.1")
+    @patch("charms.mongodb.v1.mongodb_provider.time.time")
+    @patch("charm.MongoDBProvider._get_databases_from_relations")
+    @patch("charm.MongoDBProvider._get_users_from_relations")
+    @patch("charms.mongodb.v1.mongodb_provider.MongoDBConnection")
+    def test_auto_delete_grace_period(
+        self, connection, relation_users, databases_from_relations, now
+    ):
+        """Databases are queued and only dropped once their grace period expired."""
+        mongo = connection.return_value.__enter__.return_value
+        mongo.get_databases.return_value = {"db1", "db2", "db3"}
+        mongo.drop_database.return_value = 1024
+        databases_from_relations.return_value = {"db1"}
+        self.harness.update_config({"auto-delete": True, "auto-delete-grace-period": 60})
+        self.charm.app_peer_data["db_initialised"] = "True"
+        now.return_value = 1000
+
+        # case 1: removed databases are queued, not dropped
+        self.charm.client_relations.oversee_users(None, RelationEvent(mock.Mock(), mock.Mock()))
+        mongo.drop_database.assert_not_called()
+        cleanup_status = self.charm.client_relations.get_cleanup_status()
+        self.assertEqual(json.loads(cleanup_status["pending"]), {"db2": "60s", "db3": "60s"})
+
+        # case 2: a database requested again is dequeued, the other one is dropped once due
+        databases_from_relations.return_value = {"db1", "db3"}
+        now.return_value = 1060
+        self.charm.client_relations.drop_queued_databases()
+        mongo.drop_database.assert_called_once_with("db2")
+        cleanup_status = self.charm.client_relations.get_cleanup_status()
+        self.assertEqual(json.loads(cleanup_status["pending"]), {})
+        self.assertEqual(cleanup_status["dropped"], "1")
+        self.assertEqual(cleanup_status["bytes-reclaimed"], "1024")
+
+    @patch_network_get(private_address="1.1.1.1")
+    @patch("charm.MongoDBProvider._get_databases_from_relations")
+    @patch("charm.MongoDBProvider._get_users_from_relations")
+    @patch("charms.mongodb.v1.mongodb_provider.MongoDBConnection")
+    def test_auto_delete_keeps_failed_drops_queued(
+        self, connection, relation_users, databases_from_relations
+    ):
+        """Databases which failed to drop stay queued, the dropped ones are recorded."""
+        mongo = connection.return_value.__enter__.return_value
+        mongo.get_databases.return_value = {"db1", "db2", "db3"}
+        mongo.drop_database.side_effect = lambda database: (
+            2048 if database == "db2" else _raise(OperationFailure("error message"))
+        )
+        databases_from_relations.return_value = {"db1"}
+        self.harness.update_config({"auto-delete": True})
+
+        with self.assertRaises(OperationFailure):
+            self.charm.client_relations.oversee_users(
+                None, RelationEvent(mock.Mock(), mock.Mock())
+            )
+
+        self.assertEqual(mongo.drop_database.call_count, 2)
+        cleanup_status = self.charm.client_relations.get_cleanup_status()
+        self.assertEqual(list(json.loads(cleanup_status["pending"])), ["db3"])
+        self.assertEqual(cleanup_status["dropped"], "1")
+        self.assertEqual(cleanup_status["bytes-reclaimed"], "2048")
+
+    @patch_network_get(private_address="1.1.1.1")
+    @patch("data_platform_helpers.version_check.CrossAppVersionChecker.is_local_charm")
+    @patch("charm.get_charm_revision")
+    @patch("charms.mongodb.v1.mongodb_provider.MongoDBConnection")
+    def test_connection_options(self, connection, *unused):
+        """Connection options of the config and the relation are published in the URI."""
+        connection._get_roles.side_effect = MongoDBConnection._get_roles
+        connection.return_value.__enter__.return_value = FakeUserStore()
+        self.harness.update_config(
+            {"connection-options": "compressors=zstd&readPreference=secondaryPreferred"}
+        )
+        relation_id = self.harness.add_relation("database", "consumer")
+        self.harness.update_relation_data(relation_id, "consumer", {"database": "db1"})
+        self.charm.app_peer_data["db_initialised"] = "True"
+        self.charm.client_relations.oversee_users(None, RelationEvent(mock.Mock(), mock.Mock()))
+        database_provides = self.charm.client_relations.database_provides
+
+        def published_uri():
+            return database_provides.fetch_my_relation_field(relation_id, "uris")
+
+        self.assertTrue(
+            published_uri().endswith("&compressors=zstd&readPreference=secondaryPreferred")
+        )
+
+        # case 1: options requested by the relation take precedence, invalid ones are ignored
+        self.harness.update_relation_data(
+            relation_id,
+            "consumer",
+            {"connection-options": "readPreference=nearest&maxPoolSize=20"},
+        )
+        self.charm.client_relations.oversee_users(None, RelationEvent(mock.Mock(), mock.Mock()))
+        self.assertTrue(
+            published_uri().endswith("&compressors=zstd&maxPoolSize=20&readPreference=nearest")
+        )
+
+        self.harness.update_relation_data(
+            relation_id, "consumer", {"connection-options": "replicaSet=other"}
+        )
+        self.charm.client_relations.oversee_users(None, RelationEvent(mock.Mock(), mock.Mock()))
+        self.assertTrue(
+            published_uri().endswith("&compressors=zstd&readPreference=secondaryPreferred")
+        )
+
+
+def _raise(error: Exception):
+    raise error
@@ -0,0 +1,105 @@
+# Copyright 2024 Canonical Ltd.
+# See LICENSE file for licensing details.
+import unittest
+from collections import namedtuple
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from charms.mongodb.v1.mongodb import OplogWindow
+from ops.model import ActiveStatus, WaitingStatus
+from ops.testing import Harness
+
+from charm import MongodbOperatorCharm
+
+from .helpers import patch_network_get
+
+DiskUsage = namedtuple("DiskUsage", "total used free")
+GB = 1024**3
+MB = 1024**2
+
+
+def oplog_window(hours: float, size: int, max_size: int) -> OplogWindow:
+    """Returns an oplog window spanning the provided hours."""
+    last = datetime(2024, 1, 1)
+    return OplogWindow(
+        first=last - timedelta(hours=hours), last=last, size=size, max_size=max_size
+    )
+
+
+class TestOplogManager(unittest.TestCase):
+    @patch("charm.get_charm_revision")
+    @patch_network_get(private_address="1.1.1.1")
+    def setUp(self, *unused):
+        self.harness = Harness(MongodbOperatorCharm)
+        self.addCleanup(self.harness.cleanup)
+        self.harness.begin()
+        self.harness.add_relation("database-peers", "database-peers")
+        self.oplog = self.harness.charm.oplog
+
+    @patch("oplog.shutil.disk_usage")
+    def test_get_target_size(self, disk_usage):
+        """The oplog only grows once full, to hold the minimum window at the current rate."""
+        disk_usage.return_value = DiskUsage(100 * GB, 50 * GB, 50 * GB)
+        full_oplog = oplog_window(hours=6, size=2 * GB, max_size=2 * GB)
+
+        # no minimum window
+        self.assertIsNone(self.oplog.get_target_size(full_oplog))
+
+        self.harness.update_config({"oplog-min-window": 24})
+        # 4 times the window at the same rate, with headroom
+        self.assertEqual(self.oplog.get_target_size(full_oplog), int(8 * 1024 * 1.2) + 1)
+        # an oplog which is not full has not reached its window yet
+        self.assertIsNone(
+            self.oplog.get_target_size(oplog_window(hours=6, size=GB, max_size=2 * GB))
+        )
+        # a long enough window
+        self.assertIsNone(
+            self.oplog.get_target_size(oplog_window(hours=30, size=2 * GB, max_size=2 * GB))
+        )
+
+        # growth is capped by half of the free disk space
+        disk_usage.return_value = DiskUsage(100 * GB, 98 * GB, 2 * GB)
+        self.assertEqual(self.oplog.get_target_size(full_oplog), 3 * 1024)
+        disk_usage.return_value = DiskUsage(100 * GB, 100 * GB, 0)
+        self.assertIsNone(self.oplog.get_target_size(full_oplog))
+
+    @patch("oplog.shutil.disk_usage")
+    @patch("oplog.MongoDBConnection")
+    def test_update_resizes_short_oplog(self, connection, disk_usage):
+        """The oplog of the unit is sampled and resized when its window is too short."""
+        disk_usage.return_value = DiskUsage(100 * GB, 50 * GB, 50 * GB)
+        mongo = connection.return_value.__enter__.return_value
+        mongo.get_oplog_window.return_value = oplog_window(hours=1, size=GB, max_size=GB)
+
+        self.oplog.update()
+        connection.assert_not_called()
+
+        self.harness.update_config({"oplog-min-window": 2})
+        self.oplog.update()
+        mongo.resize_oplog.assert_called_once_with(int(2 * 1024 * 1.2) + 1)
+
+        mongo.get_oplog_window.return_value = oplog_window(hours=3, size=GB, max_size=GB)
+        self.oplog.update()
+        mongo.resize_oplog.assert_called_once()
+
+    def test_get_unit_status(self):
+        """A window below the minimum is reported in the status of an active unit."""
+        self.harness.update_config({"oplog-min-window": 24})
+        self.oplog.oplog_window = oplog_window(hours=6, size=GB, max_size=GB)
+
+        self.assertEqual(
+            self.oplog.get_unit_status(ActiveStatus("Primary")),
+            ActiveStatus("Primary, oplog window 6.0h below 24h"),
+        )
+        self.assertEqual(
+            self.oplog.get_unit_status(ActiveStatus("")),
+            ActiveStatus("oplog window 6.0h below 24h"),
+        )
+        self.assertEqual(
+            self.oplog.get_unit_status(WaitingStatus("waiting")), WaitingStatus("waiting")
+        )
+
+        self.oplog.oplog_window = oplog_window(hours=25, size=GB, max_size=GB)
+        self.assertEqual(
+            self.oplog.get_unit_status(ActiveStatus("Primary")), ActiveStatus("Primary")
+        )
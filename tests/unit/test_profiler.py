@@ -0,0 +1,165 @@
+# Copyright 2024 Canonical Ltd.
+# See LICENSE file for licensing details.
+import unittest
+from unittest import mock
+from unittest.mock import patch
+
+from charms.mongodb.v1.mongodb import ProfilingSettings, SlowOperation
+from ops.testing import Harness
+from pymongo.errors import ServerSelectionTimeoutError
+
+from charm import MongodbOperatorCharm
+from profiler import get_query_shape, summarise_slow_operations
+
+from .helpers import patch_network_get
+
+PEER_RELATION = "database-peers"
+
+
+def find_orders(status, millis, docs_examined=100, returned=10, plan="COLLSCAN"):
+    return SlowOperation(
+        op="query",
+        ns="app.orders",
+        command={"find": "orders", "filter": {"status": status, "total": {"$gt": millis}}},
+        millis=millis,
+        docs_examined=docs_examined,
+        returned=returned,
+        plan_summary=plan,
+    )
+
+
+class TestSlowQueries(unittest.TestCase):
+    def test_get_query_shape(self):
+        """Operations differing only by the values they query share a shape."""
+        self.assertEqual(
+            get_query_shape(find_orders("paid", 120)),
+            'query app.orders {"status":"?","total":{"$gt":"?"}}',
+        )
+        self.assertEqual(
+            get_query_shape(find_orders("paid", 120)), get_query_shape(find_orders("new", 80))
+        )
+
+        # lists of values are collapsed, pipelines keep their stages and field paths
+        aggregate = SlowOperation(
+            op="command",
+            ns="app.orders",
+            command={
+                "aggregate": "orders",
+                "pipeline": [
+                    {"$match": {"status": {"$in": ["paid", "new"]}}},
+                    {"$group": {"_id": "$customer", "total": {"$sum": "$total"}}},
+                ],
+            },
+            millis=300,
+            docs_examined=None,
+            returned=0,
+            plan_summary=None,
+            in_progress=True,
+        )
+        self.assertEqual(
+            get_query_shape(aggregate),
+            'command app.orders [{"$match":{"status":{"$in":"?"}}},'
+            '{"$group":{"_id":"$customer","total":{"$sum":"$total"}}}]',
+        )
+
+    def test_summarise_slow_operations(self):
+        """Shapes are ranked by total time, with their latency percentiles and plan."""
+        operations = [find_orders("paid", millis) for millis in range(1, 101)]
+        operations.append(find_orders("paid", 50, plan="IXSCAN { status: 1 }"))
+        operations.append(
+            SlowOperation(
+                op="remove",
+                ns="app.carts",
+                command={"q": {"expired": True}, "limit": 0},
+                millis=200,
+                docs_examined=1000,
+                returned=0,
+                plan_summary="COLLSCAN",
+            )
+        )
+
+        shapes = summarise_slow_operations(operations, limit=1)
+        self.assertEqual(len(shapes), 1)
+        results = shapes[0].to_results()
+        self.assertEqual(results["count"], "101")
+        self.assertEqual(results["total-ms"], "5100")
+        self.assertEqual(results["p50-ms"], "50")
+        self.assertEqual(results["p95-ms"], "95")
+        self.assertEqual(results["p99-ms"], "99")
+        self.assertEqual(results["docs-examined-per-returned"], "10.0")
+        self.assertEqual(results["plan"], "COLLSCAN")
+
+        self.assertEqual(len(summarise_slow_operations(operations, limit=10)), 2)
+
+
+@patch_network_get(private_address="1.1.1.1")
+class TestProfilerManager(unittest.TestCase):
+    @patch("charm.get_charm_revision")
+    def setUp(self, *unused):
+        self.harness = Harness(MongodbOperatorCharm)
+        self.addCleanup(self.harness.cleanup)
+        self.harness.begin()
+        self.peer_rel_id = self.harness.add_relation(PEER_RELATION, PEER_RELATION)
+        self.harness.add_relation_unit(self.peer_rel_id, "mongodb/1")
+        self.harness.update_relation_data(
+            self.peer_rel_id, "mongodb/1", {"private-address": "2.2.2.2"}
+        )
+        self.profiler = self.harness.charm.profiler
+
+    @patch("charm.MongodbOperatorCharm._update_mongod_options")
+    def test_settings(self, _):
+        """Invalid settings fall back to the defaults."""
+        self.harness.update_config({"profiling-level": 1, "profiling-slow-ms": 50})
+        self.assertEqual(self.profiler.settings, ProfilingSettings(level=1, slow_ms=50))
+
+        self.harness.update_config({"profiling-sample-rate": 2.0})
+        self.assertEqual(self.profiler.settings, ProfilingSettings())
+
+    @patch("profiler.MongoDBConnection")
+    @patch("charm.MongodbOperatorCharm._update_mongod_options")
+    def test_update(self, _, connection):
+        """The settings are applied to the unit, failures are reported."""
+        set_profiling = connection.return_value.__enter__.return_value.set_profiling
+        self.harness.update_config({"profiling-level": 2})
+        self.assertTrue(self.profiler.update())
+        set_profiling.assert_called_once_with(ProfilingSettings(level=2))
+
+        set_profiling.side_effect = ServerSelectionTimeoutError("error message")
+        self.assertFalse(self.profiler.update())
+
+    @patch("profiler.ProfilerManager.update")
+    @patch("charm.MongodbOperatorCharm._update_mongod_options")
+    def test_reconcile(self, _, update):
+        """The profiler is only reconciled on update-status while it is enabled."""
+        self.profiler.reconcile()
+        update.assert_not_called()
+
+        self.harness.update_config({"profiling-level": 1})
+        self.profiler.reconcile()
+        update.assert_called_once()
+
+    @patch("profiler.ProfilerManager._get_slow_operations")
+    def test_get_slow_queries_action(self, get_slow_operations):
+        """The slow operations of every reachable member are aggregated."""
+
+        def slow_operations(host):
+            if host == "2.2.2.2":
+                raise ServerSelectionTimeoutError("error message")
+            return [find_orders("paid", 120), find_orders("new", 80)]
+
+        get_slow_operations.side_effect = slow_operations
+        mock_event = mock.Mock(params={"limit": 5})
+        self.profiler._on_get_slow_queries_action(mock_event)
+
+        results = mock_event.set_results.call_args.args[0]
+        self.assertEqual(results["operations"], "2")
+        self.assertEqual(results["unreachable-members"], "2.2.2.2")
+        self.assertEqual(results["shapes"]["1"]["count"], "2")
+        self.assertEqual(results["shapes"]["1"]["total-ms"], "200")
+
+        # the action fails when no member could be read
+        get_slow_operations.side_effect = ServerSelectionTimeoutError("error message")
+        mock_event = mock.Mock(params={"limit": 5})
+        self.profiler._on_get_slow_queries_action(mock_event)
+        mock_event.fail.assert_called_once()
+        mock_event.set_results.assert_not_called()
@@ -0,0 +1,143 @@
+# Copyright 2024 Canonical Ltd.
+# See LICENSE file for licensing details.
+import json
+import unittest
+from unittest import mock
+from unittest.mock import patch
+
+from ops.testing import Harness
+
+from charm import MongodbOperatorCharm
+
+from .helpers import FakeReplicaSet, patch_network_get
+
+PEER_RELATION = "database-peers"
+
+
+@patch("rolling_restart.Config.RollingRestart.CATCH_UP_TIMEOUT", 0)
+@patch_network_get(private_address="1.1.1.1")
+class TestRollingRestart(unittest.TestCase):
+    @patch("charm.get_charm_revision")
+    def setUp(self, *unused):
+        self.harness = Harness(MongodbOperatorCharm)
+        self.addCleanup(self.harness.cleanup)
+        self.harness.begin()
+        self.peer_rel_id = self.harness.add_relation(PEER_RELATION, PEER_RELATION)
+        self.harness.add_relation_unit(self.peer_rel_id, "mongodb/1")
+        self.harness.update_relation_data(
+            self.peer_rel_id, "mongodb/1", {"private-address": "2.2.2.2"}
+        )
+        self.charm = self.harness.charm
+        self.replica_set = FakeReplicaSet(["1.1.1.1", "2.2.2.2"])
+        # only the coordinator is under test, not the reconciliation of the replica set
+        patch("charm.MongodbOperatorCharm._on_relation_handler").start()
+        client = patch("charms.mongodb.v1.mongodb.MongoClient").start()
+        client.return_value.admin.command.side_effect = self.replica_set.command
+        self.addCleanup(patch.stopall)
+
+    def granted_unit(self) -> str:
+        return self.harness.get_relation_data(self.peer_rel_id, "mongodb").get(
+            "restart-granted", ""
+        )
+
+    @patch("rolling_restart.RollingRestart._restart")
+    @patch("charm.MongodbOperatorCharm.primary", new_callable=mock.PropertyMock)
+    def test_secondaries_restart_before_primary(self, primary, restart):
+        """The leader grants the lock to the secondaries first, one at a time."""
+        restart.return_value = False
+        primary.return_value = "mongodb/0"
+        self.harness.set_leader(True)
+        self.charm.unit_peer_data["restart-requested"] = "100"
+        self.harness.update_relation_data(
+            self.peer_rel_id, "mongodb/1", {"restart-requested": "200"}
+        )
+
+        # the primary requested first, the secondary is still granted the lock first
+        self.assertEqual(self.granted_unit(), "mongodb/1")
+        restart.assert_not_called()
+
+        # the lock is granted to the primary once the secondary released it
+        self.harness.update_relation_data(self.peer_rel_id, "mongodb/1", {"restart-requested": ""})
+        self.assertEqual(self.granted_unit(), "mongodb/0")
+        restart.assert_called_once()
+
+    @patch("charms.mongodb.v1.mongodb.MongoDBConnection.move_primary")
+    @patch("charm.MongodbOperatorCharm.restart_charm_services")
+    @patch("charm.MongodbOperatorCharm.primary", new_callable=mock.PropertyMock)
+    def test_restart_hands_over_primary_and_waits_for_catch_up(
+        self, primary, restart_charm_services, move_primary_mock
+    ):
+        """The primary steps down, restarts once, and holds the lock until it caught up."""
+        primary.return_value = "mongodb/0"
+        self.harness.set_leader(True)
+        self.replica_set.lags["1.1.1.1"] = 0
+
+        def move_primary(new_primary_ip):
+            self.replica_set.states.update({"1.1.1.1": "SECONDARY", new_primary_ip: "PRIMARY"})
+            return 1.5
+
+        move_primary_mock.side_effect = move_primary
+        # the restarted member is behind the new primary
+        restart_charm_services.side_effect = lambda: self.replica_set.lags.update({"1.1.1.1": 600})
+
+        self.charm.rolling_restart.request_restart()
+        move_primary_mock.assert_called_once_with(new_primary_ip="2.2.2.2")
+        restart_charm_services.assert_called_once()
+        self.assertEqual(self.granted_unit(), "mongodb/0")
+
+        # the member caught up, it releases the lock without restarting again
+        self.replica_set.lags["1.1.1.1"] = 1
+        self.charm.rolling_restart._on_peer_relation_changed(None)
+        restart_charm_services.assert_called_once()
+        self.assertEqual(self.granted_unit(), "")
+        self.assertNotIn("restart-requested", self.charm.unit_peer_data)
+
+        timings = json.loads(self.charm.unit_peer_data["restart-timings"])
+        self.assertEqual(
+            set(timings),
+            {"completed-at", "waited", "primary-handover", "restart-and-catch-up", "total"},
+        )
+        self.assertEqual(timings["primary-handover"], 1.5)
+        self.assertNotIn("restart-primary-handover", self.charm.unit_peer_data)
+
+        mock_event = mock.Mock()
+        self.charm.rolling_restart._on_get_restart_status_action(mock_event)
+        results = mock_event.set_results.call_args.args[0]
+        self.assertEqual(results["lock-holder"], "none")
+        self.assertEqual(results["pending"], "none")
+        self.assertIn("total", results["last-restart"])
+
+    @patch("charms.mongodb.v1.mongodb.MongoDBConnection.move_primary")
+    @patch("charm.MongodbOperatorCharm.restart_charm_services")
+    @patch("charm.MongodbOperatorCharm.primary", new_callable=mock.PropertyMock)
+    def test_primary_not_handed_over_to_non_voting_member(
+        self, primary, restart_charm_services, move_primary
+    ):
+        """Members without a vote or a priority are never picked as the new primary."""
+        primary.return_value = "mongodb/0"
+        self.harness.set_leader(True)
+        self.replica_set.config["members"].append(
+            {"_id": 2, "host": "3.3.3.3", "votes": 0, "priority": 0}
+        )
+        self.replica_set.states["3.3.3.3"] = "SECONDARY"
+        self.replica_set.lags.update({"2.2.2.2": 5, "3.3.3.3": 0})
+        move_primary.return_value = 1.0
+
+        self.charm.rolling_restart.request_restart()
+        move_primary.assert_called_once_with(new_primary_ip="2.2.2.2")
+
+    @patch("charm.MongodbOperatorCharm.restart_charm_services")
+    @patch("charm.MongodbOperatorCharm.primary", new_callable=mock.PropertyMock)
+    def test_lock_of_departed_unit_is_released(self, primary, restart_charm_services):
+        """A lock granted to a unit which left the relation is granted to the next unit."""
+        primary.return_value = "mongodb/1"
+        self.harness.set_leader(True)
+        self.harness.update_relation_data(
+            self.peer_rel_id, "mongodb", {"restart-granted": "mongodb/2"}
+        )
+        self.replica_set.states.update({"1.1.1.1": "SECONDARY", "2.2.2.2": "PRIMARY"})
+
+        self.charm.rolling_restart.request_restart()
+
+        restart_charm_services.assert_called_once()
+        self.assertEqual(self.granted_unit(), "")
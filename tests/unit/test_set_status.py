@@ -4,9 +4,11 @@ import unittest
 from unittest import mock
 from unittest.mock import patch
 
+from ops.model import ActiveStatus, BlockedStatus
 from ops.testing import Harness
 
 from charm import MongodbOperatorCharm
+from config import Config
 
 from .helpers import patch_network_get
 
@@ -42,3 +44,57 @@ class TestCharm(unittest.TestCase):
         self.harness.charm.model._backend = run_mock
 
         assert not self.harness.charm.status.are_all_units_ready_for_upgrade()
+
+    @patch("charm.LazySnapCache")
+    @patch("charms.mongodb.v0.set_status.time.time")
+    @patch("charms.mongodb.v0.set_status.MongoDBConnection")
+    @patch("charms.mongodb.v0.set_status.build_unit_status")
+    def test_get_statuses_reuses_unchanged_statuses(
+        self, build_unit_status, connection, now, snap_cache
+    ):
+        """Statuses are only recomputed when their inputs changed or they are too old."""
+        rel_id = self.harness.add_relation("database-peers", "database-peers")
+        mongodb_snap = snap_cache.return_value.__getitem__.return_value
+        mongodb_snap.revision = "118"
+        build_unit_status.return_value = ActiveStatus("Primary")
+        topology = connection.return_value.__enter__.return_value.get_topology.return_value
+        topology.config_version = 1
+        now.return_value = 1000
+        charm = self.harness.charm
+        charm.shard.get_shard_status = mock.Mock(return_value=None)
+        charm.config_server.get_config_server_status = mock.Mock(return_value=None)
+        charm.backups.get_pbm_status = mock.Mock(return_value=ActiveStatus("pbm"))
+
+        # case 1: the first computation is cached, the next one is reused
+        for _ in range(2):
+            statuses = charm.status.get_statuses(use_cache=True)
+            self.assertEqual(statuses, (ActiveStatus("Primary"), None, None, ActiveStatus("pbm")))
+        charm.backups.get_pbm_status.assert_called_once()
+
+        # case 2: a change in the replica set config invalidates the cached statuses
+        topology.config_version = 2
+        charm.status.get_statuses(use_cache=True)
+        self.assertEqual(charm.backups.get_pbm_status.call_count, 2)
+
+        # case 3: statuses older than the max age are refreshed
+        now.return_value = 1000 + Config.Status.CACHE_MAX_AGE
+        charm.status.get_statuses(use_cache=True)
+        self.assertEqual(charm.backups.get_pbm_status.call_count, 3)
+
+        # case 4: statuses that are not active are never reused
+        charm.backups.get_pbm_status.return_value = BlockedStatus("s3 unreachable")
+        now.return_value = 2 * (1000 + Config.Status.CACHE_MAX_AGE)
+        for _ in range(2):
+            charm.status.get_statuses(use_cache=True)
+        self.assertEqual(charm.backups.get_pbm_status.call_count, 5)
+        self.assertEqual(charm.shard.get_shard_status.call_count, 4)
+
+        # case 5: a refresh of the snap invalidates the cached statuses
+        charm.status.get_statuses(use_cache=True)
+        self.assertEqual(charm.shard.get_shard_status.call_count, 4)
+        mongodb_snap.revision = "119"
+        charm.status.get_statuses(use_cache=True)
+        self.assertEqual(charm.shard.get_shard_status.call_count, 5)
+
+        # the cache is kept in unit local state, leaving the peer databag untouched
+        self.assertEqual(self.harness.get_relation_data(rel_id, charm.unit.name), {})
@@ -0,0 +1,77 @@
+# Copyright 2024 Canonical Ltd.
+# See LICENSE file for licensing details.
+import io
+import json
+import unittest
+from unittest.mock import patch
+
+from charms.operator_libs_linux.v2 import snap
+
+from snap_cache import LazySnapCache
+
+INSTALLED_SNAP = {
+    "name": "charmed-mongodb",
+    "channel": "6/edge",
+    "revision": "118",
+    "confinement": "strict",
+    "apps": [{"snap": "charmed-mongodb", "name": "mongod", "daemon": "simple", "active": True}],
+}
+AVAILABLE_SNAP = {
+    "name": "charmed-mongodb",
+    "channel": "6/edge",
+    "revision": "120",
+    "confinement": "strict",
+}
+
+
+class FakeSnapd:
+    """Answers the snapd API requests of a unit with charmed-mongodb installed or not."""
+
+    def __init__(self, installed: bool):
+        self.installed = installed
+        self.paths = []
+
+    def request(self, method, path, query=None, headers=None, data=None):
+        self.paths.append(path)
+        if path == "snaps/charmed-mongodb":
+            if not self.installed:
+                raise snap.SnapAPIError({}, 404, "Not Found", "snap not installed")
+            result = INSTALLED_SNAP
+        elif path == "find":
+            result = [AVAILABLE_SNAP]
+        elif path == "apps":
+            result = INSTALLED_SNAP["apps"]
+        else:
+            raise AssertionError(f"unexpected request of {path}")
+
+        return io.BytesIO(json.dumps({"result": result}).encode())
+
+
+@patch("snap_cache.LazySnapCache.snapd_installed", True)
+class TestLazySnapCache(unittest.TestCase):
+    def test_installed_snap_loaded_once(self):
+        """Only the requested snap is loaded, with a single request shared by the hook."""
+        snapd = FakeSnapd(installed=True)
+        with patch("snap_cache.snap.SnapClient._request_raw", side_effect=snapd.request):
+            cache = LazySnapCache()
+            self.assertEqual(cache.requests, 0)
+
+            mongodb_snap = cache["charmed-mongodb"]
+            self.assertIs(cache["charmed-mongodb"], mongodb_snap)
+            self.assertTrue(mongodb_snap.present)
+            self.assertEqual(mongodb_snap.revision, "118")
+            self.assertEqual(snapd.paths, ["snaps/charmed-mongodb"])
+
+            # requests of the snap itself go through the counting client of the cache
+            self.assertTrue(mongodb_snap.services["mongod"]["active"])
+            self.assertEqual(cache.requests, 2)
+
+    def test_snap_not_installed(self):
+        """A snap which is not installed is looked up in the store."""
+        snapd = FakeSnapd(installed=False)
+        with patch("snap_cache.snap.SnapClient._request_raw", side_effect=snapd.request):
+            mongodb_snap = LazySnapCache()["charmed-mongodb"]
+
+        self.assertFalse(mongodb_snap.present)
+        self.assertEqual(mongodb_snap.revision, "120")
+        self.assertEqual(snapd.paths, ["snaps/charmed-mongodb", "find"])
@@ -1,11 +1,14 @@
 # Copyright 2024 Canonical Ltd.
 # See LICENSE file for licensing details.
+import threading
 import unittest
 from unittest import mock
 from unittest.mock import patch
 
 from ops.model import ActiveStatus, BlockedStatus
 from ops.testing import Harness
+from pymongo.errors import ServerSelectionTimeoutError
+from tenacity import wait_none
 
 from charm import MongodbOperatorCharm
 
@@ -82,6 +85,42 @@ class TestCharm(unittest.TestCase):
         self.harness.charm.status.are_all_units_ready_for_upgrade.return_value = False
         assert not self.harness.charm.upgrade.is_cluster_healthy()
 
+    @patch("charm.MongoDBUpgrade.get_all_replica_set_configs_in_cluster")
+    @patch("charm.MongoDBUpgrade.are_replica_set_nodes_healthy")
+    def test_are_replicas_in_sharded_cluster_healthy(self, nodes_healthy, get_configs):
+        """Replica sets are checked concurrently and reported individually."""
+        replsets = ["config-server", "shard-one", "shard-two"]
+        get_configs.return_value = [
+            self.harness.charm.remote_mongodb_config(["1.1.1.1"], replset=replset)
+            for replset in replsets
+        ]
+        # every check waits for the others, which would time out if they were run one by one
+        all_checks_started = threading.Barrier(len(replsets), timeout=5)
+
+        def check_replica_set(mongodb_config):
+            all_checks_started.wait()
+            if mongodb_config.replset == "shard-two":
+                raise ServerSelectionTimeoutError("shard-two unreachable")
+            return True
+
+        nodes_healthy.side_effect = check_replica_set
+
+        # case 1: one of the shards is unreachable
+        upgrade = self.harness.charm.upgrade
+        assert not upgrade.are_replicas_in_sharded_cluster_healthy(mongos_config=None)
+        self.assertEqual([health.replset for health in upgrade.health_report], replsets)
+        report = upgrade.get_health_report_results()["health-report"]
+        self.assertEqual(report["config-server"]["healthy"], "true")
+        self.assertEqual(report["shard-two"]["healthy"], "false")
+        self.assertEqual(report["shard-two"]["error"], "shard-two unreachable")
+        self.assertNotIn("error", report["shard-one"])
+
+        # case 2: all replica sets are healthy
+        nodes_healthy.side_effect = None
+        nodes_healthy.return_value = True
+        assert upgrade.are_replicas_in_sharded_cluster_healthy(mongos_config=None)
+        assert all(health.healthy for health in upgrade.health_report)
+
     @patch_network_get(private_address="1.1.1.1")
     @patch("upgrades.mongodb_upgrade.MongoDBConnection")
     @patch("charm.MongoDBUpgrade.is_write_on_secondaries")
@@ -94,3 +133,20 @@ class TestCharm(unittest.TestCase):
         # case 2: writes are present on secondaries
         is_write_on_secondaries.return_value = True
         assert self.harness.charm.upgrade.is_replica_set_able_read_write()
+
+    @patch("upgrades.mongodb_upgrade.wait_fixed")
+    @patch("charm.MongodbOperatorCharm.mongodb_config", new_callable=mock.PropertyMock)
+    @patch("upgrades.mongodb_upgrade.MongoDBConnection")
+    def test_step_down_primary_and_wait_reelection(self, connection, mongodb_config, wait):
+        """The election is polled with a new snapshot of the replica set on each attempt."""
+        wait.return_value = wait_none()
+        mongodb_config.return_value.hosts = {"1.1.1.1", "2.2.2.2"}
+        mongod = connection.return_value.__enter__.return_value
+        mongod.primary.side_effect = ["1.1.1.1", None, "1.1.1.1", "2.2.2.2"]
+
+        self.harness.charm.upgrade.step_down_primary_and_wait_reelection()
+
+        mongod.step_down_primary.assert_called_once()
+        self.assertEqual(
+            mongod.primary.call_args_list, [mock.call()] + [mock.call(refresh=True)] * 3
+        )
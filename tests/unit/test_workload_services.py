@@ -0,0 +1,71 @@
+# Copyright 2024 Canonical Ltd.
+# See LICENSE file for licensing details.
+import unittest
+from unittest import mock
+from unittest.mock import patch
+
+from ops.testing import Harness
+
+from charm import MongodbOperatorCharm
+
+
+class TestWorkloadServices(unittest.TestCase):
+    @patch("charm.get_charm_revision")
+    def setUp(self, *unused):
+        self.harness = Harness(MongodbOperatorCharm)
+        self.addCleanup(self.harness.cleanup)
+        self.harness.begin()
+        self.workload_services = self.harness.charm.workload_services
+
+    @patch("workload_services.service_running")
+    @patch("charm.LazySnapCache")
+    def test_ensure_config_only_restarts_on_change(self, snap_cache, service_running):
+        """The snap and its service are only touched when the configuration changed."""
+        mock_mongodb_snap = mock.Mock()
+        snap_cache.return_value = {"charmed-mongodb": mock_mongodb_snap}
+        service_running.return_value = False
+
+        # the service is started and enabled the first time
+        self.assertTrue(
+            self.workload_services.ensure_config("mongodb-exporter", {"monitor-uri": "uri-1"})
+        )
+        mock_mongodb_snap.set.assert_called_once_with({"monitor-uri": "uri-1"})
+        mock_mongodb_snap.start.assert_called_once_with(services=["mongodb-exporter"], enable=True)
+
+        # the same configuration of a running service is a no-op
+        service_running.return_value = True
+        snap_cache.reset_mock()
+        self.assertFalse(
+            self.workload_services.ensure_config("mongodb-exporter", {"monitor-uri": "uri-1"})
+        )
+        snap_cache.assert_not_called()
+
+        # a new configuration is applied, and the service reloaded where it supports it
+        self.assertTrue(
+            self.workload_services.ensure_config("mongodb-exporter", {"monitor-uri": "uri-2"})
+        )
+        mock_mongodb_snap.set.assert_called_with({"monitor-uri": "uri-2"})
+        mock_mongodb_snap.restart.assert_called_once_with(
+            services=["mongodb-exporter"], reload=True
+        )
+
+        # a stopped service is started again, even if its configuration is unchanged
+        service_running.return_value = False
+        self.assertTrue(
+            self.workload_services.ensure_config("mongodb-exporter", {"monitor-uri": "uri-2"})
+        )
+        self.assertEqual(mock_mongodb_snap.start.call_count, 2)
+
+        # a running service with an unchanged configuration is restarted when forced to
+        service_running.return_value = True
+        self.assertTrue(
+            self.workload_services.ensure_config(
+                "mongodb-exporter", {"monitor-uri": "uri-2"}, force=True
+            )
+        )
+        self.assertEqual(mock_mongodb_snap.restart.call_count, 2)
+
+        stats = self.workload_services.get_restart_stats()
+        self.assertEqual(set(stats), {"mongodb-exporter"})
+        self.assertEqual(stats["mongodb-exporter"]["count"], "4")
+        self.assertIn("last-duration", stats["mongodb-exporter"])